@@ -11,8 +11,15 @@ import sys
 import re
 import report_builder as rb
 import os
+import importlib.util
 
-with open(str(sys.argv[1]), 'r') as f:
+# Logs compressed by cva6.py --log_compress are read with its own reader
+spec = importlib.util.spec_from_file_location("cva6_log_io", os.path.join(
+    os.path.dirname(os.path.realpath(__file__)), '..', '..', 'verif', 'sim', 'cva6_log_io.py'))
+log_io = importlib.util.module_from_spec(spec)
+spec.loader.exec_module(log_io)
+
+with log_io.open_log(str(sys.argv[1])) as f:
     log = f.read()
 
 with_logs = os.environ.get("COLLECT_SIMU_LOGS") != None
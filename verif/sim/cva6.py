@@ -17,27 +17,77 @@ Regression script for RISC-V random instruction generator
 """
 
 import argparse
+import fcntl
 import os
 import random
 import re
 import sys
 import logging
 import subprocess
+import shutil
 import datetime
+import functools
+import io
+import tempfile
 import yaml
 
 from dv.scripts.lib import *
-from verilator_log_to_trace_csv import *
-from cva6_spike_log_to_trace_csv import *
-from dv.scripts.ovpsim_log_to_trace_csv import *
-from dv.scripts.whisper_log_trace_csv import *
-from dv.scripts.sail_log_to_trace_csv import *
-from dv.scripts.instr_trace_compare import *
+from cva6_cache import FileCache, ToolVersions, default_cache_dir, git_head_files, hash_file, hash_tool, tool_id
+from cva6_trace_bin import TRACE_BIN_EXT
+from cva6_plugins import COMPARATORS, TRACE_CONVERTERS, TRACE_DIALECTS, plugin
+from cva6_manifest import Manifest
+from cva6_log_io import COMPRESSORS, compress_log
+from cva6_regr_report import RegrReport
+from cva6_targets import copy_target_config, target_registry
+from cva6_telemetry import run_records, start_telemetry, tagged, telemetry_tags, timed_command, timed_section
 from pathlib import Path
 from types import SimpleNamespace
+# The scheduler, policy, sharding, test list index, generator batch, Spike
+# worker and tandem monitor modules are imported where they are used, to keep
+# the startup short.
 
 LOGGER = logging.getLogger()
 
+# Commands are recorded by the telemetry when --telemetry is given
+run_cmd = timed_command(run_cmd)
+run_cmd_output = timed_command(run_cmd_output)
+
+# Cache of the compiled test ELF/binary files, set up by main()
+build_cache = None
+# Cache of the Spike logs and trace CSV files, set up by main()
+iss_cache = None
+# Extension of the Spike and RTL simulation trace files, set up by main()
+trace_ext = ".csv"
+# Number of instructions reported before the first trace mismatch, set up by
+# main()
+divergence_context = 0
+# Manifests of the directed tests, set up by main() for --incremental
+manifest = None
+# Compressor of the simulation logs, set up by main() for --log_compress
+log_compress = ""
+# RegrReport of each iss_regr.log, see regr_report()
+regr_reports = {}
+# Runtimes of the tests of earlier regressions, set up by main() for
+# --runtime_db
+runtime_db = None
+# Directory of the test list indexes, set up by main() for --testlist_cache
+testlist_cache = ""
+# Resources shared by the parallel jobs, set up by main(), see run_jobs()
+resource_budget = {}
+# Resources used by the simulations of each ISS, see parse_iss_resources()
+iss_resource_hints = {}
+# ISS base commands parsed from the ISS YAML, see iss_base_cmd()
+iss_base_cmds = {}
+# SpikeWorker running the Spike simulations, set up by main() for
+# --spike_worker
+spike_worker = None
+# Timeouts, retries and priority of the simulations, set up by main() for
+# --timeout_factor, --retries and --quarantine
+job_policy = None
+# TandemMonitor running the RTL simulations, set up by main() for
+# --tandem_max_mismatches
+tandem_monitor = None
+
 class SeedGen:
   '''An object that will generate a pseudo-random seed for test iterations'''
   def __init__(self, start_seed, fixed_seed, seed_yaml):
@@ -48,6 +98,11 @@ class SeedGen:
     self.fixed_seed = fixed_seed
     self.start_seed = start_seed
     self.rerun_seed = {} if seed_yaml is None else read_yaml(seed_yaml)
+    # Runs packed by --gen_batch are recorded as a whole, see cva6_gen_batch
+    self.rerun_batches = {name: record for name, record in self.rerun_seed.items()
+                          if isinstance(record, dict)}
+    self.rerun_packed = set(entry['test_id'] for record in self.rerun_batches.values()
+                            for entry in record['tests'])
 
   def get(self, test_id, test_iter):
     '''Get the seed to use for the given test and iteration'''
@@ -70,6 +125,37 @@ class SeedGen:
     return random.getrandbits(31)
 
 
+def yaml_resources(entry):
+  """Get the resources of an ISS or simulator YAML entry, see Job in cva6_scheduler
+
+  They are given by the resources of the entry, e.g.:
+
+    resources:
+      memory: 4096   # MB
+      cores: 1
+      licenses:
+        vcs: 1
+      exclusive: vcs-uvm
+
+  The entries with the same exclusive name are never run in parallel.
+  """
+  hints = entry.get('resources') or {}
+  resources = {name: hints[name] for name in ("memory", "cores") if name in hints}
+  for name, count in (hints.get('licenses') or {}).items():
+    resources["license:" + name] = count
+  if hints.get('exclusive'):
+    resources["exclusive:" + hints['exclusive']] = 1
+  return resources
+
+
+def parse_generator_resources(simulator, simulator_yaml):
+  """Get the resources used by a run of the instruction generator"""
+  for entry in read_yaml(simulator_yaml):
+    if entry['tool'] == simulator:
+      return yaml_resources(entry)
+  return {}
+
+
 def get_generator_cmd(simulator, simulator_yaml, cov, exp, debug_cmd):
   """ Setup the compile and simulation command for the generator
 
@@ -147,6 +233,7 @@ def parse_iss_yaml(iss, iss_yaml, isa, target, setting_dir, debug_cmd, priv, spi
       cmd = re.sub(r"\<issrun_opts\>", issrun_opts, cmd)
       cmd = re.sub(r"\<isspostrun_opts\>", isspostrun_opts, cmd)
       cmd = re.sub(r"\<spike_params\>", spike_params, cmd)
+      cmd = re.sub(r"\<log_compress\>", log_compress, cmd)
       if m: cmd = re.sub(r"\<xlen\>", m.group('xlen'), cmd)
       if iss == "ovpsim":
         cmd = re.sub(r"\<cfg_path\>", setting_dir, cmd)
@@ -164,13 +251,70 @@ def parse_iss_yaml(iss, iss_yaml, isa, target, setting_dir, debug_cmd, priv, spi
   sys.exit(RET_FAIL)
 
 
-def get_iss_cmd(base_cmd, elf, target, log):
+def iss_base_cmd(iss, iss_yaml, isa, target, setting_dir, debug_cmd, priv, spike_params):
+  """Same as parse_iss_yaml(), the ISS YAML is only parsed once per ISS and
+  options"""
+  key = (iss, iss_yaml, isa, target, setting_dir, priv, spike_params)
+  if key not in iss_base_cmds:
+    iss_base_cmds[key] = parse_iss_yaml(iss, iss_yaml, isa, target, setting_dir,
+                                        debug_cmd, priv, spike_params)
+  return iss_base_cmds[key]
+
+
+def parse_iss_model(iss, iss_yaml, debug_cmd):
+  """Get the simulation model of an ISS from the ISS YAML
+
+  The model is the binary run by the ISS command, e.g. the verilated
+  testharness: it identifies the RTL being simulated.
+
+  Returns:
+    model       : Path of the model, None if the ISS YAML does not give it
+  """
+  for entry in read_yaml(iss_yaml):
+    if entry['iss'] == iss and 'model' in entry:
+      model = entry['model'].strip()
+      model = re.sub(r"\<path_var\>", get_env_var(entry['path_var'], debug_cmd = debug_cmd), model)
+      model = re.sub(r"\<tool_path\>", get_env_var(entry['tool_path'], debug_cmd = debug_cmd), model)
+      return model
+  return None
+
+
+def parse_iss_resources(iss, iss_yaml):
+  """Get the resources used by a simulation of an ISS from the ISS YAML
+
+  Returns:
+    resources   : Resources of the simulation jobs, see yaml_resources()
+  """
+  key = (iss, iss_yaml)
+  if key not in iss_resource_hints:
+    iss_resource_hints[key] = {}
+    for entry in read_yaml(iss_yaml):
+      if entry['iss'] == iss:
+        iss_resource_hints[key] = yaml_resources(entry)
+        break
+  return iss_resource_hints[key]
+
+
+def parse_licenses(arg):
+  """Parse the NAME=COUNT,... argument of --licenses"""
+  licenses = {}
+  for item in filter(None, arg.split(",")):
+    name, _, count = item.partition("=")
+    try:
+      licenses["license:" + name.strip()] = int(count)
+    except ValueError:
+      raise argparse.ArgumentTypeError("Bad license count (%s): must be NAME=COUNT" % item)
+  return licenses
+
+
+def get_iss_cmd(base_cmd, elf, target, log, work_dir=None):
   """Get the ISS simulation command
 
   Args:
     base_cmd : Original command template
     elf      : ELF file to run ISS simualtion
     log      : ISS simulation log name
+    work_dir : (Optional) Directory the simulation is run from
 
   Returns:
     cmd      : Command for ISS simulation
@@ -178,6 +322,12 @@ def get_iss_cmd(base_cmd, elf, target, log):
   cmd = re.sub(r"\<elf\>", elf, base_cmd)
   cmd = re.sub(r"\<target\>", target, cmd)
   cmd = re.sub(r"\<log\>", log, cmd)
+  if work_dir:
+    # Simulators leave trace_rvfi_hart_00.dasm and waveforms in their working
+    # directory: give each parallel job its own one.
+    os.makedirs(work_dir, exist_ok=True)
+    cwd = os.path.dirname(os.path.realpath(__file__))
+    cmd = re.sub(r"^make ", "make -C %s -f %s/Makefile " % (work_dir, cwd), cmd)
   cmd += (" &> %s.iss" % log)
   return cmd
 
@@ -234,9 +384,52 @@ def run_csr_test(cmd_list, cwd, csr_file, isa, iterations, lsf_cmd,
     run_cmd(cmd, timeout_s, debug_cmd = debug_cmd)
 
 
+def generator_cmd(sim_cmd, lsf_cmd, gen_test, test_cnt, start_idx, asm_file_name, log,
+                  rand_seed, test_id, gen_opts, isa, verbose):
+  """Get the command of one run of the instruction generator, see do_simulate()"""
+  cmd = lsf_cmd + " " + sim_cmd.rstrip() + \
+        (" +UVM_TESTNAME=%s " % gen_test) + \
+        (" +num_of_tests=%i " % test_cnt) + \
+        (" +start_idx=%d " % start_idx) + \
+        (" +asm_file_name=%s " % asm_file_name) + \
+        (" -l %s " % log)
+  if verbose:
+    cmd += "+UVM_VERBOSITY=UVM_HIGH "
+  cmd = re.sub("<seed>", str(rand_seed), cmd)
+  cmd = re.sub("<test_id>", test_id, cmd)
+  cmd += gen_opts
+  if not re.search("c", isa):
+    cmd += "+disable_compressed_instr=1 ";
+  return cmd
+
+
+def run_generator(cmd, message, timeout_s, check_return_code, debug_cmd):
+  """Run the instruction generator once, see do_simulate()"""
+  logging.info(message)
+  run_cmd(cmd, timeout_s, check_return_code = check_return_code, debug_cmd = debug_cmd)
+
+
+def save_seeds(sim_seed, output_dir):
+  """Write the seeds of the generator runs to seed.yaml and seedlist.yaml
+
+  seedlist.yaml may be shared by concurrent runs of cva6.py: the seeds are
+  appended in a single write while the file is locked.
+  """
+  text = yaml.dump(sim_seed, default_flow_style=False)
+  seed_yaml = '%s/seed.yaml' % os.path.abspath(output_dir)
+  fd, tmp = tempfile.mkstemp(dir=os.path.dirname(seed_yaml), suffix=".tmp")
+  with os.fdopen(fd, "w") as f:
+    f.write(text)
+  os.replace(tmp, seed_yaml)
+  with open('seedlist.yaml', 'a') as seedlist:
+    fcntl.flock(seedlist, fcntl.LOCK_EX)
+    seedlist.write(text)
+
+
 def do_simulate(sim_cmd, test_list, cwd, sim_opts, seed_gen, csr_file,
                 isa, end_signature_addr, lsf_cmd, timeout_s, log_suffix,
-                batch_size, output_dir, verbose, check_return_code, debug_cmd):
+                batch_size, output_dir, verbose, check_return_code, debug_cmd,
+                gen_batch=0, jobs=1, resources=None):
   """Run  the instruction generator
 
   Args:
@@ -255,8 +448,21 @@ def do_simulate(sim_cmd, test_list, cwd, sim_opts, seed_gen, csr_file,
     output_dir            : Output directory of the ELF files
     check_return_code     : Check return code of the command
     debug_cmd             : Produce the debug cmd log without running
+    gen_batch             : Maximum number of tests of the runs of test list
+                            entries with the same gen_test and gen_opts packed
+                            in one generator run, 0 to run each one alone, see
+                            cva6_gen_batch
+    jobs                  : Maximum number of generator runs in parallel
+                            without lsf_cmd
+    resources             : Resources used by a generator run, see
+                            parse_generator_resources()
   """
+  from cva6_gen_batch import GenUnit, batch_record, gen_batches, replay_batches, split_gen_batch, write_gen_batch
+  from cva6_scheduler import Job, run_jobs
   cmd_list = []
+  gen_units = []
+  plain_units = []
+  gen_jobs = []
   sim_cmd = re.sub("<out>", os.path.abspath(output_dir), sim_cmd)
   sim_cmd = re.sub("<cwd>", cwd, sim_cmd)
   sim_cmd = re.sub("<sim_opts>", sim_opts, sim_cmd)
@@ -276,42 +482,96 @@ def do_simulate(sim_cmd, test_list, cwd, sim_opts, seed_gen, csr_file,
         if batch_size > 0:
           batch_cnt = int((iterations + batch_size - 1)  / batch_size);
         logging.info("Running %s with %0d batches" % (test['test'], batch_cnt))
+        shard_iterations = set(test_iterations(test))
         for i in range(0, batch_cnt):
+          if i * batch_size not in shard_iterations:
+            # Batch run by another shard, see cva6_shard
+            continue
           test_id = '%0s_%0d' % (test['test'], i)
           rand_seed = seed_gen.get(test_id, i * batch_cnt)
           if i < batch_cnt - 1:
             test_cnt = batch_size
           else:
             test_cnt = iterations - i * batch_size;
-          cmd = lsf_cmd + " " + sim_cmd.rstrip() + \
-                (" +UVM_TESTNAME=%s " % test['gen_test']) + \
-                (" +num_of_tests=%i " % test_cnt) + \
-                (" +start_idx=%d " % (i*batch_size)) + \
-                (" +asm_file_name=%s/asm_tests/%s " % (output_dir, test['test'])) + \
-                (" -l %s/sim_%s_%d_%s.log " % (output_dir, test['test'], i, log_suffix))
-          if verbose:
-            cmd += "+UVM_VERBOSITY=UVM_HIGH "
-          cmd = re.sub("<seed>", str(rand_seed), cmd)
-          cmd = re.sub("<test_id>", test_id, cmd)
-          sim_seed[test_id] = str(rand_seed)
-          if "gen_opts" in test:
-            cmd += test['gen_opts']
-          if not re.search("c", isa):
-            cmd += "+disable_compressed_instr=1 ";
-          if lsf_cmd:
-            cmd_list.append(cmd)
+          unit = GenUnit(test, test_id, rand_seed, i * batch_size, test_cnt)
+          if gen_batch > 0 or test_id in seed_gen.rerun_packed:
+            gen_units.append(unit)
           else:
-            logging.info("Running %s, batch %0d/%0d, test_cnt:%0d" %
-                         (test['test'], i+1, batch_cnt, test_cnt))
-            run_cmd(cmd, timeout_s, check_return_code = check_return_code, debug_cmd = debug_cmd)
+            plain_units.append(unit)
+  manifests = []
+  try:
+    batches, gen_units = replay_batches(gen_units, seed_gen.rerun_batches)
+  except ValueError as exc:
+    logging.error("%s, rerun the regression with the same test list and options" % exc)
+    sys.exit(RET_FAIL)
+  if gen_units:
+    for batch in gen_batches(gen_units, gen_batch):
+      if len(batch) > 1:
+        batches.append(batch)
+      else:
+        plain_units += batch
+  for unit in plain_units:
+    test = unit.test
+    i = unit.start_idx // batch_size if batch_size > 0 else 0
+    batch_cnt = (test['iterations'] + batch_size - 1) // batch_size if batch_size > 0 else 1
+    cmd = generator_cmd(sim_cmd, lsf_cmd, test['gen_test'], unit.count, unit.start_idx,
+                        "%s/asm_tests/%s" % (output_dir, test['test']),
+                        "%s/sim_%s_%d_%s.log" % (output_dir, test['test'], i, log_suffix),
+                        unit.seed, unit.test_id, test.get('gen_opts', ""), isa, verbose)
+    sim_seed[unit.test_id] = str(unit.seed)
+    if lsf_cmd:
+      cmd_list.append(cmd)
+    else:
+      message = "Running %s, batch %0d/%0d, test_cnt:%0d" % \
+                (test['test'], i+1, batch_cnt, unit.count)
+      gen_jobs.append(Job(unit.test_id, tagged(run_generator, test=test['test'], iteration=i),
+                          (cmd, message, timeout_s, check_return_code, debug_cmd),
+                          cost=job_cost(test['test'], step="gen") * unit.count,
+                          resources=resources))
+  for n, batch in enumerate(batches):
+    name = "gen_batch_%d" % n
+    manifest = "%s/%s.yaml" % (output_dir, name)
+    write_gen_batch(manifest, name, batch)
+    manifests.append(manifest)
+    # The tests of a batch are generated from the seed of its first run: the
+    # batch is recorded as a whole, the seed alone does not reproduce them.
+    sim_seed[name] = batch_record(batch)
+    cmd = generator_cmd(sim_cmd, lsf_cmd, batch[0].test['gen_test'],
+                        sum(unit.count for unit in batch), 0,
+                        "%s/asm_tests/%s" % (output_dir, name),
+                        "%s/sim_%s_%s.log" % (output_dir, name, log_suffix),
+                        batch[0].seed, name, batch[0].test.get('gen_opts', ""), isa, verbose)
+    if lsf_cmd:
+      cmd_list.append(cmd)
+    else:
+      message = "Running %s: %s" % (name, ", ".join(
+        "%s (%d)" % (unit.test_id, unit.count) for unit in batch))
+      tests = set(unit.test['test'] for unit in batch)
+      gen_jobs.append(Job(name, tagged(run_generator,
+                                       test=tests.pop() if len(tests) == 1 else None),
+                          (cmd, message, timeout_s, check_return_code, debug_cmd),
+                          cost=sum(job_cost(unit.test['test'], step="gen") * unit.count
+                                   for unit in batch),
+                          resources=resources))
+  # The seeds are saved before the runs, so that a failing run can be
+  # reproduced
   if sim_seed:
-    with open(('%s/seed.yaml' % os.path.abspath(output_dir)) , 'w') as outfile:
-      yaml.dump(sim_seed, outfile, default_flow_style=False)
-    with open(('seedlist.yaml') , 'a') as seedlist:
-      yaml.dump(sim_seed, seedlist, default_flow_style=False)
+    save_seeds(sim_seed, output_dir)
   if lsf_cmd:
     run_parallel_cmd(cmd_list, timeout_s, check_return_code = check_return_code,
                      debug_cmd = debug_cmd)
+  # Batches run from the same directory, as with lsf_cmd
+  run_jobs(gen_jobs, jobs if not debug_cmd else 1, resource_budget)
+  if not debug_cmd:
+    for manifest in manifests:
+      missing = split_gen_batch(manifest, "%s/asm_tests" % output_dir)
+      if missing:
+        logging.error("%s did not generate: %s" % (manifest, " ".join(missing)))
+
+
+def test_iterations(test):
+  """Get the iterations of a test list entry run by this shard, see cva6_shard"""
+  return test.get('shard_iterations', range(test['iterations']))
 
 
 def gen(test_list, argv, output_dir, cwd):
@@ -340,16 +600,19 @@ def gen(test_list, argv, output_dir, cwd):
   sim_cmd = ""
   compile_cmd, sim_cmd = get_generator_cmd(argv.simulator, argv.simulator_yaml, argv.cov,
                                            argv.exp, argv.debug);
-  # Compile the instruction generator
-  if not argv.so:
-    do_compile(compile_cmd, test_list, argv.core_setting_dir, cwd, argv.user_extension_dir,
-               argv.cmp_opts, output_dir, argv.debug, argv.lsf_cmd)
-  # Run the instruction generator
-  if not argv.co:
-    seed_gen = SeedGen(argv.start_seed, argv.seed, argv.seed_yaml)
-    do_simulate(sim_cmd, test_list, cwd, argv.sim_opts, seed_gen, argv.csr_yaml,
-                argv.isa, argv.end_signature_addr, argv.lsf_cmd, argv.gen_timeout, argv.log_suffix,
-                argv.batch_size, output_dir, argv.verbose, check_return_code, argv.debug)
+  with telemetry_tags(step="gen"):
+    # Compile the instruction generator
+    if not argv.so:
+      do_compile(compile_cmd, test_list, argv.core_setting_dir, cwd, argv.user_extension_dir,
+                 argv.cmp_opts, output_dir, argv.debug, argv.lsf_cmd)
+    # Run the instruction generator
+    if not argv.co:
+      seed_gen = SeedGen(argv.start_seed, argv.seed, argv.seed_yaml)
+      do_simulate(sim_cmd, test_list, cwd, argv.sim_opts, seed_gen, argv.csr_yaml,
+                  argv.isa, argv.end_signature_addr, argv.lsf_cmd, argv.gen_timeout, argv.log_suffix,
+                  argv.batch_size, output_dir, argv.verbose, check_return_code, argv.debug,
+                  argv.gen_batch, argv.jobs,
+                  parse_generator_resources(argv.simulator, argv.simulator_yaml))
 
 
 # Convert the ELF to plain binary, used in RTL sim
@@ -359,7 +622,7 @@ def elf2bin(elf, binary, debug_cmd):
   run_cmd_output(cmd.split(), debug_cmd = debug_cmd)
 
 
-def gcc_compile(test_list, output_dir, isa, mabi, opts, debug_cmd, linker):
+def gcc_compile(test_list, output_dir, isa, mabi, opts, debug_cmd, linker, jobs=1):
   """Use riscv gcc toolchain to compile the assembly program
 
   Args:
@@ -369,58 +632,107 @@ def gcc_compile(test_list, output_dir, isa, mabi, opts, debug_cmd, linker):
     mabi       : MABI variant passed to GCC
     debug_cmd  : Produce the debug cmd log without running
     linker     : Path to the linker
+    jobs       : Maximum number of compilations run in parallel
   """
-  cwd = os.path.dirname(os.path.realpath(__file__))
+  from cva6_scheduler import run_jobs
+  compile_jobs = []
   for test in test_list:
-    for i in range(0, test['iterations']):
-      if 'no_gcc' in test and test['no_gcc'] == 1:
-        continue
-      prefix = ("%s/asm_tests/%s_%d" % (output_dir, test['test'], i))
-      asm = prefix + ".S"
-      elf = prefix + ".o"
-      binary = prefix + ".bin"
-      test_isa=re.match("[a-z0-9A-Z]+", isa)
-      test_isa=test_isa.group()
-      isa_ext=isa
-      if not os.path.isfile(asm) and not debug_cmd:
-        logging.error("Cannot find assembly test: %s\n", asm)
-        sys.exit(RET_FAIL)
-      # gcc comilation
-      cmd = ("%s %s \
-             -I%s/../env/corev-dv/user_extension \
-             -T%s %s -o %s " % \
-             (get_env_var("RISCV_CC", debug_cmd = debug_cmd), asm, cwd, linker, opts, elf))
-      if 'gcc_opts' in test:
-        cmd += test['gcc_opts']
-      if 'gen_opts' in test:
-        # Disable compressed instruction
-        if re.search('disable_compressed_instr=1', test['gen_opts']):
-          test_isa = re.sub("c",  "", test_isa)
-          #add z,s,x extensions to the isa if there are some
-          if isa_extension_list !=['none']:
-            for i in isa_extension_list:
-              test_isa += (f"_{i}")
-          isa_ext=test_isa
-      # If march/mabi is not defined in the test gcc_opts, use the default
-      # setting from the command line.
-      if not re.search('march', cmd):
-        cmd += (" -march=%s" % isa_ext)
-      if not re.search('mabi', cmd):
-        cmd += (" -mabi=%s" % mabi)
-      logging.info("Compiling test: %s" % asm)
-      run_cmd_output(cmd.split(), debug_cmd = debug_cmd)
-      elf2bin(elf, binary, debug_cmd)
+    for i in test_iterations(test):
+      job = gcc_compile_job(test, i, output_dir, isa, mabi, opts, debug_cmd, linker)
+      if job:
+        compile_jobs.append(job)
+  run_jobs(compile_jobs, jobs, resource_budget)
+
+
+def gcc_compile_job(test, i, output_dir, isa, mabi, opts, debug_cmd, linker):
+  """Get the Job compiling one iteration of a generated test, see gcc_compile()
+
+  Returns:
+    job        : Compilation job, None if the test is not compiled
+  """
+  if 'no_gcc' in test and test['no_gcc'] == 1:
+    return None
+  cwd = os.path.dirname(os.path.realpath(__file__))
+  prefix = ("%s/asm_tests/%s_%d" % (output_dir, test['test'], i))
+  asm = prefix + ".S"
+  elf = prefix + ".o"
+  binary = prefix + ".bin"
+  test_isa=re.match("[a-z0-9A-Z]+", isa)
+  test_isa=test_isa.group()
+  isa_ext=isa
+  if not os.path.isfile(asm) and not debug_cmd:
+    logging.error("Cannot find assembly test: %s\n", asm)
+    sys.exit(RET_FAIL)
+  # gcc comilation
+  cmd = ("%s %s \
+         -I%s/../env/corev-dv/user_extension \
+         -T%s %s -o %s " % \
+         (get_env_var("RISCV_CC", debug_cmd = debug_cmd), asm, cwd, linker, opts, elf))
+  if 'gcc_opts' in test:
+    cmd += test['gcc_opts']
+  if 'gen_opts' in test:
+    # Disable compressed instruction
+    if re.search('disable_compressed_instr=1', test['gen_opts']):
+      test_isa = re.sub("c",  "", test_isa)
+      #add z,s,x extensions to the isa if there are some
+      if isa_extension_list !=['none']:
+        for ext in isa_extension_list:
+          test_isa += (f"_{ext}")
+      isa_ext=test_isa
+  # If march/mabi is not defined in the test gcc_opts, use the default
+  # setting from the command line.
+  if not re.search('march', cmd):
+    cmd += (" -march=%s" % isa_ext)
+  if not re.search('mabi', cmd):
+    cmd += (" -mabi=%s" % mabi)
+  from cva6_scheduler import Job
+  return Job(elf, tagged(gcc_compile_test, step="gcc_compile", test=test['test'], iteration=i),
+             (asm, cmd, elf, binary, debug_cmd),
+             cost=job_cost(test['test'], step="gcc_compile"))
+
+
+def gcc_compile_test(asm, cmd, elf, binary, debug_cmd):
+  logging.info("Compiling test: %s" % asm)
+  objcopy = get_env_var("RISCV_OBJCOPY", debug_cmd = debug_cmd)
+  def build():
+    run_cmd_output(cmd.split(), debug_cmd = debug_cmd)
+    elf2bin(elf, binary, debug_cmd)
+  cached_build(cmd, [elf, binary], build, tool_id(objcopy))
+
+
+def cached_build(cmd, outputs, build, extra=""):
+  """Call build() to produce outputs unless they are found in the build cache
+
+  Args:
+    cmd     : Compiler command producing the outputs, used as the cache key
+    outputs : Files produced by the command
+    build   : Function producing the outputs
+    extra   : Other inputs of build(), e.g. the tools it runs after cmd
+  """
+  key = build_cache.command_key(cmd, outputs, extra) if build_cache else None
+  if key is None:
+    build()
+    return
+  if build_cache.fetch(key, outputs):
+    logging.info("Build cache hit: %s" % " ".join(outputs))
+    return
+  build()
+  build_cache.store(key, outputs)
 
 
 
 def tandem_postprocess(tandem_report, target, isa, test_name, log, testlist, iss, iterations = None):
   analyze_tandem_report(tandem_report)
-  process_verilator_sim_log(log, log + ".csv")
+  plugin(TRACE_CONVERTERS, "rtl")(log, log + ".csv")
   generate_yaml_report(tandem_report, target, isa, test_name, testlist, iss, False , iterations)
 
 def analyze_tandem_report(yaml_path):
   with open(yaml_path, 'r') as f:
       data = yaml.safe_load(f)
+  if data.get("aborted"):
+    logging.info("TANDEM Result : %s with %s mismatches" %
+                 (data["exit_cause"], data["mismatches_count"]))
+    return
   try:
     mismatches_count =  (data["mismatches_count"])
     instr_count = (data["instr_count"])
@@ -458,7 +770,9 @@ def generate_yaml_report(yaml_path, target, isa, test, testlist, iss, initial_cr
 
 
 def run_test(test, iss_yaml, isa, target, mabi, gcc_opts, iss_opts, output_dir,
-             setting_dir, debug_cmd, linker, priv, spike_params, test_name=None, iss_timeout=500, testlist="custom"):
+             setting_dir, debug_cmd, linker, priv, spike_params, test_name=None, iss_timeout=500, testlist="custom",
+             compare=True, own_work_dir=False, stop_on_first_error=False, reuse=True,
+             test_iteration=0):
   """Run a directed test with ISS
 
   Args:
@@ -478,6 +792,13 @@ def run_test(test, iss_yaml, isa, target, mabi, gcc_opts, iss_opts, output_dir,
     test_name   : (Optional) Name of the test
     iss_timeout : Timeout for ISS simulation (default: 500)
     testlist    : Test list identifier (default: "custom")
+    compare     : Compare the ISS logs. If False, only convert them and
+                  return the comparison, to be called by the main process
+    own_work_dir: Run each simulation from its own working directory
+    stop_on_first_error: Stop comparing the ISS logs at the first mismatch
+    reuse       : With --incremental, reuse the result recorded in the
+                  manifest of the test if its inputs are unchanged
+    test_iteration: Index of the --gen_sv_seed run
   """
   if testlist != None:
     testlist = testlist.split('/')[-1].strip("testlist_").split('.')[0]
@@ -496,14 +817,19 @@ def run_test(test, iss_yaml, isa, target, mabi, gcc_opts, iss_opts, output_dir,
   report = ("%s/iss_regr.log" % output_dir).rstrip()
   test = re.sub(r"^.*\/", "", test_path)
   test = re.sub(rf"\.{test_type}$", "", test)
+  test_log_name = test_name or test
+  tags = dict(test=test_log_name, iteration=test_iteration)
   prefix = (f"{output_dir}/directed_tests/{test}")
+  if log_format == 1:
+    # Seeds may run concurrently, each one compiles its own ELF
+    prefix += f"_{test_iteration}"
   if test_type == "o":
     elf = test_path
   else:
     elf = prefix + ".o"
 
   iss_list = iss_opts.split(",")
-  run_cmd("mkdir -p %s/directed_tests" % output_dir)
+  os.makedirs("%s/directed_tests" % output_dir, exist_ok=True)
 
   if test_type != "o":
     # gcc compilation
@@ -515,39 +841,146 @@ def run_test(test, iss_yaml, isa, target, mabi, gcc_opts, iss_opts, output_dir,
               linker, gcc_opts, elf))
     cmd += (" -march=%s" % isa)
     cmd += (" -mabi=%s" % mabi)
-    run_cmd(cmd, debug_cmd = debug_cmd)
+    with telemetry_tags(step="gcc_compile", **tags):
+      cached_build(cmd, [elf], lambda: run_cmd(cmd, debug_cmd = debug_cmd))
+  base_cmds = {iss: iss_base_cmd(iss, iss_yaml, isa, target, setting_dir, debug_cmd, priv, spike_params)
+               for iss in iss_list}
+  record = None
+  if manifest and len(iss_list) == 2 and not debug_cmd:
+    inputs = test_inputs(elf, target, base_cmds, iss_yaml, debug_cmd)
+    if inputs:
+      record = (manifest.key(cwd, test_log_name, test_iteration, target, isa, *iss_list),
+                test_log_name, inputs)
+      entry = manifest.lookup(record[0], inputs) if reuse else None
+      if entry:
+        logging.info("%s is unchanged, reusing its result: %s" %
+                     (test_log_name, entry['result'].strip()))
+        reused = functools.partial(report_reused_result, report, test_log_name, entry)
+        if not compare:
+          return reused
+        reused()
+        return
   log_list = []
   # ISS simulation
-  test_log_name = test_name or test
   for iss in iss_list:
     tandem_sim = iss != "spike" and os.environ.get('SPIKE_TANDEM') != None
-    run_cmd("mkdir -p %s/%s_sim" % (output_dir, iss))
+    os.makedirs("%s/%s_sim" % (output_dir, iss), exist_ok=True)
     if log_format == 1:
       log = ("%s/%s_sim/%s_%d.%s.log" % (output_dir, iss, test_log_name, test_iteration, target))
     else:
       log = ("%s/%s_sim/%s.%s.log" % (output_dir, iss, test_log_name, target))
-    yaml = ("%s/%s_sim/%s.%s.log.yaml" % (output_dir, iss, test_log_name, target))
+    # Seeds run concurrently each have their own tandem report
+    yaml = log + ".yaml"
+    iteration = test_iteration if log_format == 1 else None
     log_list.append(log)
-    base_cmd = parse_iss_yaml(iss, iss_yaml, isa, target, setting_dir, debug_cmd, priv, spike_params)
+    base_cmd = base_cmds[iss]
     print(elf)
-    cmd = get_iss_cmd(base_cmd, elf, target, log)
+    work_dir = log.replace(".log", ".work") if own_work_dir else None
+    cmd = get_iss_cmd(base_cmd, elf, target, log, work_dir)
     logging.info("[%0s] Running ISS simulation: %s" % (iss, cmd))
     if "spike" in iss: ratio = 10
     else: ratio = 1
     if tandem_sim:
-      generate_yaml_report(yaml, target, isa, test_log_name, testlist, iss, True)
-    run_cmd(cmd, iss_timeout//ratio, debug_cmd = debug_cmd)
+      generate_yaml_report(yaml, target, isa, test_log_name, testlist, iss, True, iteration)
+    timeout_s = sim_timeout(test_log_name, iss, iss_timeout//ratio)
+    with telemetry_tags(step="iss_sim", iss=iss, **tags):
+      run_iss_cmd(iss, cmd, elf, log, target, timeout_s, debug_cmd)
     logging.info("[%0s] Running ISS simulation: %s ...done" % (iss, elf))
 
     if tandem_sim:
-      tandem_postprocess(yaml, target, isa, test_log_name, log, testlist, iss)
+      tandem_postprocess(yaml, target, isa, test_log_name, log, testlist, iss, iteration)
 
   if len(iss_list) == 2:
-    compare_iss_log(iss_list, log_list, report)
+    with telemetry_tags(step="iss_cmp", **tags), timed_section("compare"):
+      if not compare:
+        return functools.partial(compare_iss_csv, iss_list,
+                                 iss_traces(iss_list, log_list, stop_on_first_error),
+                                 report, stop_on_first_error, record, test_log_name)
+      compare_iss_log(iss_list, log_list, report, stop_on_first_error, record=record,
+                      test=test_log_name)
+
+
+def test_inputs(elf, target, base_cmds, iss_yaml, debug_cmd):
+  """Get the inputs of a directed test recorded in its manifest
+
+  The inputs are the ELF, the configuration package and spike.yaml of the
+  target, the Makefile, and the command and simulation model of each ISS.
+  Models are identified by their size and mtime.
+
+  Returns:
+    inputs      : Dictionary of the inputs, None if an ISS has no model in the
+                  ISS YAML or its model is not built
+  """
+  cwd = os.path.dirname(os.path.realpath(__file__))
+  config_pkg = cwd + "/../../core/include/%s_config_pkg.sv" % target
+  spike_yaml = cwd + "/../../config/gen_from_riscv_config/%s/spike/spike.yaml" % target
+  inputs = {
+    "elf": hash_file(elf),
+    "config_pkg": hash_file(config_pkg) if os.path.isfile(config_pkg) else "",
+    "spike_yaml": hash_file(spike_yaml) if os.path.isfile(spike_yaml) else "",
+    "makefile": hash_file(cwd + "/Makefile"),
+    "trace_format": trace_ext,
+  }
+  for iss, base_cmd in base_cmds.items():
+    model = parse_iss_model(iss, iss_yaml, debug_cmd)
+    if not model or not os.path.isfile(model):
+      logging.info("No simulation model found for %s, the test is not incremental" % iss)
+      return None
+    inputs[iss] = {"cmd": base_cmd, "model": hash_tool(model)}
+  return inputs
+
+
+def report_reused_result(report, test, entry):
+  """Append the result recorded in the manifest of a test to the report"""
+  regr_report(report).add(test, entry['report'], entry['result'],
+                          header="Reused result of %s\n" % entry['date'], reused=True)
+  logging.info(entry['result'])
+
+
+def run_tests(test_runs, iss_opts, iss_yaml, jobs=1):
+  """Run directed tests, up to <jobs> of them in parallel
+
+  Args:
+    test_runs : List of (test name, args, kwargs) tuples, args and kwargs are
+                passed to run_test()
+    iss_opts  : Instruction set simulators the tests are run on
+    iss_yaml  : ISS configuration file in YAML format
+    jobs      : Maximum number of tests run in parallel
+  """
+  # The ISS of a test are run one after the other
+  resources = {}
+  for iss in iss_opts.split(","):
+    for resource, amount in parse_iss_resources(iss, iss_yaml).items():
+      resources[resource] = max(resources.get(resource, 0), amount)
+  # The first test not quarantined brings the simulation models up to date,
+  # --incremental always runs it.
+  first = next((i for i, (name, _, _) in enumerate(test_runs)
+                if not quarantined(name)), 0)
+  from cva6_scheduler import Job, run_jobs
+  test_jobs = []
+  for name, args, kwargs in test_runs:
+    if jobs > 1:
+      kwargs = dict(kwargs, compare=False, own_work_dir=True)
+    if len(test_jobs) == first:
+      kwargs = dict(kwargs, reuse=False)
+    if quarantined(name):
+      logging.info("%s is quarantined, running it last" % name)
+    test_jobs.append(Job(args[0], run_test, args, kwargs, done=compare_directed_test,
+                         cost=job_cost(name), resources=resources,
+                         priority=job_priority(name)))
+  # The first test also builds the simulation models: run it alone.
+  run_jobs(test_jobs[first:first + 1])
+  run_jobs(test_jobs[:first] + test_jobs[first + 1:], jobs, resource_budget)
+
+
+def compare_directed_test(comparison):
+  """Run the comparison returned by run_test(compare=False)"""
+  if comparison:
+    comparison()
 
 
 def iss_sim(test_list, output_dir, iss_list, iss_yaml, iss_opts,
-            isa, target, setting_dir, timeout_s, debug_cmd, priv, spike_params):
+            isa, target, setting_dir, timeout_s, debug_cmd, priv, spike_params, jobs=1):
   """Run ISS simulation with the generated test program
 
   Args:
@@ -560,39 +993,194 @@ def iss_sim(test_list, output_dir, iss_list, iss_yaml, iss_opts,
     setting_dir : Generator setting directory
     timeout_s   : Timeout limit in seconds
     debug_cmd   : Produce the debug cmd log without running
+    jobs        : Maximum number of simulations run in parallel
   """
+  from cva6_scheduler import run_jobs
   for iss in iss_list.split(","):
-    log_dir = ("%s/%s_sim" % (output_dir, iss))
-    base_cmd = parse_iss_yaml(iss, iss_yaml, isa, target, setting_dir, debug_cmd, priv, spike_params)
-    logging.info("%s sim log dir: %s" % (iss, log_dir))
-    run_cmd_output(["mkdir", "-p", log_dir])
-    tandem_sim = iss != "spike" and os.environ.get('SPIKE_TANDEM') != None
+    base_cmd = iss_sim_setup(iss, output_dir, iss_yaml, isa, target, setting_dir,
+                             debug_cmd, priv, spike_params)
+    sim_jobs = []
     for test in test_list:
-      if 'no_iss' in test and test['no_iss'] == 1:
-        continue
-      else:
-        for i in range(0, test['iterations']):
-          prefix = ("%s/asm_tests/%s_%d" % (output_dir, test['test'], i))
-          elf = prefix + ".o"
-          log = ("%s/%s_%d.%s.log" % (log_dir, test['test'], i, target))
-          cmd = get_iss_cmd(base_cmd, elf, target, log)
-          yaml = ("%s/%s_%s.%s.log.yaml" % (log_dir, test['test'], i, target))
-          if 'iss_opts' in test:
-            cmd += ' '
-            cmd += test['iss_opts']
-          logging.info("Running %s sim: %s" % (iss, elf))
-          if tandem_sim:
-            generate_yaml_report(yaml, target, isa, test['test'], "generated tests", iss, True, i)
-          if iss == "ovpsim":
-            run_cmd(cmd, timeout_s, check_return_code=False, debug_cmd = debug_cmd)
-          else:
-            run_cmd(cmd, timeout_s, debug_cmd = debug_cmd)
-          logging.debug(cmd)
-          if tandem_sim:
-            tandem_postprocess(yaml, target, isa, test['test'], log, "generated tests", iss, i)
+      for i in test_iterations(test):
+        job = iss_sim_job(iss, base_cmd, test, i, output_dir, isa, target,
+                          timeout_s, debug_cmd, jobs > 1,
+                          parse_iss_resources(iss, iss_yaml))
+        if job:
+          sim_jobs.append(job)
+    # The first simulation with the highest priority also builds the
+    # simulation model: run it alone.
+    first = max(range(len(sim_jobs)), key=lambda i: sim_jobs[i].priority, default=0)
+    run_jobs(sim_jobs[first:first + 1])
+    run_jobs(sim_jobs[:first] + sim_jobs[first + 1:], jobs, resource_budget)
+
+
+def iss_sim_setup(iss, output_dir, iss_yaml, isa, target, setting_dir, debug_cmd,
+                  priv, spike_params):
+  """Create the log directory of an ISS and return its base command"""
+  log_dir = ("%s/%s_sim" % (output_dir, iss))
+  base_cmd = iss_base_cmd(iss, iss_yaml, isa, target, setting_dir, debug_cmd, priv, spike_params)
+  logging.info("%s sim log dir: %s" % (iss, log_dir))
+  os.makedirs(log_dir, exist_ok=True)
+  return base_cmd
+
+
+def iss_sim_job(iss, base_cmd, test, i, output_dir, isa, target, timeout_s,
+                debug_cmd, own_work_dir=False, resources=None):
+  """Get the Job simulating one iteration of a generated test, see iss_sim()
+
+  resources are the resources used by the simulation, see parse_iss_resources().
+
+  Returns:
+    job        : Simulation job, None if the test is not run on ISS
+  """
+  if 'no_iss' in test and test['no_iss'] == 1:
+    return None
+  log_dir = ("%s/%s_sim" % (output_dir, iss))
+  tandem_sim = iss != "spike" and os.environ.get('SPIKE_TANDEM') != None
+  prefix = ("%s/asm_tests/%s_%d" % (output_dir, test['test'], i))
+  elf = prefix + ".o"
+  log = ("%s/%s_%d.%s.log" % (log_dir, test['test'], i, target))
+  work_dir = log.replace(".log", ".work") if own_work_dir else None
+  cmd = get_iss_cmd(base_cmd, elf, target, log, work_dir)
+  yaml = ("%s/%s_%s.%s.log.yaml" % (log_dir, test['test'], i, target))
+  if 'iss_opts' in test:
+    cmd += ' '
+    cmd += test['iss_opts']
+  from cva6_scheduler import Job
+  return Job(elf, tagged(iss_sim_test, step="iss_sim", test=test['test'], iteration=i, iss=iss),
+             (iss, cmd, elf, log, yaml, test['test'], i, isa, target,
+              sim_timeout(test['test'], iss, timeout_s), tandem_sim, debug_cmd),
+             cost=job_cost(test['test'], iss, "iss_sim"), resources=resources,
+             priority=job_priority(test['test']))
+
+
+def iss_sim_test(iss, cmd, elf, log, yaml, test_name, iteration, isa, target,
+                 timeout_s, tandem_sim, debug_cmd):
+  """Run one ISS simulation of a generated test, see iss_sim()"""
+  logging.info("Running %s sim: %s" % (iss, elf))
+  if tandem_sim:
+    generate_yaml_report(yaml, target, isa, test_name, "generated tests", iss, True, iteration)
+  if iss == "ovpsim":
+    run_cmd(cmd, timeout_s, check_return_code=False, debug_cmd = debug_cmd)
+  else:
+    run_iss_cmd(iss, cmd, elf, log, target, timeout_s, debug_cmd)
+  logging.debug(cmd)
+  if tandem_sim:
+    tandem_postprocess(yaml, target, isa, test_name, log, "generated tests", iss, iteration)
+
+
+def compress_iss_output(log, debug_cmd):
+  """Compress the raw output of an ISS command with --log_compress
+
+  The log itself is compressed while it is written by the ISS command, its
+  raw output is only complete once the command is done.
+  """
+  if log_compress and not debug_cmd:
+    compress_log(log + ".iss", log_compress)
+
 
+def run_iss_cmd(iss, cmd, elf, log, target, timeout_s, debug_cmd):
+  """Run an ISS simulation command, reusing Spike results from the ISS cache
 
-def iss_cmp(test_list, iss, target, output_dir, stop_on_first_error, exp, debug_cmd):
+  On a cache miss, the Spike log is converted to its trace CSV right away so
+  that the cache entry holds both and iss_cmp does not convert it again.
+
+  Args:
+    iss       : ISS name
+    cmd       : ISS simulation command, see get_iss_cmd()
+    elf       : ELF file simulated by the command
+    log       : ISS simulation log name
+    target    : Target name
+    timeout_s : Timeout limit in seconds
+    debug_cmd : Produce the debug cmd log without running
+  """
+  if iss != "spike" or iss_cache is None:
+    run_sim_cmd(iss, cmd, elf, log, timeout_s, debug_cmd)
+    compress_iss_output(log, debug_cmd)
+    return
+  outputs = [log, log + ".iss", log.replace(".log", trace_ext)]
+  key = spike_result_key(cmd, elf, log, target)
+  if iss_cache.fetch(key, outputs):
+    logging.info("ISS cache hit: %s" % log)
+    return
+  if run_sim_cmd(iss, cmd, elf, log, timeout_s, debug_cmd):
+    # Do not keep the truncated log of a simulation stopped by its timeout.
+    return
+  compress_iss_output(log, debug_cmd)
+  convert_iss_log(iss, log)
+  iss_cache.store(key, outputs)
+
+
+def run_sim_cmd(iss, cmd, elf, log, timeout_s, debug_cmd):
+  """Run an ISS simulation command, again if the infrastructure fails it
+
+  See JobPolicy.retry().
+
+  Returns:
+    timed_out : True if a Spike simulation was stopped by its timeout
+  """
+  if iss == "spike":
+    run = functools.partial(run_spike_cmd, cmd, elf, log, timeout_s, debug_cmd)
+    return job_policy.retry(run, log + ".iss") if job_policy else run()
+  if tandem_monitor is not None and os.environ.get('SPIKE_TANDEM') != None and not debug_cmd:
+    run = functools.partial(timed_command(tandem_monitor.run), cmd, log, timeout_s)
+  else:
+    run = functools.partial(run_cmd, cmd, timeout_s, debug_cmd = debug_cmd)
+  if job_policy:
+    job_policy.retry(run, log + ".iss")
+  else:
+    run()
+  return False
+
+
+def run_spike_cmd(cmd, elf, log, timeout_s, debug_cmd):
+  """Run a Spike simulation command, without make with --spike_worker
+
+  Like run_cmd(), timeouts are logged and a failing command exits.
+
+  Returns:
+    timed_out : True if the simulation was stopped by its timeout
+  """
+  if debug_cmd:
+    run_cmd(cmd, timeout_s, debug_cmd = debug_cmd)
+    return False
+  status = None
+  if spike_worker is not None:
+    status = timed_command(spike_worker.run)(cmd, elf, log, timeout_s)
+  if status is None:
+    from cva6_policy import run_command
+    status = timed_command(run_command)(cmd, timeout_s, executable="/bin/bash")
+  returncode, timed_out = status
+  if timed_out:
+    logging.error("Timeout[%ds]: %s" % (timeout_s, cmd))
+  elif returncode:
+    logging.error("ERROR return code: %d, cmd:%s" % (returncode, cmd))
+    sys.exit(RET_FAIL)
+  return timed_out
+
+
+def spike_result_key(cmd, elf, log, target):
+  """Get the ISS cache key of a Spike simulation
+
+  The key covers the ELF contents, the Spike binary, the spike.yaml of the
+  target, the Makefile running Spike and the command line itself, which holds
+  the ISA, privilege modes, --spike_params and step limit. The paths of the
+  output directory and of the working directory of parallel runs are left out.
+  """
+  cwd = os.path.dirname(os.path.realpath(__file__))
+  spike_yaml = cwd + "/../../config/gen_from_riscv_config/%s/spike/spike.yaml" % target
+  spike = get_env_var("SPIKE_PATH") + "/spike"
+  cmd = re.sub(r"^make -C \S+ -f \S+ ", "make ", cmd)
+  cmd = cmd.replace(elf, "<elf>").replace(log, "<log>")
+  output_dir = os.path.dirname(os.path.dirname(log))
+  if output_dir:
+    cmd = cmd.replace(output_dir, "<out>")
+  return iss_cache.key(cmd, hash_file(elf), hash_tool(spike),
+                       hash_file(spike_yaml) if os.path.isfile(spike_yaml) else "",
+                       hash_file(cwd + "/Makefile"), trace_ext)
+
+
+def iss_cmp(test_list, iss, target, output_dir, stop_on_first_error, exp, debug_cmd, jobs=1):
   """Compare ISS simulation reult
 
   Args:
@@ -602,65 +1190,243 @@ def iss_cmp(test_list, iss, target, output_dir, stop_on_first_error, exp, debug_
     stop_on_first_error : will end run on first error detected
     exp            : Use experimental version
     debug_cmd      : Produce the debug cmd log without running
+    jobs           : Maximum number of log conversions run in parallel
   """
   if debug_cmd:
     return
   iss_list = iss.split(",")
   if len(iss_list) != 2:
     return
+  from cva6_scheduler import run_jobs
   report = ("%s/iss_regr.log" % output_dir).rstrip()
+  cmp_jobs = []
   for test in test_list:
-    for i in range(0, test['iterations']):
-      elf = ("%s/asm_tests/%s_%d.o" % (output_dir, test['test'], i))
-      logging.info("Comparing ISS sim result %s/%s: %s" %
-                  (iss_list[0], iss_list[1], elf))
-      log_list = []
-      run_cmd(("echo 'Test binary: %s' >> %s" % (elf, report)))
-      for iss in iss_list:
-        log_list.append("%s/%s_sim/%s_%d.%s.log" % (output_dir, iss, test['test'], i, target))
-      compare_iss_log(iss_list, log_list, report, stop_on_first_error, exp)
+    for i in test_iterations(test):
+      cmp_jobs.append(iss_cmp_job(test, i, iss_list, target, output_dir, report,
+                                  stop_on_first_error))
+  run_jobs(cmp_jobs, jobs, resource_budget)
   save_regr_report(report)
 
 
-def compare_iss_log(iss_list, log_list, report, stop_on_first_error=0, exp=False):
+def iss_cmp_job(test, i, iss_list, target, output_dir, report, stop_on_first_error):
+  """Get the Job comparing the ISS logs of one generated test iteration"""
+  elf = ("%s/asm_tests/%s_%d.o" % (output_dir, test['test'], i))
+  log_list = []
+  for iss in iss_list:
+    log_list.append("%s/%s_sim/%s_%d.%s.log" % (output_dir, iss, test['test'], i, target))
+  # Logs are compared in the workers, the comparisons are appended to the
+  # report by the main process in test order.
+  from cva6_scheduler import Job
+  return Job(elf, tagged(iss_cmp_compare, step="iss_cmp", test=test['test'], iteration=i),
+             (elf, iss_list, log_list, stop_on_first_error),
+             done=functools.partial(iss_cmp_report, elf, report),
+             cost=job_cost(test['test'], step="iss_cmp"))
+
+
+def iss_cmp_compare(elf, iss_list, log_list, stop_on_first_error):
+  """Compare the ISS logs of a test, return the report and the result"""
+  logging.info("Comparing ISS sim result %s/%s: %s" %
+              (iss_list[0], iss_list[1], elf))
+  with timed_section("compare %s/%s" % (iss_list[0], iss_list[1])):
+    trace_list = iss_traces(iss_list, log_list, stop_on_first_error)
+    fd = io.StringIO()
+    result = plugin(COMPARATORS, "trace")(trace_list[0], trace_list[1], iss_list[0], iss_list[1], fd,
+                                          **compare_opts(iss_list, trace_list, stop_on_first_error))
+  return fd.getvalue(), result
+
+
+def iss_cmp_report(elf, report, comparison):
+  text, result = comparison
+  regr_report(report).add(elf, text, result, header="Test binary: %s\n" % elf)
+  logging.info(result)
+
+
+def trace_plugin_name(iss):
+  """Get the name of the trace converter and dialect of an ISS, see cva6_plugins"""
+  if "veri" in iss or "vsim" in iss or "vcs" in iss or "questa" in iss:
+    return "rtl"
+  return iss
+
+
+def iss_dialect(iss):
+  """Get the TraceDialect of the logs of an ISS, None if it has none"""
+  dialect = plugin(TRACE_DIALECTS, trace_plugin_name(iss))
+  return dialect() if dialect else None
+
+
+def convert_iss_log(iss, log, stop_on_first_error=0):
+  """Convert an ISS log to a trace file, return the trace file name
+
+  Spike and RTL simulation logs are converted to trace_ext files, the other
+  ISS logs to trace CSV files.
+  """
+  name = trace_plugin_name(iss)
+  csv = log.replace(".log", trace_ext if name in ("spike", "rtl") else ".csv");
+  if iss == "spike" and iss_cache and os.path.isfile(csv) and \
+     os.path.getmtime(csv) >= os.path.getmtime(log):
+    # Converted by run_iss_cmd() or taken from the ISS cache
+    logging.info("Trace CSV is up to date : {}".format(csv))
+    return csv
+  converter = plugin(TRACE_CONVERTERS, name)
+  if converter is None:
+    logging.error("Unsupported ISS %s" % iss)
+    sys.exit(RET_FAIL)
+  if iss == "ovpsim":
+    converter(log, csv, stop_on_first_error)
+  else:
+    converter(log, csv)
+  return csv
+
+
+def convert_iss_logs(iss_list, log_list, stop_on_first_error=0):
+  return [convert_iss_log(iss, log, stop_on_first_error)
+          for iss, log in zip(iss_list, log_list)]
+
+
+def iss_traces(iss_list, log_list, stop_on_first_error=0):
+  """Get the traces to compare for the ISS logs
+
+  When stopping on the first error, the logs which can be parsed while being
+  compared are not converted: only their start is read if they mismatch.
+  """
+  if stop_on_first_error and all(iss_dialect(iss) for iss in iss_list):
+    return log_list
+  return convert_iss_logs(iss_list, log_list, stop_on_first_error)
+
+
+def compare_opts(iss_list, trace_list, stop_on_first_error):
+  """Get the options of compare_traces() for the traces of iss_traces()"""
+  dialects = [iss_dialect(iss) if trace.endswith(".log") else None
+              for iss, trace in zip(iss_list, trace_list)]
+  return dict(dialect1=dialects[0], dialect2=dialects[1],
+              stop_on_first_error=stop_on_first_error,
+              context=divergence_context)
+
+
+def compare_iss_log(iss_list, log_list, report, stop_on_first_error=0, exp=False, record=None,
+                    test=None):
   if (len(iss_list) != 2 or len(log_list) != 2):
     logging.error("Only support comparing two ISS logs")
     logging.info("len(iss_list) = %s len(log_list) = %s" % (len(iss_list), len(log_list)))
   else:
-    csv_list = []
-    for i in range(2):
-      log = log_list[i]
-      csv = log.replace(".log", ".csv");
-      iss = iss_list[i]
-      csv_list.append(csv)
-      if iss == "spike":
-        process_spike_sim_log(log, csv)
-      elif "veri" in iss or "vsim" in iss or "vcs" in iss or "questa" in iss:
-        process_verilator_sim_log(log, csv)
-      elif iss == "ovpsim":
-        process_ovpsim_sim_log(log, csv, stop_on_first_error)
-      elif iss == "sail":
-        process_sail_sim_log(log, csv)
-      elif iss == "whisper":
-        process_whisper_sim_log(log, csv)
-      else:
-        logging.error("Unsupported ISS" % iss)
-        sys.exit(RET_FAIL)
-    result = compare_trace_csv(csv_list[0], csv_list[1], iss_list[0], iss_list[1], report)
-    logging.info(result)
+    trace_list = iss_traces(iss_list, log_list, stop_on_first_error)
+    compare_iss_csv(iss_list, trace_list, report, stop_on_first_error, record, test)
+
+
+def compare_iss_csv(iss_list, csv_list, report, stop_on_first_error=0, record=None,
+                    test=None):
+  """Compare the traces of iss_traces(), append the result to the report
+
+  record is the (key, test, inputs) of the test manifest updated with the
+  result, see run_test(). test names the comparison in the report records,
+  the first trace by default.
+  """
+  fd = io.StringIO()
+  result = plugin(COMPARATORS, "trace")(csv_list[0], csv_list[1], iss_list[0], iss_list[1], fd,
+                                        **compare_opts(iss_list, csv_list, stop_on_first_error))
+  regr_report(report).add(test or csv_list[0], fd.getvalue(), result)
+  logging.info(result)
+  if record:
+    key, test, inputs = record
+    manifest.store(key, test, inputs, result, fd.getvalue())
+
+
+def run_pipeline(test_list, argv, output_dir):
+  """Run the gcc_compile, iss_sim and iss_cmp steps test by test
+
+  Instead of waiting for a step to be done for all the tests before starting
+  the next one, each test iteration is compiled, simulated and compared as
+  soon as its own inputs are ready.
+
+  Args:
+    test_list  : List of generated tests
+    argv       : Configuration arguments
+    output_dir : Output directory of the ELF files
+  """
+  from cva6_scheduler import run_jobs
+  iss_list = argv.iss.split(",")
+  do_compile = step_enabled(argv.steps, "gcc_compile")
+  do_sim = step_enabled(argv.steps, "iss_sim")
+  do_cmp = step_enabled(argv.steps, "iss_cmp") and len(iss_list) == 2 and not argv.debug
+  report = ("%s/iss_regr.log" % output_dir).rstrip()
+  base_cmds = {}
+  if do_sim:
+    for iss in iss_list:
+      base_cmds[iss] = iss_sim_setup(iss, output_dir, argv.iss_yaml, argv.isa, argv.target,
+                                     argv.core_setting_dir, argv.debug, argv.priv,
+                                     argv.spike_params)
+  pipeline_jobs = []
+  # The first simulation of each ISS also builds the simulation model, the
+  # other ones wait for it: the quarantined tests, run last, come last.
+  first_sim = {}
+  for test in sorted(test_list, key=lambda test: -job_priority(test['test'])):
+    for i in test_iterations(test):
+      compile_job = None
+      if do_compile:
+        compile_job = gcc_compile_job(test, i, output_dir, argv.isa, argv.mabi,
+                                      argv.gcc_opts, argv.debug, argv.linker)
+        if compile_job:
+          pipeline_jobs.append(compile_job)
+      sim_jobs = []
+      if do_sim:
+        for iss in iss_list:
+          job = iss_sim_job(iss, base_cmds[iss], test, i, output_dir, argv.isa, argv.target,
+                            argv.iss_timeout, argv.debug, argv.jobs > 1,
+                            parse_iss_resources(iss, argv.iss_yaml))
+          if not job:
+            continue
+          job.deps = [dep for dep in (compile_job, first_sim.get(iss)) if dep]
+          first_sim.setdefault(iss, job)
+          sim_jobs.append(job)
+        pipeline_jobs += sim_jobs
+      if do_cmp:
+        job = iss_cmp_job(test, i, iss_list, argv.target, output_dir, report,
+                          argv.stop_on_first_error)
+        job.deps = sim_jobs if sim_jobs else [dep for dep in (compile_job,) if dep]
+        pipeline_jobs.append(job)
+  run_jobs(pipeline_jobs, argv.jobs, resource_budget)
+  if do_cmp:
+    save_regr_report(report)
+
+
+def job_cost(test, iss=None, step=None):
+  """Get the expected run time of a job in seconds, 0 if it is unknown
+
+  See RuntimeDB.estimate().
+  """
+  return runtime_db.estimate(test, iss, step) if runtime_db else 0.0
+
+
+def job_priority(test):
+  """Get the priority of the jobs of a test, see JobPolicy.priority()"""
+  return job_policy.priority(test) if job_policy else 0
+
+
+def quarantined(test):
+  return job_policy is not None and job_policy.quarantined(test)
+
+
+def sim_timeout(test, iss, timeout_s):
+  """Get the timeout of a simulation, see JobPolicy.timeout()"""
+  return job_policy.timeout(test, iss, timeout_s) if job_policy else timeout_s
+
+
+def step_enabled(steps, step):
+  """Check if a step is selected by the --steps argument"""
+  return steps == "all" or re.match(".*%s.*" % step, steps)
+
+
+def regr_report(report):
+  """Get the RegrReport of the report file at report"""
+  if report not in regr_reports:
+    regr_reports[report] = RegrReport(report)
+  return regr_reports[report]
 
 
 def save_regr_report(report):
-  passed_cnt = run_cmd(r"grep '\[PASSED\]' %s | wc -l" % report).strip()
-  failed_cnt = run_cmd(r"grep '\[FAILED\]' %s | wc -l" % report).strip()
-  summary = ("%s PASSED, %s FAILED" % (passed_cnt, failed_cnt))
-  logging.info(summary)
-  run_cmd(("echo %s >> %s" % (summary, report)))
-  if failed_cnt != "0":
-    failed_details = run_cmd(r"sed -e 's,.*_sim/,,' %s | grep '\(csv\|matched\)' | uniq | sed -e 'N;s/\\n/ /g' | grep '\[FAILED\]'" % report).strip()
-    logging.info(failed_details)
-    run_cmd(("echo %s >> %s" % (failed_details, report)))
-    #sys.exit(RET_FAIL) #Do not return error code in case of test fail.
+  for line in regr_report(report).save():
+    logging.info(line)
+  #sys.exit(RET_FAIL) #Do not return error code in case of test fail.
   logging.info("ISS regression report is saved to %s" % report)
 
 
@@ -678,6 +1444,12 @@ def read_seed(arg):
                                          .format(arg))
 
 
+def shard_arg(arg):
+  """Read --shard, see cva6_shard.parse_shard()"""
+  from cva6_shard import parse_shard
+  return parse_shard(arg)
+
+
 def parse_args(cwd):
   """Create a command line parser.
 
@@ -687,8 +1459,8 @@ def parse_args(cwd):
   parser = argparse.ArgumentParser()
 
   parser.add_argument("--target", type=str, default="rv32imc",
-                      help="Run the generator with pre-defined targets: \
-                            rv32imc, rv32i, rv32ima, rv64imc, rv64gc, rv64imac")
+                      help="Run the generator with pre-defined targets, \
+                            see cva6-targets.yaml, or hwconfig")
   parser.add_argument("-o", "--output", type=str,
                       help="Output directory name", dest="o")
   parser.add_argument("-tl", "--testlist", type=str, default="",
@@ -740,10 +1512,126 @@ def parse_args(cwd):
                       help="Any ISS command line arguments")
   parser.add_argument("--iss_timeout", type=int, default=500,
                       help="ISS sim timeout limit in seconds")
+  parser.add_argument("-j", "--jobs", type=int, default=1,
+                      help="Number of instruction generator runs, ISS/RTL \
+                            simulations and log conversions run in parallel on \
+                            the local machine")
+  parser.add_argument("--max_memory", type=int, default=0,
+                      help="Memory in MB shared by the parallel jobs, given the \
+                            memory of the simulations in the ISS YAML. The \
+                            physical memory of the machine by default")
+  parser.add_argument("--max_cores", type=int, default=0,
+                      help="Cores shared by the parallel jobs, given the cores \
+                            of the simulations in the ISS YAML. Only --jobs \
+                            limits them by default")
+  parser.add_argument("--licenses", type=parse_licenses, default={},
+                      help="Simulator licenses shared by the parallel jobs, \
+                            e.g. vcs=4,questa=2, given the licenses of the \
+                            simulations in the ISS YAML")
+  parser.add_argument("--build_cache", type=str, nargs="?", default="",
+                      const=default_cache_dir("build"),
+                      help="Reuse the test ELF/binary files compiled with the same \
+                            sources, linker script and options from an on-disk \
+                            cache, by default in ~/.cache/cva6/build")
+  parser.add_argument("--build_cache_size", type=int, default=2048,
+                      help="Size limit of the build cache in MB")
+  parser.add_argument("--iss_cache", type=str, nargs="?", default="",
+                      const=default_cache_dir("iss"),
+                      help="Reuse the Spike logs and trace CSV files of the same \
+                            ELF, ISA, priv, spike.yaml and --spike_params from an \
+                            on-disk cache, by default in ~/.cache/cva6/iss")
+  parser.add_argument("--iss_cache_size", type=int, default=8192,
+                      help="Size limit of the ISS cache in MB")
+  parser.add_argument("--incremental", type=str, nargs="?", default="",
+                      const=default_cache_dir("manifests"),
+                      help="Skip the directed tests whose ELF, target config \
+                            package, spike.yaml, ISS commands and simulation \
+                            models are unchanged since their last run and \
+                            reuse their recorded result. Manifests are kept in \
+                            ~/.cache/cva6/manifests by default")
+  parser.add_argument("--log_compress", type=str, default="",
+                      choices=[""] + list(COMPRESSORS),
+                      help="Compress the ISS simulation logs while they are \
+                            written, with gzip or zstd. Compressed logs are \
+                            read back transparently")
+  parser.add_argument("--spike_worker", action="store_true",
+                      help="Run the Spike recipe of the Makefile directly from \
+                            the jobs, expanded once with make --dry-run, instead \
+                            of starting make for each test")
+  parser.add_argument("--tandem_max_mismatches", type=int, default=0,
+                      help="With SPIKE_TANDEM, abort an RTL simulation once the \
+                            tandem scoreboard has reported this many mismatches \
+                            and report the test as failed. 0 runs the \
+                            simulations to their end")
+  parser.add_argument("--tandem_mismatch_re", type=str, default="",
+                      help="Regular expression of the tandem mismatch messages \
+                            counted by --tandem_max_mismatches, by default the \
+                            UVM_ERROR messages mentioning a mismatch")
+  parser.add_argument("--trace_format", type=str, default="csv",
+                      choices=["csv", "bin"],
+                      help="Format of the Spike and RTL simulation traces compared \
+                            by iss_cmp: csv, or bin for the columnar binary \
+                            format, which can be exported with cva6_trace_parser.py")
+  parser.add_argument("--telemetry", type=str, nargs="?", default=None, const="",
+                      help="Record the wall time, CPU time and peak RSS of each \
+                            command to a JSON lines file, by default \
+                            <output dir>/telemetry.jsonl, and log the slowest \
+                            ones at exit")
+  parser.add_argument("--telemetry_top", type=int, default=10,
+                      help="Number of slowest commands logged at exit")
+  parser.add_argument("--recheck_tools", "--recheck-tools", action="store_true",
+                      help="Run the version commands of the tools instead of \
+                            reusing their outputs kept in ~/.cache/cva6/tools")
+  parser.add_argument("--testlist_cache", type=str, nargs="?", default="",
+                      const=default_cache_dir("testlists"),
+                      help="Keep the index of the test lists, with their \
+                            imports and needs resolved, for the next runs and \
+                            shards. It is read again when a test list changes. \
+                            Indexes are kept in ~/.cache/cva6/testlists by default")
+  parser.add_argument("--runtime_db", type=str, nargs="?", default="",
+                      const=os.path.join(default_cache_dir("runtimes"), "runtimes.sqlite"),
+                      help="Record the runtime of each test, target and ISS in \
+                            an SQLite database, by default in \
+                            ~/.cache/cva6/runtimes/runtimes.sqlite. Parallel \
+                            jobs are started longest first and the end of the \
+                            regression is predicted from the runtimes of \
+                            earlier runs")
+  parser.add_argument("--timeout_factor", type=float, default=0,
+                      help="With --runtime_db, limit the ISS simulation timeout \
+                            of each test to the 99th percentile of its recorded \
+                            runtimes times this factor. 0 keeps the fixed \
+                            timeouts, which are the upper limit")
+  parser.add_argument("--min_timeout", type=int, default=60,
+                      help="Lower limit of the timeouts set by --timeout_factor, \
+                            in seconds")
+  parser.add_argument("--retries", type=int, default=1,
+                      help="Number of times an ISS simulation failing because of \
+                            the infrastructure (license, memory or disk errors) \
+                            is run again")
+  parser.add_argument("--quarantine", type=str, default="",
+                      help="YAML list of the known flaky tests, run after all \
+                            the other ones")
+  parser.add_argument("--shard", type=shard_arg, default=None,
+                      help="Only run the part K/N of the test list, balanced \
+                            with the runtimes recorded by earlier shards. \
+                            Merge the results of the shards with \
+                            cva6_shard.py merge")
+  parser.add_argument("--shard_runtimes", type=str, default=None,
+                      help="Runtimes file of the tests used by --shard, \
+                            updated by cva6_shard.py merge. All the shards \
+                            must read the same file, without it the tests \
+                            are balanced on their number of iterations")
+  parser.add_argument("--pipeline", action="store_true", default=False,
+                      help="Compile, simulate and compare each generated test \
+                            as soon as its inputs are ready instead of running \
+                            the gcc_compile, iss_sim and iss_cmp steps one \
+                            after the other")
   parser.add_argument("--iss_yaml", type=str, default="",
                       help="ISS setting YAML")
   parser.add_argument("--simulator_yaml", type=str, default="",
                       help="RTL simulator setting YAML")
+  parser.add_argument("--target_yaml", type=str, default="",
+                      help="Pre-defined targets YAML, cva6-targets.yaml by default")
   parser.add_argument("--csr_yaml", type=str, default="",
                       help="CSR description file")
   parser.add_argument("-ct", "--custom_target", type=str, default="",
@@ -762,12 +1650,23 @@ def parse_args(cwd):
                       help="Simulation log name suffix")
   parser.add_argument("--exp", action="store_true", default=False,
                       help="Run generator with experimental features")
+  parser.add_argument("--gen_batch", type=int, default=0,
+                      help="Generate up to this number of tests in one generator \
+                            run, packing the runs of the test list entries with \
+                            the same gen_test and gen_opts. The runs of one \
+                            entry are set by --batch_size and never packed \
+                            together. The programs are renamed after their \
+                            tests once generated. seed.yaml records each packed \
+                            run, which --seed_yaml generates again as a whole")
   parser.add_argument("-bz", "--batch_size", type=int, default=0,
                       help="Number of tests to generate per run. You can split a big"
                            " job to small batches with this option")
   parser.add_argument("--stop_on_first_error", dest="stop_on_first_error",
                       action="store_true", default=False,
                       help="Stop on detecting first error")
+  parser.add_argument("--divergence_context", type=int, default=5,
+                      help="Number of instructions of both traces reported \
+                            before their first mismatch")
   parser.add_argument("--noclean", action="store_true", default=True,
                       help="Do not clean the output of the previous runs")
   parser.add_argument("--verilog_style_check", action="store_true", default=False,
@@ -850,9 +1749,15 @@ def load_config(args, cwd):
   if not args.simulator_yaml:
     args.simulator_yaml = cwd + "/cva6-simulator.yaml"
 
+  if not args.target_yaml:
+    args.target_yaml = cwd + "/cva6-targets.yaml"
+  targets = target_registry(args.target_yaml)
+
   if not args.linker:
     my_link = Path(cwd + f"/../../config/gen_from_riscv_config/{args.target}/linker/link.ld")
-    if my_link.is_file():
+    if targets.get(args.target) and targets.get(args.target).linker:
+      args.linker = targets.get(args.target).linker
+    elif my_link.is_file():
       args.linker = cwd + f"/../../config/gen_from_riscv_config/{args.target}/linker/link.ld"
     else:
       args.linker = cwd + f"/../../config/gen_from_riscv_config/linker/link.ld"
@@ -867,87 +1772,27 @@ def load_config(args, cwd):
 
   base = ""
   if not args.custom_target:
-    if not args.testlist:
-      args.testlist = cwd + "/target/"+ args.target +"/testlist.yaml"
     if args.target == "hwconfig":
       base, changes = user_config.parse_derive_args(args.hwconfig_opts.split())
       input_file = f"../../core/include/{base}_config_pkg.sv"
       output_file = "../../core/include/hwconfig_config_pkg.sv"
       user_config.derive_config(input_file, output_file, changes)
       args.hwconfig_opts = user_config.get_config(output_file)
-      os.system("mkdir -p ../../config/gen_from_riscv_config/hwconfig/spike")
-      os.system("mkdir -p ../../config/gen_from_riscv_config/hwconfig/linker")
-      os.system("cp ../../config/gen_from_riscv_config/%s/spike/spike.yaml ../../config/gen_from_riscv_config/hwconfig/spike/" % (base))
-      os.system("cp ../../config/gen_from_riscv_config/%s/linker/*.ld ../../config/gen_from_riscv_config/hwconfig/linker/" % (base))
+      copy_target_config("../../config/gen_from_riscv_config", base, "hwconfig")
     else:
       base = args.target
-    if base in ("cv64a6_imafdch_sv39", "cv64a6_imafdch_sv39_wb"):
-      args.mabi = "lp64d"
-      args.isa  = "rv64gch_zba_zbb_zbs_zbc"
-    elif base in ("cv64a6_imafdc_sv39_wb"):
-      args.mabi = "lp64d"
-      args.isa  = "rv64gc_zba_zbb_zbs_zbc"
-    elif base in ("cv64a6_imafdc_sv39", "cv64a6_imafdc_sv39_hpdcache", "cv64a6_imafdc_sv39_hpdcache_wb"):
-      args.mabi = "lp64d"
-      args.isa  = "rv64gc_zba_zbb_zbs_zbc_zbkb"
-    elif base == "cv32a60x":
-      args.mabi = "ilp32"
-      args.isa  = "rv32imc_zba_zbb_zbs_zbc"
-      args.priv  = "m"
-    elif base == "cv32a65x":
-      args.mabi = "ilp32"
-      args.isa  = "rv32imc_zba_zbb_zbs_zbc"
-      args.priv  = "m"
-    elif base == "cv64a6_mmu":
-      args.mabi = "lp64"
-      args.isa  = "rv64imac_zba_zbb_zbs_zbc"
-    elif base == "cv32a6_imac_sv0":
-      args.mabi = "ilp32"
-      args.isa  = "rv32imac"
-    elif base == "cv32a6_imac_sv32":
-      args.mabi = "ilp32"
-      args.isa  = "rv32imac_zbkb"
-    elif base == "cv32a6_imafc_sv32":
-      args.mabi = "ilp32f"
-      args.isa  = "rv32imafc"
-    elif base == "rv32imc":
-      args.mabi = "ilp32"
-      args.isa  = "rv32imc"
-    elif base == "rv32imac":
-      args.mabi = "ilp32"
-      args.isa  = "rv32imac"
-    elif base == "rv32ima":
-      args.mabi = "ilp32"
-      args.isa  = "rv32ima"
-    elif base == "rv32gc":
-      args.mabi = "ilp32f"
-      args.isa  = "rv32gc"
-    elif base == "multi_harts":
-      args.mabi = "ilp32f"
-      args.isa  = "rv32gc"
-    elif base == "rv32imcb":
-      args.mabi = "ilp32"
-      args.isa  = "rv32imcb"
-    elif base == "rv32i":
-      args.mabi = "ilp32"
-      args.isa  = "rv32i"
-    elif base == "rv64imc":
-      args.mabi = "lp64"
-      args.isa  = "rv64imc"
-    elif base == "rv64gc":
-      args.mabi = "lp64d"
-      args.isa  = "rv64gc"
-    elif base == "rv64imac":
-      args.mabi = "lp64"
-      args.isa = "rv64imac"
-    elif base == "rv64gcv":
-      args.mabi = "lp64d"
-      args.isa  = "rv64gcv"
-    elif base == "ml":
-      args.mabi = "lp64"
-      args.isa  = "rv64imc"
-    else:
+    target = targets.get(base)
+    if not target:
       sys.exit("Unsupported pre-defined target: %0s" % args.target)
+    if not args.testlist:
+      if target.testlist and args.target != "hwconfig":
+        args.testlist = target.testlist
+      else:
+        args.testlist = cwd + "/target/"+ args.target +"/testlist.yaml"
+    args.mabi = target.mabi
+    args.isa = target.isa
+    if target.priv:
+      args.priv = target.priv
     args.core_setting_dir = cwd + "/dv" + "/target/"+ args.isa
   else:
     if re.match(".*gcc_compile.*", args.steps) or re.match(".*iss_sim.*", args.steps):
@@ -972,11 +1817,21 @@ def incorrect_version_exit(tool, tool_version, required_version):
   sys.exit(RET_FAIL)
 
 
-def check_cc_version():
+def run_version_cmd(versions, cmd, deps):
+  """Run a tool version command with the outputs kept by versions, exit on error"""
+  returncode, stdout, stderr = versions.run(cmd, deps)
+  if returncode != 0:
+    logging.error("ERROR return code: %d, cmd:%s" % (returncode, cmd))
+    logging.error(stdout + stderr)
+    sys.exit(RET_FAIL)
+  return stdout
+
+
+def check_cc_version(versions):
   REQUIRED_GCC_VERSION = 11
 
   cc_path = get_env_var("RISCV_CC")
-  cc_version = run_cmd(f"{cc_path} --version")
+  cc_version = run_version_cmd(versions, f"{cc_path} --version", [shutil.which(cc_path)])
   cc_version_string = cc_version.split("\n")[0].split(" ")[2]
   cc_version_number = re.split(r'\D+', cc_version_string)
 
@@ -986,18 +1841,22 @@ def check_cc_version():
     incorrect_version_exit("GCC", cc_version_string, f">={REQUIRED_GCC_VERSION}")
 
 
-def check_spike_version():
+def check_spike_version(versions):
   # Get Spike hash from core-v-verif submodule
-  spike_hash = subprocess.run('git log -1 --pretty=tformat:%h', capture_output=True, text=True, shell=True, cwd=os.environ.get("SPIKE_SRC_DIR"))
-  spike_version = "1.1.1-dev " + spike_hash.stdout.strip()
+  spike_src_dir = os.environ.get("SPIKE_SRC_DIR")
+  _, spike_hash, _ = versions.run('git log -1 --pretty=tformat:%h',
+                                  git_head_files(spike_src_dir) if spike_src_dir else [],
+                                  cwd=spike_src_dir)
+  spike_version = "1.1.1-dev " + spike_hash.strip()
 
   # Get Spike User version
-  get_env_var("SPIKE_PATH")
-  user_spike_version = subprocess.run("$SPIKE_PATH/spike -v", capture_output=True, text=True, shell=True)
-  user_spike_stdout_string = user_spike_version.stdout.strip()
-  user_spike_stderr_string = user_spike_version.stderr.strip()
+  spike_path = get_env_var("SPIKE_PATH")
+  returncode, user_spike_stdout, user_spike_stderr = versions.run(
+    "$SPIKE_PATH/spike -v", [os.path.join(spike_path, "spike")])
+  user_spike_stdout_string = user_spike_stdout.strip()
+  user_spike_stderr_string = user_spike_stderr.strip()
 
-  if user_spike_version.returncode != 0:
+  if returncode != 0:
     # Re-run 'spike -v' and print contents of stdout and stderr.
     logging.info("Spike version check ('$SPIKE_PATH/spike -v')")
     logging.info(f"- stdout:\n\n{user_spike_stdout_string}\n")
@@ -1029,10 +1888,11 @@ def check_spike_version():
     incorrect_version_exit("Spike", user_spike_stderr_string, spike_version)
 
 
-def check_verilator_version():
+def check_verilator_version(versions):
   REQUIRED_VERILATOR_VERSION = "5.008"
 
-  verilator_version_string = run_cmd("verilator --version")
+  verilator_version_string = run_version_cmd(versions, "verilator --version",
+                                             [shutil.which("verilator")])
   logging.info(f"Verilator Version: {verilator_version_string.strip()}")
   verilator_version = verilator_version_string.split(" ")[1]
 
@@ -1040,53 +1900,24 @@ def check_verilator_version():
     incorrect_version_exit("Verilator", verilator_version, REQUIRED_VERILATOR_VERSION)
 
 
-def check_tools_version():
-  check_cc_version()
-  check_spike_version()
-  check_verilator_version()
-
+def check_tools_version(recheck=False):
+  """Check the versions of the tools
 
-def openhw_process_regression_list(testlist, test, iterations, matched_list,
-                            riscv_dv_root):
-    """ Get the matched tests from the regression test list
-
-    Args:
-      testlist      : Regression test list
-      test          : Test to run, "all" means all tests in the list
-      iterations    : Number of iterations for each test
-      riscv_dv_root : Root directory of RISCV-DV
-
-    Returns:
-      matched_list : A list of matched tests
-    """
-    logging.info(
-        "Processing regression test list : {}, test: {}".format(testlist, test))
-    yaml_data = read_yaml(testlist)
-    mult_test = test.split(',')
-    if 'testlist' in yaml_data and isinstance(yaml_data['testlist'], list):
-        yaml_testlist = yaml_data['testlist']
-    else:
-        yaml_testlist = yaml_data
-    for entry in yaml_testlist:
-        if 'import' in entry:
-            sub_list = re.sub('<riscv_dv_root>', riscv_dv_root, entry['import'])
-            openhw_process_regression_list(sub_list, test, iterations, matched_list,
-                                    riscv_dv_root)
-        else:
-            if (entry['test'] in mult_test) or (test == "all"):
-                if iterations > 0 and entry['iterations'] > 0:
-                    entry['iterations'] = iterations
-                if entry['iterations'] > 0:
-                    logging.info("Found matched tests: {}, iterations:{}".format(
-                      entry['test'], entry['iterations']))
-                    matched_list.append(entry)
+  The outputs of the version commands are kept in ~/.cache/cva6/tools and
+  reused until a tool binary (or the Spike sources) changes, unless recheck is
+  set.
+  """
+  versions = ToolVersions(os.path.join(default_cache_dir("tools"), "versions.json"),
+                          recheck=recheck)
+  check_cc_version(versions)
+  check_spike_version(versions)
+  check_verilator_version(versions)
 
 
 def main():
   """This is the main entry point."""
   try:
     global issrun_opts
-    global test_iteration
     global log_format
     cwd = os.path.dirname(os.path.realpath(__file__))
     args = parse_args(cwd)
@@ -1136,7 +1967,7 @@ def main():
         # Join the list back into a string
         args.iss = ','.join(args_list)
 
-    check_tools_version()
+    check_tools_version(args.recheck_tools)
 
     # create file handler which logs even debug messages13.1.1
     fh = logging.FileHandler('logfile.log')
@@ -1149,6 +1980,75 @@ def main():
     # Create output directory
     output_dir = create_output(args.o, args.noclean, cwd+"/out_")
 
+    global build_cache
+    if args.build_cache and not args.debug:
+      build_cache = FileCache(args.build_cache, args.build_cache_size << 20)
+    global iss_cache
+    if args.iss_cache and not args.debug:
+      iss_cache = FileCache(args.iss_cache, args.iss_cache_size << 20, "ISS")
+    global trace_ext
+    trace_ext = TRACE_BIN_EXT if args.trace_format == "bin" else ".csv"
+    global divergence_context
+    divergence_context = args.divergence_context
+    global manifest
+    if args.incremental and not args.debug:
+      manifest = Manifest(args.incremental)
+    global log_compress
+    if args.log_compress and not shutil.which(args.log_compress):
+      logging.error("%s not found, required by --log_compress" % args.log_compress)
+      sys.exit(RET_FAIL)
+    log_compress = args.log_compress
+    global testlist_cache
+    testlist_cache = args.testlist_cache
+    global spike_worker
+    if args.spike_worker:
+      from cva6_spike_worker import SpikeWorker
+      spike_worker = SpikeWorker()
+    global tandem_monitor
+    if args.tandem_max_mismatches > 0:
+      from cva6_tandem_monitor import MISMATCH_RE, TandemMonitor
+      pattern = args.tandem_mismatch_re or MISMATCH_RE
+      try:
+        re.compile(pattern)
+      except re.error as exc:
+        logging.error("Invalid --tandem_mismatch_re: %s" % exc)
+        sys.exit(RET_FAIL)
+      tandem_monitor = TandemMonitor(args.tandem_max_mismatches, pattern)
+    global resource_budget
+    from cva6_scheduler import total_memory_mb
+    resource_budget = dict(args.licenses)
+    if args.max_memory > 0 or total_memory_mb():
+      resource_budget["memory"] = args.max_memory if args.max_memory > 0 else total_memory_mb()
+    if args.max_cores > 0:
+      resource_budget["cores"] = args.max_cores
+    global runtime_db
+    if args.runtime_db and not args.debug:
+      # sqlite3 is only imported by the runs which use it
+      from cva6_runtime_db import RuntimeDB
+      runtime_db = RuntimeDB(args.runtime_db, args.target)
+    global job_policy
+    if args.timeout_factor and not runtime_db:
+      logging.warning("--timeout_factor has no effect without --runtime_db")
+    if args.timeout_factor or args.retries > 0 or args.quarantine:
+      from cva6_policy import JobPolicy, read_quarantine
+      job_policy = JobPolicy(runtime_db, args.timeout_factor, args.min_timeout,
+                             max(args.retries, 0),
+                             read_quarantine(args.quarantine) if args.quarantine else [])
+    if (args.telemetry is not None or args.shard or runtime_db) and not args.debug:
+      # The runtimes of the tests are taken from the telemetry
+      start_telemetry(args.telemetry or output_dir + "/telemetry.jsonl",
+                      args.telemetry_top if args.telemetry is not None else 0)
+    shard_lists = []
+
+    if args.jobs > 1:
+      if args.debug:
+        # The debug command log is written by the main process only
+        logging.info("Debug command log requested, running jobs sequentially")
+        args.jobs = 1
+      else:
+        # Parallel simulations are run from their own working directory
+        output_dir = os.path.abspath(output_dir)
+
     #add z,s,x extensions to the isa if there are some
     if isa_extension_list !=['']:
       for i in isa_extension_list:
@@ -1160,129 +2060,154 @@ def main():
       style_err = run_cmd("verilog_style/run.sh")
       if style_err: logging.info("Found style error: \nERROR: " + style_err)
 
+    # The plan of the regression is built once: the tests to run and the
+    # directed test runs, then it is run for each --gen_sv_seed seed.
+    test_runs = []
+    # Run any handcoded/directed tests specified by args
+    tests = ""
+    if args.c_tests != "":
+      tests = args.c_tests.split(',')
+    elif args.elf_tests != "":
+      tests = args.elf_tests.split(',')
+    elif args.asm_tests != "":
+      tests = args.asm_tests.split(',')
+    if tests !=  "":
+      for path_test in tests:
+        full_path = os.path.expanduser(path_test)
+        # path_c_test is a c file
+        if os.path.isfile(full_path) or args.debug:
+          test_name = os.path.splitext(os.path.basename(full_path))[0]
+          test_args = (full_path, args.iss_yaml, args.isa, args.target, args.mabi, args.gcc_opts,
+                       args.iss, output_dir, args.core_setting_dir, args.debug, args.linker,
+                       args.priv, args.spike_params)
+          test_runs.append((test_name, test_args, dict(iss_timeout=args.iss_timeout,
+                            stop_on_first_error=args.stop_on_first_error)))
+        else:
+          logging.error('%s does not exist or is not a file' % full_path)
+          sys.exit(RET_FAIL)
+
+    os.makedirs("%s/asm_tests" % output_dir, exist_ok=True)
+    # Process regression test list
+    matched_list = []
+    # Any tests in the YAML test list that specify a directed assembly test
+    asm_directed_list = []
+    # Any tests in the YAML test list that specify a directed c test
+    c_directed_list = []
+
+    if not tests and not args.co:
+      logging.info('CVA6 Configuration is %s and target is %s'% (args.hwconfig_opts, args.target))
+      logging.info("Processing regression test list : {}, test: {}".format(args.testlist, args.test))
+      # The index is only read again if a test list changed
+      from cva6_testlist import testlist_index
+      index = testlist_index(args.testlist, cwd, testlist_cache)
+      matched_list = index.select(args.test, args.iterations, args.hwconfig_opts)
+      for t in list(matched_list):
+        try:
+          t['gcc_opts'] = re.sub(r"\<path_var\>", get_env_var(t['path_var']), t['gcc_opts'])
+        except KeyError:
+          continue
+
+        # Check mutual exclusive between gen_test, asm_tests, and c_tests
+        if 'asm_tests' in t:
+          if 'gen_test' in t or 'c_tests' in t:
+            logging.error('asm_tests must not be defined in the testlist '
+                          'together with the gen_test or c_tests field')
+            sys.exit(RET_FATAL)
+          t['asm_tests'] = re.sub(r"\<path_var\>", get_env_var(t['path_var']), t['asm_tests'])
+          asm_directed_list.append(t)
+          matched_list.remove(t)
+
+        if 'c_tests' in t:
+          if 'gen_test' in t or 'asm_tests' in t:
+            logging.error('c_tests must not be defined in the testlist '
+                          'together with the gen_test or asm_tests field')
+            sys.exit(RET_FATAL)
+          t['c_tests'] = re.sub(r"\<path_var\>", get_env_var(t['path_var']), t['c_tests'])
+          c_directed_list.append(t)
+          matched_list.remove(t)
+
+      if len(matched_list) == 0 and len(asm_directed_list) == 0 and len(c_directed_list) == 0:
+        sys.exit("Cannot find %s in %s" % (args.test, args.testlist))
+
+      if args.shard:
+        from cva6_shard import select_shard
+        select_shard([matched_list, asm_directed_list, c_directed_list], args.shard,
+                     args.shard_runtimes, args.batch_size)
+        shard_lists += [matched_list, asm_directed_list, c_directed_list] * args.gen_sv_seed
+
+      for t in c_directed_list:
+        copy = re.sub(r'(.*)\/(.*).c$', r'cp \1/\2.c \1/', t['c_tests'])+t['test']+'.c'
+        run_cmd("%s" % copy)
+        t['c_tests'] = re.sub(r'(.*)\/(.*).c$', r'\1/', t['c_tests'])+t['test']+'.c'
+
+    run_gen = args.steps == "all" or re.match(".*gen.*", args.steps)
+    if run_gen:
+      # Run any handcoded/directed tests specified in YAML format
+      for test_entry in asm_directed_list:
+        gcc_opts = args.gcc_opts
+        gcc_opts += test_entry.get('gcc_opts', '')
+        path_test = os.path.expanduser(test_entry.get('asm_tests'))
+        if path_test:
+          # path_test is an assembly file
+          if os.path.isfile(path_test):
+            test_args = (path_test, args.iss_yaml, args.isa, args.target, args.mabi, gcc_opts,
+                         args.iss, output_dir, args.core_setting_dir, args.debug, args.linker,
+                         args.priv, args.spike_params, test_entry['test'])
+            test_runs.append((test_entry['test'], test_args,
+                              dict(iss_timeout=args.iss_timeout, testlist=args.testlist,
+                                   stop_on_first_error=args.stop_on_first_error)))
+          else:
+            if not args.debug:
+              logging.error('%s does not exist' % path_test)
+              sys.exit(RET_FAIL)
+
+    # The directed tests of all the seeds are run together, each seed has
+    # its own ELF and logs.
+    if test_runs:
+      run_tests([(name, test_args, dict(kwargs, test_iteration=i))
+                 for i in range(args.gen_sv_seed) for name, test_args, kwargs in test_runs],
+                args.iss, args.iss_yaml, args.jobs)
+
+    # Generated tests are named after the test list entries only: their seeds
+    # are run one after the other.
     for i in range(args.gen_sv_seed):
-      test_executed = 0
-      test_iteration = i
       print("")
       logging.info("Iteration number: %s" % (i+1))
 
-      # Run any handcoded/directed tests specified by args
-      tests = ""
-      if args.c_tests != "":
-        tests = args.c_tests.split(',')
-      elif args.elf_tests != "":
-        tests = args.elf_tests.split(',')
-      elif args.asm_tests != "":
-        tests = args.asm_tests.split(',')
-      if tests !=  "":
-        for path_test in tests:
-          full_path = os.path.expanduser(path_test)
-          # path_c_test is a c file
-          if os.path.isfile(full_path) or args.debug:
-            run_test(full_path, args.iss_yaml, args.isa, args.target, args.mabi, args.gcc_opts,
-                  args.iss, output_dir, args.core_setting_dir, args.debug, args.linker,
-                  args.priv, args.spike_params, iss_timeout=args.iss_timeout)
-          else:
-            logging.error('%s does not exist or is not a file' % full_path)
-            sys.exit(RET_FAIL)
-          test_executed = 1
-
-      run_cmd_output(["mkdir", "-p", ("%s/asm_tests" % output_dir)])
-      # Process regression test list
-      matched_list = []
-      # Any tests in the YAML test list that specify a directed assembly test
-      asm_directed_list = []
-      # Any tests in the YAML test list that specify a directed c test
-      c_directed_list = []
-
-      if test_executed ==0:
-        if not args.co:
-          openhw_process_regression_list(args.testlist, args.test, args.iterations, matched_list, cwd)
-          logging.info('CVA6 Configuration is %s and target is %s'% (args.hwconfig_opts, args.target))
-          for entry in list(matched_list):
-            yaml_needs = entry["needs"] if "needs" in entry else []
-            if yaml_needs:
-              needs = dict()
-              for i in range(len(yaml_needs)):
-                needs.update(yaml_needs[i])
-              for keys in needs.keys():
-                if args.hwconfig_opts[keys] != needs[keys]:
-                  logging.info('Removing test %s CVA6 configuration can not run it' % entry['test'])
-                  matched_list.remove(entry)
-                  break
-          for t in list(matched_list):
-            try:
-              t['gcc_opts'] = re.sub(r"\<path_var\>", get_env_var(t['path_var']), t['gcc_opts'])
-            except KeyError:
-              continue
-
-            # Check mutual exclusive between gen_test, asm_tests, and c_tests
-            if 'asm_tests' in t:
-              if 'gen_test' in t or 'c_tests' in t:
-                logging.error('asm_tests must not be defined in the testlist '
-                              'together with the gen_test or c_tests field')
-                sys.exit(RET_FATAL)
-              t['asm_tests'] = re.sub(r"\<path_var\>", get_env_var(t['path_var']), t['asm_tests'])
-              asm_directed_list.append(t)
-              matched_list.remove(t)
-
-            if 'c_tests' in t:
-              if 'gen_test' in t or 'asm_tests' in t:
-                logging.error('c_tests must not be defined in the testlist '
-                              'together with the gen_test or asm_tests field')
-                sys.exit(RET_FATAL)
-              t['c_tests'] = re.sub(r"\<path_var\>", get_env_var(t['path_var']), t['c_tests'])
-              c_directed_list.append(t)
-              matched_list.remove(t)
-
-          if len(matched_list) == 0 and len(asm_directed_list) == 0 and len(c_directed_list) == 0:
-            sys.exit("Cannot find %s in %s" % (args.test, args.testlist))
-
-          for t in c_directed_list:
-            copy = re.sub(r'(.*)\/(.*).c$', r'cp \1/\2.c \1/', t['c_tests'])+t['test']+'.c'
-            run_cmd("%s" % copy)
-            t['c_tests'] = re.sub(r'(.*)\/(.*).c$', r'\1/', t['c_tests'])+t['test']+'.c'
-
-      directed_tests_list = asm_directed_list + c_directed_list
-      # Run instruction generator
-      if args.steps == "all" or re.match(".*gen.*", args.steps):
-        # Run any handcoded/directed tests specified in YAML format
-        if len(directed_tests_list) != 0:
-          for test_entry in asm_directed_list:
-            gcc_opts = args.gcc_opts
-            gcc_opts += test_entry.get('gcc_opts', '')
-            path_test = os.path.expanduser(test_entry.get('asm_tests'))
-            if path_test:
-              # path_test is an assembly file
-              if os.path.isfile(path_test):
-                run_test(path_test, args.iss_yaml, args.isa, args.target, args.mabi, gcc_opts,
-                             args.iss, output_dir, args.core_setting_dir, args.debug, args.linker,
-                             args.priv, args.spike_params, test_entry['test'], iss_timeout=args.iss_timeout, testlist=args.testlist)
-              else:
-                if not args.debug:
-                  logging.error('%s does not exist' % path_test)
-                  sys.exit(RET_FAIL)
-
+      if run_gen:
         # Run remaining tests using the instruction generator
         gen(matched_list, args, output_dir, cwd)
 
-      if not args.co:
+      if not args.co and args.pipeline:
+        # Compile, simulate and compare the tests as a dependency graph
+        run_pipeline(matched_list, args, output_dir)
+      elif not args.co:
         # Compile the assembly program to ELF, convert to plain binary
-        if args.steps == "all" or re.match(".*gcc_compile.*", args.steps):
+        if step_enabled(args.steps, "gcc_compile"):
           gcc_compile(matched_list, output_dir, args.isa, args.mabi,
-                      args.gcc_opts, args.debug, args.linker)
+                      args.gcc_opts, args.debug, args.linker, args.jobs)
 
         # Run ISS simulation
-        if args.steps == "all" or re.match(".*iss_sim.*", args.steps):
+        if step_enabled(args.steps, "iss_sim"):
           iss_sim(matched_list, output_dir, args.iss, args.iss_yaml, args.iss_opts,
                   args.isa, args.target, args.core_setting_dir, args.iss_timeout, args.debug,
-                  args.priv, args.spike_params)
+                  args.priv, args.spike_params, args.jobs)
 
         # Compare ISS simulation result
-        if args.steps == "all" or re.match(".*iss_cmp.*", args.steps):
+        if step_enabled(args.steps, "iss_cmp"):
           iss_cmp(matched_list, args.iss, args.target, output_dir, args.stop_on_first_error,
-                  args.exp, args.debug)
-
+                  args.exp, args.debug, args.jobs)
+
+    if args.shard and not args.debug:
+      from cva6_shard import record_runtimes
+      record_runtimes(run_records(), shard_lists, output_dir)
+    if runtime_db:
+      runtime_db.update(run_records())
+      runtime_db.close()
+    if build_cache:
+      logging.info(build_cache.summary())
+    if iss_cache:
+      logging.info(iss_cache.summary())
     sys.exit(RET_SUCCESS)
   except KeyboardInterrupt:
     logging.info("\nExited Ctrl-C from user request.")
@@ -0,0 +1,283 @@
+# Copyright 2024 Thales DIS France SAS
+#
+# Licensed under the Solderpad Hardware Licence, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# SPDX-License-Identifier: Apache-2.0 WITH SHL-2.0
+# You may obtain a copy of the License at https://solderpad.org/licenses/
+
+"""
+Content-addressed on-disk cache for the files produced by cva6.py steps
+"""
+
+import hashlib
+import json
+import os
+import re
+import shlex
+import shutil
+import subprocess
+import tempfile
+
+
+def default_cache_dir(name):
+  """Get the default directory of a cache under the user cache directory"""
+  base = os.environ.get("XDG_CACHE_HOME") or os.path.expanduser("~/.cache")
+  return os.path.join(base, "cva6", name)
+
+
+_file_hashes = {}
+
+def hash_file(path):
+  """Get the SHA-256 of a file, memoized on its path, size and mtime"""
+  st = os.stat(path)
+  memo_key = (os.path.abspath(path), st.st_size, st.st_mtime_ns)
+  if memo_key not in _file_hashes:
+    h = hashlib.sha256()
+    with open(path, "rb") as f:
+      for chunk in iter(lambda: f.read(1 << 20), b""):
+        h.update(chunk)
+    _file_hashes[memo_key] = h.hexdigest()
+  return _file_hashes[memo_key]
+
+
+def hash_tool(path):
+  """Identify a tool binary by its path, size and mtime"""
+  st = os.stat(path)
+  return "%s:%d:%d" % (os.path.realpath(path), st.st_size, st.st_mtime_ns)
+
+
+def tool_id(name):
+  """Identify a tool given by its path or looked up in PATH, see hash_tool()"""
+  path = shutil.which(name)
+  return hash_tool(path) if path else name
+
+
+def compiler_deps(args):
+  """Get the files read by a compiler command, from its -M output
+
+  Args:
+    args : Compiler command, without its -o option
+
+  Returns:
+    deps : Sources and headers read by the command, including the ones
+           included with relative paths, None if the compiler cannot list them
+  """
+  try:
+    proc = subprocess.run(args + ["-M"], stdout=subprocess.PIPE,
+                          stderr=subprocess.DEVNULL, universal_newlines=True)
+  except OSError:
+    return None
+  if proc.returncode:
+    return None
+  deps = []
+  for rule in proc.stdout.replace("\\\n", " ").splitlines():
+    _, _, prereqs = rule.partition(": ")
+    deps += [dep.replace("\\ ", " ") for dep in re.split(r"(?<!\\)\s+", prereqs) if dep]
+  return deps
+
+
+def git_head_files(path):
+  """Get the files which identify the HEAD commit of a git work tree
+
+  Returns:
+    files      : HEAD and the files holding the commit it refers to, empty if
+                 path is not a git work tree
+  """
+  git = os.path.join(path, ".git")
+  if os.path.isfile(git):
+    # Submodules and worktrees point to their git directory
+    with open(git, "r") as f:
+      line = f.read().strip()
+    if not line.startswith("gitdir:"):
+      return []
+    git = os.path.join(path, line[len("gitdir:"):].strip())
+  head = os.path.join(git, "HEAD")
+  try:
+    with open(head, "r") as f:
+      ref = f.read().strip()
+  except OSError:
+    return []
+  files = [head]
+  if ref.startswith("ref:"):
+    common = git
+    if os.path.isfile(os.path.join(git, "commondir")):
+      with open(os.path.join(git, "commondir"), "r") as f:
+        common = os.path.join(git, f.read().strip())
+    for name in (ref[len("ref:"):].strip(), "packed-refs"):
+      if os.path.isfile(os.path.join(common, name)):
+        files.append(os.path.join(common, name))
+  return files
+
+
+class ToolVersions:
+  """Outputs of the version commands of the tools, kept in a JSON file
+
+  An output is reused as long as the files the command depends on, the tool
+  binary or the git files of a source tree, keep the same path, size and
+  mtime. Only the outputs of successful commands are kept.
+  """
+  def __init__(self, path, recheck=False):
+    self.path = path
+    # Run the commands again, replacing their outputs but keeping the others
+    self.recheck = recheck
+    self.entries = {}
+    try:
+      with open(path, "r") as f:
+        self.entries = json.load(f)
+    except (OSError, ValueError):
+      pass
+
+  def run(self, cmd, deps, cwd=None):
+    """Run a version command through the shell
+
+    Args:
+      cmd        : Command
+      deps       : Files the output depends on, the output is not kept if
+                   one of them is missing
+      cwd        : Directory the command is run from
+
+    Returns:
+      returncode, stdout, stderr of the command
+    """
+    try:
+      ids = [hash_tool(dep) for dep in deps] if deps else None
+    except (OSError, TypeError):
+      ids = None
+    key = hashlib.sha256("\0".join([cmd, cwd or ""] + (ids or [])).encode()).hexdigest()
+    if ids and key in self.entries and not self.recheck:
+      return tuple(self.entries[key])
+    proc = subprocess.run(cmd, shell=True, capture_output=True, text=True, cwd=cwd)
+    if ids and proc.returncode == 0:
+      self.entries[key] = [proc.returncode, proc.stdout, proc.stderr]
+      self.save()
+    return proc.returncode, proc.stdout, proc.stderr
+
+  def save(self):
+    os.makedirs(os.path.dirname(os.path.abspath(self.path)), exist_ok=True)
+    fd, tmp = tempfile.mkstemp(dir=os.path.dirname(os.path.abspath(self.path)), suffix=".tmp")
+    with os.fdopen(fd, "w") as f:
+      json.dump(self.entries, f)
+    os.replace(tmp, self.path)
+
+
+class FileCache:
+  """Cache of files keyed by the hash of the inputs that produced them
+
+  Each entry is a directory named after its key which holds a copy of the
+  output files, in the order they were given. Entries are touched when they
+  are used, and trim() evicts the least recently used ones to keep the cache
+  under max_size bytes. Hit and miss counters are shared with the worker
+  processes forked by run_jobs().
+  """
+  def __init__(self, path, max_size, name="Build"):
+    self.path = path
+    self.max_size = max_size
+    self.name = name
+    os.makedirs(path, exist_ok=True)
+    # Only imported by the runs which use a cache
+    import multiprocessing
+    self.hits = multiprocessing.Value('i', 0)
+    self.misses = multiprocessing.Value('i', 0)
+    self.evictions = multiprocessing.Value('i', 0)
+
+  def key(self, *parts):
+    """Get the key of a list of strings"""
+    return hashlib.sha256("\0".join(parts).encode()).hexdigest()
+
+  def command_key(self, cmd, outputs, extra=""):
+    """Get the key of a compiler command
+
+    The first word of the command is taken as the compiler. The sources and
+    headers it reads, as listed by compiler_deps(), the -T linker script and
+    the other files of the command are replaced by a hash of their contents,
+    and the output files and include directories by a placeholder, so that
+    the key does not depend on the output directory of the run.
+
+    Returns:
+      key : None if the files read by the command cannot be listed
+    """
+    outputs = set(outputs)
+    words = shlex.split(cmd)
+    if not words:
+      return None
+    parts = [tool_id(words[0])]
+    args = words[:1]
+    skip = False
+    for prev, word in zip(words, words[1:]):
+      if skip or word == "-o":
+        skip = not skip and word == "-o"
+        continue
+      args.append(word)
+      if word in outputs:
+        parts.append("<out>")
+      elif word[:2] == "-I" or prev == "-I":
+        # The headers read from the include directories are listed below
+        parts.append("-I")
+      elif word[:2] == "-T" and os.path.isfile(word[2:]):
+        parts.append("-T" + hash_file(word[2:]))
+      elif os.path.isfile(word):
+        parts.append(hash_file(word))
+      else:
+        parts.append(word)
+    deps = compiler_deps(args)
+    if deps is None:
+      return None
+    parts += [hash_file(dep) for dep in deps]
+    parts.append(extra)
+    return self.key(*parts)
+
+  def fetch(self, key, outputs):
+    """Copy the files of an entry to outputs, return False on a miss"""
+    entry = os.path.join(self.path, key)
+    files = [os.path.join(entry, "out%d" % i) for i in range(len(outputs))]
+    if not all(os.path.isfile(f) for f in files):
+      with self.misses.get_lock():
+        self.misses.value += 1
+      return False
+    for cached, output in zip(files, outputs):
+      shutil.copyfile(cached, output)
+    os.utime(entry)
+    with self.hits.get_lock():
+      self.hits.value += 1
+    return True
+
+  def store(self, key, outputs):
+    """Add the files produced for a key to the cache"""
+    entry = os.path.join(self.path, key)
+    if os.path.isdir(entry):
+      return
+    # Build the entry aside and rename it so that concurrent jobs never see a
+    # partial entry.
+    tmp = tempfile.mkdtemp(dir=self.path, prefix=".tmp")
+    try:
+      for i, output in enumerate(outputs):
+        shutil.copyfile(output, os.path.join(tmp, "out%d" % i))
+      os.rename(tmp, entry)
+    except OSError:
+      shutil.rmtree(tmp, ignore_errors=True)
+
+  def trim(self):
+    """Evict the least recently used entries above max_size bytes"""
+    entries = []
+    total = 0
+    for name in os.listdir(self.path):
+      entry = os.path.join(self.path, name)
+      if name.startswith(".") or not os.path.isdir(entry):
+        continue
+      size = sum(os.path.getsize(os.path.join(entry, f)) for f in os.listdir(entry))
+      entries.append((os.path.getmtime(entry), size, entry))
+      total += size
+    for _, size, entry in sorted(entries):
+      if total <= self.max_size:
+        break
+      shutil.rmtree(entry, ignore_errors=True)
+      total -= size
+      self.evictions.value += 1
+    return total
+
+  def summary(self):
+    """Trim the cache and get a one-line summary of its use"""
+    size = self.trim()
+    return ("%s cache %s: %d hits, %d misses, %d evicted, %.1f MB" %
+            (self.name, self.path, self.hits.value, self.misses.value,
+             self.evictions.value, size / (1 << 20)))
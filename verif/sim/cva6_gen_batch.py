@@ -0,0 +1,158 @@
+# Copyright 2024 Thales DIS France SAS
+#
+# Licensed under the Solderpad Hardware Licence, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# SPDX-License-Identifier: Apache-2.0 WITH SHL-2.0
+# You may obtain a copy of the License at https://solderpad.org/licenses/
+
+"""
+Generate the tests of several test list entries in one generator run
+
+riscv-dv reads the options of a test (+UVM_TESTNAME and the gen_opts
+plusargs) once per simulation, so only the runs of test list entries with the
+same gen_test and gen_opts are packed together, e.g. entries which only differ
+by their iterations or by their gcc and ISS options. The runs of a single
+entry are never packed together: --batch_size already sets how many of its
+tests one run generates. A run left alone is run as without --gen_batch.
+
+A packed run generates all its tests under a common name. Its manifest records which
+test and iteration each generated program belongs to, and split_gen_batch()
+renames the programs to the asm_tests/<test>_<i>.S layout of the unpacked
+runs.
+
+The program of a packed test depends on the whole batch: seed.yaml records
+the batch (see batch_record()) rather than a seed per test, and a rerun with
+--seed_yaml generates the whole batch again, see replay_batches().
+"""
+
+import glob
+import os
+
+import yaml
+
+
+class GenUnit:
+  """Tests of one generator run of a test list entry, see do_simulate()"""
+  def __init__(self, test, test_id, seed, start_idx, count):
+    self.test = test
+    self.test_id = test_id
+    self.seed = seed
+    self.start_idx = start_idx
+    self.count = count
+
+
+def gen_batches(units, max_tests):
+  """Pack the generator runs of entries with the same gen_test and gen_opts
+
+  A packed run holds at most one run of each entry.
+
+  Args:
+    units     : List of GenUnit, in test list order
+    max_tests : Maximum number of tests of a packed run. A run generating more
+                tests is not packed.
+
+  Returns:
+    batches   : Lists of GenUnit generated by one run, in test list order of
+                their first run
+  """
+  open_batches = {}
+  batches = []
+  for unit in units:
+    key = (unit.test['gen_test'], unit.test.get('gen_opts', ""))
+    candidates = open_batches.setdefault(key, [])
+    for batch in candidates:
+      if all(u.test['test'] != unit.test['test'] for u in batch) and \
+         sum(u.count for u in batch) + unit.count <= max_tests:
+        break
+    else:
+      batch = []
+      candidates.append(batch)
+      batches.append(batch)
+    batch.append(unit)
+  return batches
+
+
+def batch_record(batch):
+  """Get what reproduces a packed run, as saved in its manifest and seed.yaml"""
+  return {
+    "gen_test": batch[0].test['gen_test'],
+    "gen_opts": batch[0].test.get('gen_opts', ""),
+    "seed": str(batch[0].seed),
+    "tests": [{"test": u.test['test'], "test_id": u.test_id,
+               "start_idx": u.start_idx, "count": u.count} for u in batch],
+  }
+
+
+def write_gen_batch(path, name, batch):
+  """Write the manifest of a packed run, see split_gen_batch()"""
+  manifest = dict(name=name, **batch_record(batch))
+  with open(path, "w") as f:
+    yaml.dump(manifest, f, default_flow_style=False, sort_keys=False)
+
+
+def replay_batches(units, records):
+  """Pack the runs of the batches recorded by an earlier regression again
+
+  A recorded batch is generated again as a whole, with its seed, as soon as
+  one of its runs is in units: the runs of the batch which are not are
+  generated as well, from the record.
+
+  Args:
+    units   : List of GenUnit, in test list order
+    records : {name: batch_record()} of the batches of the seed.yaml
+
+  Returns:
+    batches : Lists of GenUnit of the recorded batches
+    others  : The units which are not part of a recorded batch
+
+  Raises:
+    ValueError if a run of units does not match its recorded batch
+  """
+  by_id = {unit.test_id: unit for unit in units}
+  batches = []
+  for name, record in sorted(records.items()):
+    if not any(entry['test_id'] in by_id for entry in record['tests']):
+      continue
+    batch = []
+    for entry in record['tests']:
+      unit = by_id.pop(entry['test_id'], None)
+      if unit is None:
+        test = {'test': entry['test'], 'gen_test': record['gen_test'],
+                'gen_opts': record['gen_opts']}
+        unit = GenUnit(test, entry['test_id'], None, entry['start_idx'], entry['count'])
+      elif (unit.test['gen_test'], unit.test.get('gen_opts', ""), unit.start_idx, unit.count) != \
+           (record['gen_test'], record['gen_opts'], entry['start_idx'], entry['count']):
+        raise ValueError("%s cannot be generated again as in %s: its gen_test, "
+                         "gen_opts, iterations or --batch_size changed" % (unit.test_id, name))
+      batch.append(unit)
+    batch[0].seed = record['seed']
+    batches.append(batch)
+  return batches, [unit for unit in units if unit.test_id in by_id]
+
+
+def split_gen_batch(path, asm_dir):
+  """Rename the programs of a packed run after the tests they belong to
+
+  Args:
+    path    : Manifest of the packed run
+    asm_dir : Directory of the generated programs
+
+  Returns:
+    missing : Names of the programs not generated
+  """
+  with open(path, "r") as f:
+    manifest = yaml.safe_load(f)
+  missing = []
+  index = 0
+  for entry in manifest['tests']:
+    for i in range(entry['start_idx'], entry['start_idx'] + entry['count']):
+      prefix = os.path.join(asm_dir, "%s_%d" % (manifest['name'], index))
+      # The program and any file generated along with it
+      outputs = glob.glob(glob.escape(prefix) + ".*")
+      if not outputs:
+        missing.append("%s_%d" % (entry['test'], i))
+      for output in outputs:
+        os.replace(output, os.path.join(asm_dir, "%s_%d" % (entry['test'], i)) +
+                   output[len(prefix):])
+      index += 1
+  return missing
@@ -0,0 +1,78 @@
+# Copyright 2024 Thales DIS France SAS
+#
+# Licensed under the Solderpad Hardware Licence, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# SPDX-License-Identifier: Apache-2.0 WITH SHL-2.0
+# You may obtain a copy of the License at https://solderpad.org/licenses/
+
+"""
+Simulation logs compressed with --log_compress, read back transparently
+
+Compressed logs keep their name: they are told apart from plain text ones by
+their first bytes, so every reader can be given either.
+"""
+
+import gzip
+import io
+import os
+import subprocess
+
+try:
+  import zstandard
+except ImportError:
+  zstandard = None
+
+# Supported compressors and the magic number of their output
+COMPRESSORS = {
+  "gzip": b"\x1f\x8b",
+  "zstd": b"\x28\xb5\x2f\xfd",
+}
+
+
+def log_compression(path):
+  """Get the compressor of a log, None if it is not compressed"""
+  with open(path, "rb") as f:
+    head = f.read(4)
+  for name, magic in COMPRESSORS.items():
+    if head.startswith(magic):
+      return name
+  return None
+
+
+class _PipeReader(io.TextIOWrapper):
+  """Text output of a decompression command"""
+  def __init__(self, cmd):
+    self.proc = subprocess.Popen(cmd, stdout=subprocess.PIPE)
+    super().__init__(self.proc.stdout)
+
+  def close(self):
+    super().close()
+    # The command is killed by SIGPIPE if the log was not read to its end.
+    self.proc.wait()
+
+
+def open_log(path):
+  """Open a simulation log for reading as text, decompressing it on the fly
+
+  zstd logs are read with the zstandard module if it is installed, else
+  through the zstd command.
+  """
+  compression = log_compression(path)
+  if compression == "gzip":
+    return gzip.open(path, "rt")
+  if compression == "zstd":
+    if zstandard:
+      return io.TextIOWrapper(zstandard.ZstdDecompressor().stream_reader(open(path, "rb"),
+                                                                         closefd=True))
+    return _PipeReader(["zstd", "-d", "-c", "-q", path])
+  return open(path, "r")
+
+
+def compress_log(path, compressor):
+  """Compress a log in place, streaming it through the compressor command"""
+  if not os.path.isfile(path) or log_compression(path):
+    return
+  tmp = path + ".tmp"
+  with open(path, "rb") as src, open(tmp, "wb") as dst:
+    subprocess.run([compressor, "-c", "-q"], stdin=src, stdout=dst, check=True)
+  os.replace(tmp, path)
@@ -0,0 +1,65 @@
+# Copyright 2024 Thales DIS France SAS
+#
+# Licensed under the Solderpad Hardware Licence, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# SPDX-License-Identifier: Apache-2.0 WITH SHL-2.0
+# You may obtain a copy of the License at https://solderpad.org/licenses/
+
+"""
+Per-test manifests of the incremental regression mode of cva6.py
+"""
+
+import datetime
+import hashlib
+import json
+import os
+import tempfile
+
+
+class Manifest:
+  """Directory of test manifests
+
+  The manifest of a test records the inputs it was last run with and the
+  result of its ISS comparison. A test whose inputs are unchanged can reuse
+  the recorded result instead of being simulated again.
+
+  Each manifest is a JSON file named after the hash of the test identity:
+
+    {"test": "rv64ui-p-add", "inputs": {...}, "result": "[PASSED]: ...",
+     "report": "<lines appended to iss_regr.log>", "date": "..."}
+  """
+  def __init__(self, directory):
+    self.dir = directory
+    os.makedirs(self.dir, exist_ok=True)
+
+  def key(self, *ids):
+    """Get the key of the test identified by ids"""
+    h = hashlib.sha256()
+    for i in ids:
+      h.update(("%s\0" % (i,)).encode())
+    return h.hexdigest()
+
+  def path(self, key):
+    return os.path.join(self.dir, key + ".json")
+
+  def lookup(self, key, inputs):
+    """Get the manifest of a test if it was run with the same inputs"""
+    try:
+      with open(self.path(key), "r") as f:
+        entry = json.load(f)
+    except (OSError, ValueError):
+      return None
+    if entry.get("inputs") != inputs:
+      return None
+    return entry
+
+  def store(self, key, test, inputs, result, report):
+    """Record the inputs and the result of a test"""
+    entry = {"test": test, "inputs": inputs, "result": result,
+             "report": report, "date": datetime.datetime.now().isoformat()}
+    # Written to a temporary file and renamed, so that a manifest is never
+    # seen half written.
+    fd, tmp = tempfile.mkstemp(dir=self.dir, suffix=".tmp")
+    with os.fdopen(fd, "w") as f:
+      json.dump(entry, f, indent=1)
+    os.replace(tmp, self.path(key))
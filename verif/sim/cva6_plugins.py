@@ -0,0 +1,61 @@
+# Copyright 2024 Thales DIS France SAS
+#
+# Licensed under the Solderpad Hardware Licence, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# SPDX-License-Identifier: Apache-2.0 WITH SHL-2.0
+# You may obtain a copy of the License at https://solderpad.org/licenses/
+
+"""
+Registry of the trace converters, dialects and comparators used by cva6.py
+
+Plugins are named by "module:attribute" and only imported when they are first
+used, so that a run imports the converters of the ISS it simulates and no
+converter at all if it does not compare traces.
+"""
+
+import importlib
+
+# Converters of the ISS logs to trace files, called as converter(log, trace).
+# The ovpsim converter also takes stop_on_first_error. RTL simulators are all
+# named "rtl", see trace_plugin_name() in cva6.py.
+TRACE_CONVERTERS = {
+  "spike": "cva6_spike_log_to_trace_csv:process_spike_sim_log",
+  "rtl": "verilator_log_to_trace_csv:process_verilator_sim_log",
+  "ovpsim": "dv.scripts.ovpsim_log_to_trace_csv:process_ovpsim_sim_log",
+  "sail": "dv.scripts.sail_log_to_trace_csv:process_sail_sim_log",
+  "whisper": "dv.scripts.whisper_log_trace_csv:process_whisper_sim_log",
+}
+
+# TraceDialect classes of the logs which can be compared without being
+# converted first
+TRACE_DIALECTS = {
+  "spike": "cva6_spike_log_to_trace_csv:SpikeDialect",
+  "rtl": "verilator_log_to_trace_csv:VerilatorDialect",
+}
+
+# Trace comparators, see compare_traces() in cva6_trace_compare
+COMPARATORS = {
+  "trace": "cva6_trace_compare:compare_traces",
+}
+
+# Attribute of each spec imported so far
+_loaded = {}
+
+
+def load(spec):
+  """Import the attribute named by a "module:attribute" spec"""
+  if spec not in _loaded:
+    module, _, attribute = spec.partition(":")
+    _loaded[spec] = getattr(importlib.import_module(module), attribute)
+  return _loaded[spec]
+
+
+def register(registry, name, spec):
+  """Add a plugin to a registry, or replace it"""
+  registry[name] = spec
+
+
+def plugin(registry, name):
+  """Get a plugin of a registry, importing it if needed, None if it has none"""
+  spec = registry.get(name)
+  return load(spec) if spec else None
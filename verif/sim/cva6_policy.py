@@ -0,0 +1,204 @@
+# Copyright 2024 Thales DIS France SAS
+#
+# Licensed under the Solderpad Hardware Licence, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# SPDX-License-Identifier: Apache-2.0 WITH SHL-2.0
+# You may obtain a copy of the License at https://solderpad.org/licenses/
+
+"""
+Timeout, retry and quarantine policy of the ISS and RTL simulations of cva6.py
+
+- The timeout of a simulation is limited to a percentile of the runtimes of
+  the test recorded in the runtime database, times a factor, so that a test
+  which hangs frees its slot long before the fixed timeout.
+- Simulations failing because of the infrastructure (licenses, memory, disk)
+  rather than the test itself are run again, a bounded number of times.
+- Tests known to be flaky are listed in a quarantine file and run after all
+  the others.
+"""
+
+import fnmatch
+import logging
+import math
+import os
+import re
+import signal
+import subprocess
+import sys
+import threading
+import time
+
+import yaml
+
+from cva6_telemetry import wait_command
+
+# Percentile of the recorded runtimes of a test its timeout is derived from
+TIMEOUT_PERCENTILE = 99
+# Priority of the jobs of the quarantined tests, see Job
+QUARANTINE_PRIORITY = -1
+# Seconds before the first retry, doubled for each of the next ones
+RETRY_DELAY_S = 10
+# Bytes of the start and of the end of an output searched for errors
+SCAN_BYTES = 64 << 10
+# Errors of the infrastructure in the output of a simulation
+INFRASTRUCTURE_ERRORS = re.compile("|".join([
+  r"[Ll]icen[cs]e (checkout|request) failed",
+  r"([Ff]ailed|[Uu]nable) to (obtain|checkout|check out) .*licen[cs]e",
+  r"FLEX(lm|net Licensing) error",
+  r"Licensed number of users already reached",
+  r"Cannot allocate memory",
+  r"std::bad_alloc",
+  r"No space left on device",
+  r"Resource temporarily unavailable",
+  # A command killed by the OOM killer, as reported by make
+  r"\*\*\* \[.*\] Killed$",
+]), re.MULTILINE)
+
+
+def run_command(cmd, timeout_s, **kwargs):
+  """Run a shell command in its own process group, killed at its timeout
+
+  Unlike run_cmd(), the caller is told whether the command timed out. The
+  command is not reaped before the timer is stopped, so the timer can only
+  kill its own process group.
+
+  Args:
+    cmd       : Shell command
+    timeout_s : Timeout limit in seconds
+    kwargs    : Other arguments of subprocess.Popen
+
+  Returns:
+    returncode : Return code of the command
+    timed_out  : True if the command was killed by the timeout
+  """
+  ps = subprocess.Popen(cmd, shell=True, start_new_session=True, **kwargs)
+  expired = threading.Event()
+  def kill():
+    # The command is not reaped yet, its process group cannot be reused
+    if ps.returncode is None:
+      expired.set()
+      os.killpg(ps.pid, signal.SIGKILL)
+  # Popen.wait() polls when given a timeout, which costs more than the
+  # command itself on short tests.
+  timer = threading.Timer(max(timeout_s, 0), kill)
+  timer.start()
+  os.waitid(os.P_PID, ps.pid, os.WEXITED | os.WNOWAIT)
+  timer.cancel()
+  timer.join()
+  returncode = wait_command(ps)
+  return returncode, expired.is_set() and returncode == -signal.SIGKILL
+
+
+def read_quarantine(path):
+  """Read the tests of a quarantine file
+
+  The file is a YAML list of test names or fnmatch patterns, or of mappings
+  with a "test" key and an optional "reason":
+
+    - riscv_amo_test
+    - test: rv64ui-v-*
+      reason: hangs on some seeds
+
+  Returns:
+    patterns : List of test name patterns
+  """
+  try:
+    with open(path, "r") as f:
+      entries = yaml.safe_load(f) or []
+  except (OSError, yaml.YAMLError) as exc:
+    logging.error("Cannot read quarantine file %s: %s" % (path, exc))
+    sys.exit(1)
+  patterns = []
+  for entry in entries:
+    if isinstance(entry, dict):
+      entry = entry.get("test")
+    if not isinstance(entry, str):
+      logging.error("Quarantine file %s: not a test name: %s" % (path, entry))
+      sys.exit(1)
+    patterns.append(entry)
+  return patterns
+
+
+def infrastructure_failure(path):
+  """Get the first infrastructure error in the output of a command
+
+  Returns:
+    error : Line of the error, None if the output has none
+  """
+  try:
+    with open(path, "rb") as f:
+      head = f.read(SCAN_BYTES)
+      f.seek(0, 2)
+      f.seek(max(f.tell() - SCAN_BYTES, len(head)))
+      text = (head + b"\n" + f.read()).decode(errors="replace")
+  except OSError:
+    return None
+  m = INFRASTRUCTURE_ERRORS.search(text)
+  if m is None:
+    return None
+  start = text.rfind("\n", 0, m.start()) + 1
+  end = text.find("\n", m.end())
+  return text[start:end if end >= 0 else None].strip()
+
+
+class JobPolicy:
+  """Timeouts, retries and priority of the simulations of the tests
+
+  Args:
+    runtimes       : RuntimeDB of the tests, None if not recorded
+    timeout_factor : Factor applied to the runtime percentile of a test to get
+                     its timeout, 0 to keep the fixed timeouts
+    min_timeout    : Lower limit of the timeouts derived from the runtimes
+    retries        : Number of times a simulation is run again when it fails
+                     because of the infrastructure
+    quarantine     : Name patterns of the tests run last
+  """
+  def __init__(self, runtimes=None, timeout_factor=0, min_timeout=60, retries=0,
+               quarantine=()):
+    self.runtimes = runtimes
+    self.timeout_factor = timeout_factor
+    self.min_timeout = min_timeout
+    self.retries = retries
+    self.quarantine = list(quarantine)
+
+  def timeout(self, test, iss, timeout_s):
+    """Get the timeout of the simulation of a test by an ISS
+
+    timeout_s is the fixed timeout, which is also the upper limit.
+    """
+    if not self.runtimes or not self.timeout_factor:
+      return timeout_s
+    seconds = self.runtimes.percentile(test, iss, "iss_sim", TIMEOUT_PERCENTILE)
+    if seconds is None:
+      return timeout_s
+    elastic = max(self.min_timeout, math.ceil(seconds * self.timeout_factor))
+    if elastic < timeout_s:
+      logging.debug("Timeout of %s on %s: %ds (p%d %.1fs)" %
+                    (test, iss, elastic, TIMEOUT_PERCENTILE, seconds))
+    return min(timeout_s, elastic)
+
+  def quarantined(self, test):
+    return any(fnmatch.fnmatchcase(test, pattern) for pattern in self.quarantine)
+
+  def priority(self, test):
+    """Get the priority of the jobs of a test, see Job"""
+    return QUARANTINE_PRIORITY if self.quarantined(test) else 0
+
+  def retry(self, run, output):
+    """Call run(), again if it fails because of the infrastructure
+
+    Args:
+      run    : Function running a command, exiting like run_cmd() on errors
+      output : File the output of the command is written to
+    """
+    for attempt in range(self.retries + 1):
+      try:
+        return run()
+      except SystemExit:
+        error = infrastructure_failure(output) if attempt < self.retries else None
+        if error is None:
+          raise
+        delay = RETRY_DELAY_S << attempt
+        logging.warning("Infrastructure failure in %s: %s, retrying in %ds (%d/%d)" %
+                        (output, error, delay, attempt + 1, self.retries))
+        time.sleep(delay)
@@ -0,0 +1,135 @@
+# Copyright 2024 Thales DIS France SAS
+#
+# Licensed under the Solderpad Hardware Licence, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# SPDX-License-Identifier: Apache-2.0 WITH SHL-2.0
+# You may obtain a copy of the License at https://solderpad.org/licenses/
+
+"""
+Results of the ISS comparisons of a regression, iss_regr.log
+"""
+
+import json
+import os
+import re
+
+RESULT_RE = re.compile(r"\[(?P<status>PASSED|FAILED)\]: (?P<matched>\d+) matched"
+                       r"(, (?P<mismatch>\d+) mismatch)?")
+# Trace lines written by compare_traces() at the start of a comparison
+TRACE_RE = re.compile(r"^\S+ : (?P<path>.*)$")
+# First line of the summaries written by save(), followed by one line per
+# failed test
+SUMMARY_RE = re.compile(r"^\d+ PASSED, (?P<failed>\d+) FAILED$")
+
+
+def strip_summaries(lines):
+  """Remove the summaries written by save() from the lines of a report"""
+  kept = []
+  skip = 0
+  for line in lines:
+    if skip:
+      skip -= 1
+      continue
+    m = SUMMARY_RE.match(line.rstrip("\n"))
+    if m:
+      skip = int(m.group("failed"))
+      continue
+    kept.append(line)
+  return kept
+
+
+class RegrReport:
+  """Comparison results of a regression
+
+  Each comparison is appended to the text report at path as soon as it is
+  done, and recorded in memory and in the JSON lines file next to it:
+
+    {"kind": "test", "test": "riscv_arithmetic_basic_test_0", "status": "PASSED",
+     "matched": 1234, "mismatch": 0, "traces": [...], "reused": false}
+
+  save() adds the summary of all the results to both files. The text report
+  keeps the results of the earlier runs in the same output directory, the
+  JSON lines file only holds the ones of the current run.
+  """
+  def __init__(self, path):
+    self.path = path
+    self.records_path = os.path.splitext(path)[0] + ".jsonl"
+    open(self.records_path, "w").close()
+    self.records = []
+    self.passed = 0
+    self.failed = 0
+
+  def add(self, test, text, result, header="", reused=False):
+    """Record the comparison of a test
+
+    Args:
+      test   : Test name or ELF
+      text   : Report of the comparison, see compare_traces()
+      result : [PASSED] or [FAILED] line of the report
+      header : Text written to the report before the comparison
+      reused : True if the result is taken from a test manifest
+    """
+    with open(self.path, "a") as fd:
+      fd.write(header)
+      fd.write(text)
+    m = RESULT_RE.search(result)
+    record = {
+      "kind": "test",
+      "test": test,
+      "status": m.group("status") if m else "FAILED",
+      "matched": int(m.group("matched")) if m else 0,
+      "mismatch": int(m.group("mismatch") or 0) if m else 0,
+      "traces": [t.group("path") for t in map(TRACE_RE.match, text.splitlines()[:2]) if t],
+      "reused": reused,
+    }
+    self.add_record(record)
+
+  def add_record(self, record):
+    if record["status"] == "PASSED":
+      self.passed += 1
+    else:
+      self.failed += 1
+    self.records.append(record)
+    self.write_record(record)
+
+  def write_record(self, record):
+    with open(self.records_path, "a") as f:
+      f.write(json.dumps(record) + "\n")
+
+  def merge(self, path):
+    """Add the results of the report of another regression, at path
+
+    Its text is appended without the summaries saved in it, one per
+    --gen_sv_seed iteration.
+    """
+    with open(path, "r") as fd:
+      lines = strip_summaries(fd.readlines())
+    records = []
+    records_path = os.path.splitext(path)[0] + ".jsonl"
+    if os.path.isfile(records_path):
+      with open(records_path, "r") as f:
+        records = [json.loads(line) for line in f if line.strip()]
+    with open(self.path, "a") as fd:
+      fd.writelines(lines)
+    for record in records:
+      if record["kind"] == "test":
+        self.add_record(record)
+
+  def summary(self):
+    return "%d PASSED, %d FAILED" % (self.passed, self.failed)
+
+  def failed_details(self):
+    """Get one line per failed test: its trace files and its result"""
+    return ["%s [FAILED]: %d matched, %d mismatch" %
+            (" ".join(re.sub(r".*_sim/", "", t) for t in record["traces"]),
+             record["matched"], record["mismatch"])
+            for record in self.records if record["status"] == "FAILED"]
+
+  def save(self):
+    """Append the summary of the results to the report, return its lines"""
+    lines = [self.summary()] + self.failed_details()
+    with open(self.path, "a") as fd:
+      fd.write("".join(line + "\n" for line in lines))
+    self.write_record({"kind": "summary", "passed": self.passed,
+                       "failed": self.failed})
+    return lines
@@ -0,0 +1,120 @@
+# Copyright 2024 Thales DIS France SAS
+#
+# Licensed under the Solderpad Hardware Licence, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# SPDX-License-Identifier: Apache-2.0 WITH SHL-2.0
+# You may obtain a copy of the License at https://solderpad.org/licenses/
+
+"""
+Runtimes of the tests of earlier regressions, used to schedule the longest
+jobs first, to predict when a regression ends and to derive the timeouts of
+the tests
+"""
+
+import collections
+import math
+import os
+import sqlite3
+import time
+
+# Weight of the last run in the recorded runtime of a step
+SMOOTHING = 0.5
+# Number of runtimes kept per step for its percentiles
+HISTORY = 20
+# Number of runtimes of a step needed to give its percentiles
+MIN_SAMPLES = 3
+
+
+class RuntimeDB:
+  """SQLite database of the time per iteration of each step of the tests
+
+  A row holds the wall time of one step (gen, gcc_compile, iss_sim, iss_cmp
+  or other) of one iteration of a test, for a target and an ISS. iss is empty
+  for the steps which are not run by an ISS. The runtimes of the target of the
+  regression are read and updated. The last HISTORY runtimes of each step
+  are kept as well, for its percentiles.
+  """
+  def __init__(self, path, target):
+    self.path = path
+    self.target = target
+    os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+    self.db = sqlite3.connect(path, timeout=60)
+    self.db.execute("""CREATE TABLE IF NOT EXISTS runtimes (
+                         test TEXT, target TEXT, iss TEXT, step TEXT,
+                         seconds REAL, runs INTEGER, updated REAL,
+                         PRIMARY KEY (test, target, iss, step))""")
+    self.db.execute("""CREATE TABLE IF NOT EXISTS samples (
+                         test TEXT, target TEXT, iss TEXT, step TEXT,
+                         seconds REAL, updated REAL)""")
+    self.db.execute("""CREATE INDEX IF NOT EXISTS samples_step
+                       ON samples (test, target, iss, step)""")
+    self.db.commit()
+    # {test: {(iss, step): seconds}}
+    self.tests = collections.defaultdict(dict)
+    for test, iss, step, seconds in self.db.execute(
+        "SELECT test, iss, step, seconds FROM runtimes WHERE target = ?", (target,)):
+      self.tests[test][(iss, step)] = seconds
+    # {(test, iss, step): [seconds]}, oldest first
+    self.samples = collections.defaultdict(list)
+    for test, iss, step, seconds in self.db.execute(
+        """SELECT test, iss, step, seconds FROM samples WHERE target = ?
+           ORDER BY updated, rowid""", (target,)):
+      self.samples[(test, iss, step)].append(seconds)
+
+  def estimate(self, test, iss=None, step=None):
+    """Get the expected time of an iteration of a test, 0 if it is unknown
+
+    The times of all the ISS and steps of the test are added up unless iss or
+    step is given.
+    """
+    steps = self.tests.get(test, {})
+    return sum(seconds for (i, s), seconds in steps.items()
+               if iss in (None, i) and step in (None, s))
+
+  def percentile(self, test, iss, step, q):
+    """Get the q-th percentile of the recorded runtimes of a step of a test
+
+    Returns:
+      seconds : Nearest-rank percentile, None if fewer than MIN_SAMPLES
+                runtimes are recorded
+    """
+    samples = sorted(self.samples.get((test, iss or "", step), []))
+    if len(samples) < MIN_SAMPLES:
+      return None
+    return samples[max(math.ceil(q / 100 * len(samples)) - 1, 0)]
+
+  def update(self, records):
+    """Record the runtimes of the telemetry records of a run, see cva6_telemetry"""
+    steps = collections.defaultdict(float)
+    for record in records:
+      if record.get("test") is None:
+        continue
+      steps[(record["test"], record.get("iss") or "", record.get("step") or "other",
+             record.get("iteration"))] += record["wall_s"]
+    runs = collections.defaultdict(list)
+    for (test, iss, step, _), seconds in steps.items():
+      runs[(test, iss, step)].append(seconds)
+    now = time.time()
+    with self.db:
+      for (test, iss, step), times in runs.items():
+        seconds = sum(times) / len(times)
+        known = self.tests[test]
+        if (iss, step) in known:
+          seconds = SMOOTHING * seconds + (1 - SMOOTHING) * known[(iss, step)]
+        self.db.execute("""INSERT INTO runtimes VALUES (?, ?, ?, ?, ?, 1, ?)
+                           ON CONFLICT (test, target, iss, step) DO UPDATE SET
+                           seconds = excluded.seconds, runs = runs + 1,
+                           updated = excluded.updated""",
+                        (test, self.target, iss, step, seconds, now))
+        known[(iss, step)] = seconds
+        self.db.executemany("INSERT INTO samples VALUES (?, ?, ?, ?, ?, ?)",
+                            [(test, self.target, iss, step, t, now) for t in times])
+        self.db.execute("""DELETE FROM samples WHERE rowid IN (
+                             SELECT rowid FROM samples
+                             WHERE test = ? AND target = ? AND iss = ? AND step = ?
+                             ORDER BY updated DESC, rowid DESC LIMIT -1 OFFSET ?)""",
+                        (test, self.target, iss, step, HISTORY))
+        self.samples[(test, iss, step)] = (self.samples[(test, iss, step)] + times)[-HISTORY:]
+
+  def close(self):
+    self.db.close()
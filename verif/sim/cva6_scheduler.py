@@ -0,0 +1,254 @@
+# Copyright 2024 Thales DIS France SAS
+#
+# Licensed under the Solderpad Hardware Licence, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# SPDX-License-Identifier: Apache-2.0 WITH SHL-2.0
+# You may obtain a copy of the License at https://solderpad.org/licenses/
+
+"""
+Local worker pool used by cva6.py to run simulation steps in parallel
+"""
+
+import collections
+import datetime
+import logging
+import os
+import time
+
+# Seconds between two checks of the available memory while a job waits for it
+MEMORY_POLL_S = 5
+# Minimum seconds between two logs of the ETA of the jobs
+ETA_LOG_S = 60
+
+
+class Job:
+  """A unit of work for run_jobs()
+
+  func is called with args/kwargs in a worker process. If done is given, it is
+  called in the main process with the value returned by func, in submission
+  order. The job is not started before the jobs listed in deps, which must be
+  submitted before it, are done. cost is the expected run time of the job in
+  seconds, 0 if it is unknown: the longest jobs are started first, after the
+  ones with a higher priority. A job has at most the priority of its deps,
+  the lowest one is used if it is lower than its own. resources are the
+  amounts of the resources of the run_jobs() budget the job uses: "memory" in
+  MB, "cores", or "license:<name>". A job uses one core unless its resources
+  say otherwise. Jobs using the same "exclusive:<name>" resource, e.g.
+  simulations sharing a working directory, never run at the same time,
+  whatever the budget.
+  """
+  def __init__(self, name, func, args=(), kwargs=None, done=None, deps=None, cost=0.0,
+               resources=None, priority=0):
+    self.name = name
+    self.func = func
+    self.args = args
+    self.kwargs = kwargs or {}
+    self.done = done
+    self.deps = deps or []
+    self.cost = cost
+    self.resources = dict({"cores": 1}, **(resources or {}))
+    self.priority = priority
+
+
+class _RecordBuffer(logging.Handler):
+  """Keep the log records of a job so that they can be replayed later"""
+  def __init__(self):
+    super().__init__()
+    self.records = []
+
+  def emit(self, record):
+    # Records are sent back to the main process: flatten them so that they
+    # can be pickled whatever their arguments are.
+    record.msg = record.getMessage()
+    record.args = None
+    if record.exc_info:
+      record.exc_text = logging.Formatter().formatException(record.exc_info)
+      record.exc_info = None
+    self.records.append(record)
+
+
+def _run_in_worker(func, args, kwargs):
+  root = logging.getLogger()
+  handlers = root.handlers
+  buf = _RecordBuffer()
+  root.handlers = [buf]
+  try:
+    result = func(*args, **kwargs)
+  except BaseException as exc:
+    # run_cmd() calls sys.exit() on errors, hand it over to the main process.
+    return None, exc, buf.records
+  finally:
+    root.handlers = handlers
+  return result, None, buf.records
+
+
+def _meminfo(field):
+  """Get a field of /proc/meminfo in MB, None if it cannot be read"""
+  try:
+    with open("/proc/meminfo", "r") as f:
+      for line in f:
+        if line.startswith(field + ":"):
+          return int(line.split()[1]) // 1024
+  except (OSError, ValueError, IndexError):
+    pass
+  return None
+
+
+def total_memory_mb():
+  """Get the physical memory of the machine in MB, None if it is unknown"""
+  total = _meminfo("MemTotal")
+  if total is None:
+    try:
+      total = os.sysconf("SC_PAGE_SIZE") * os.sysconf("SC_PHYS_PAGES") // (1024 * 1024)
+    except (ValueError, OSError, AttributeError):
+      pass
+  return total
+
+
+def _fits(job, usage, budget):
+  """Check if a job can start with the resources left in the budget"""
+  for resource, amount in job.resources.items():
+    limit = 1 if resource.startswith("exclusive:") else budget.get(resource)
+    if limit is not None and usage[resource] + amount > limit:
+      return False
+  if job.resources.get("memory"):
+    # Memory used by other processes than the jobs
+    available = _meminfo("MemAvailable")
+    if available is not None and available < job.resources["memory"]:
+      return False
+  return True
+
+
+def _duration(seconds):
+  return str(datetime.timedelta(seconds=int(seconds)))
+
+
+def _log_eta(jobs, finished, workers):
+  """Log the expected end of the jobs left, from their cost"""
+  left = [job.cost for job, done in zip(jobs, finished) if not done]
+  if not left:
+    return
+  # The jobs left are shared by the workers, the longest one is a lower bound
+  eta = max(sum(left) / workers, max(left, default=0))
+  logging.info("%d/%d jobs done, ETA %s" % (len(jobs) - len(left), len(jobs), _duration(eta)))
+
+
+def run_jobs(jobs, max_jobs=1, budget=None):
+  """Run a list of jobs on at most max_jobs worker processes
+
+  A job is started as soon as its dependencies are done and a worker is free,
+  the ready job with the highest priority, then the highest cost, first. Jobs
+  run one at a time are run by decreasing priority only, after their
+  dependencies. With a budget, a job is only started if the resources it uses
+  fit in what the running jobs leave, and if the machine has the memory it
+  needs available. The ready jobs after a job which does not fit wait with it,
+  so that it is not starved by smaller jobs. A job which needs more than the
+  whole budget is started when no other job is running.
+
+  The log records of each job are held back until all the jobs submitted
+  before it are done, so logfile.log, iss_regr.log and the returned list read
+  as if the jobs had been run one after the other. An exception raised by a
+  job (including the SystemExit of a failing run_cmd) is re-raised when the
+  job is reached and the jobs not yet started are cancelled.
+
+  Args:
+    jobs     : List of Job objects
+    max_jobs : Maximum number of jobs running at the same time
+    budget   : Amount of each resource shared by the running jobs, see Job
+
+  Returns:
+    results  : Values returned by the jobs, in submission order
+  """
+  results = []
+  index = {id(job): i for i, job in enumerate(jobs)}
+  deps = [[index[id(dep)] for dep in job.deps] for job in jobs]
+  # Deps are submitted first: with the lowest priority of its deps, a job is
+  # sorted after them.
+  priority = []
+  for i, job in enumerate(jobs):
+    priority.append(min([job.priority] + [priority[d] for d in deps[i]]))
+  if max_jobs <= 1 or len(jobs) <= 1:
+    outputs = [None] * len(jobs)
+    finished = [False] * len(jobs)
+    for i in sorted(range(len(jobs)), key=lambda i: (-priority[i], i)):
+      outputs[i] = jobs[i].func(*jobs[i].args, **jobs[i].kwargs)
+      finished[i] = True
+      while len(results) < len(jobs) and finished[len(results)]:
+        job = jobs[len(results)]
+        if job.done:
+          job.done(outputs[len(results)])
+        results.append(outputs[len(results)])
+    return results
+
+  # The worker pool is only imported by the runs which use it
+  import multiprocessing
+  from concurrent.futures import ProcessPoolExecutor, wait, FIRST_COMPLETED
+  workers = min(max_jobs, len(jobs))
+  logging.info("Running %d jobs with up to %d in parallel" % (len(jobs), workers))
+  estimated = any(job.cost for job in jobs)
+  if estimated:
+    _log_eta(jobs, [False] * len(jobs), workers)
+  eta_logged = time.monotonic()
+  # Workers are forked so that they inherit the configuration set up by
+  # cva6.py (logging, module globals) and only the job itself is pickled.
+  pool = ProcessPoolExecutor(max_workers=workers,
+                             mp_context=multiprocessing.get_context("fork"))
+  try:
+    # Jobs by decreasing priority and cost, in submission order for equal ones
+    by_cost = sorted(range(len(jobs)), key=lambda i: (-priority[i], -jobs[i].cost, i))
+    futures = [None] * len(jobs)
+    finished = [False] * len(jobs)
+    passed = [False] * len(jobs)
+    budget = budget or {}
+    usage = collections.Counter()
+    waiting = set()
+    root = logging.getLogger()
+    while len(results) < len(jobs):
+      # Only as many jobs as workers are submitted, so that a long job that
+      # gets ready later is not queued behind short ones.
+      running = [f for i, f in enumerate(futures) if f is not None and not finished[i]]
+      blocked = False
+      for i in by_cost:
+        if len(running) >= workers:
+          break
+        if futures[i] is not None or not all(passed[d] for d in deps[i]):
+          continue
+        if running and not _fits(jobs[i], usage, budget):
+          if i not in waiting:
+            waiting.add(i)
+            logging.info("Job %s waits for resources: %s" % (jobs[i].name, jobs[i].resources))
+          blocked = True
+          break
+        futures[i] = pool.submit(_run_in_worker, jobs[i].func, jobs[i].args, jobs[i].kwargs)
+        usage.update(jobs[i].resources)
+        running.append(futures[i])
+      if running:
+        # A job waiting for memory used by other processes is checked again
+        # from time to time.
+        wait(running, timeout=MEMORY_POLL_S if blocked else None,
+             return_when=FIRST_COMPLETED)
+      for i, future in enumerate(futures):
+        if future is not None and not finished[i] and future.done():
+          finished[i] = True
+          usage.subtract(jobs[i].resources)
+          # Jobs depending on a failed job are never started, the failure is
+          # raised when it is released below.
+          passed[i] = future.result()[1] is None
+      if estimated and time.monotonic() - eta_logged >= ETA_LOG_S:
+        _log_eta(jobs, finished, workers)
+        eta_logged = time.monotonic()
+      # Release the finished jobs in submission order.
+      while len(results) < len(jobs) and finished[len(results)]:
+        job = jobs[len(results)]
+        result, exc, records = futures[len(results)].result()
+        for record in records:
+          root.handle(record)
+        if exc is not None:
+          logging.error("Job %s failed" % job.name)
+          raise exc
+        if job.done:
+          job.done(result)
+        results.append(result)
+  finally:
+    pool.shutdown(wait=True, cancel_futures=True)
+  return results
@@ -0,0 +1,234 @@
+# Copyright 2024 Thales DIS France SAS
+#
+# Licensed under the Solderpad Hardware Licence, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# SPDX-License-Identifier: Apache-2.0 WITH SHL-2.0
+# You may obtain a copy of the License at https://solderpad.org/licenses/
+
+"""
+Split a cva6.py regression over several machines with --shard K/N
+
+The tests of the test list are split into units: a directed test, a
+generated test, or a batch of --batch_size iterations of a generated test.
+Units are assigned to the shards longest first, each to the shard with the
+least work so far. Every shard computes the same partition from the same
+test list and runtimes file, and runs its own part.
+
+The runtimes file holds the time per iteration of each test, recorded by the
+shards of earlier regressions. It must be the same file for all the shards,
+on a shared disk or checked into the repository, and is given explicitly
+with --shard_runtimes: each shard logs its SHA-256 so that shards which read
+different ones are easy to spot. Without it, the units are balanced on their
+number of iterations, which only depends on the test list.
+
+Each shard records the runtimes of its tests in shard_runtimes.json in its
+output directory. The merge command combines the results of the shards and
+adds their runtimes to the runtimes file used by the next regressions:
+
+  python3 cva6_shard.py merge -o out_merged --shard_runtimes runtimes.json \
+    out_shard1 out_shard2 ...
+"""
+
+import argparse
+import copy
+import glob
+import json
+import logging
+import os
+import shutil
+import statistics
+import tempfile
+
+from cva6_cache import hash_file
+from cva6_regr_report import RegrReport
+
+SHARD_RUNTIMES = "shard_runtimes.json"
+
+
+def parse_shard(arg):
+  """Parse the K/N argument of --shard, K starts at 1"""
+  try:
+    k, n = (int(i) for i in arg.split("/"))
+  except ValueError:
+    raise argparse.ArgumentTypeError("Bad shard (%s): must be K/N" % arg)
+  if n < 1 or not 1 <= k <= n:
+    raise argparse.ArgumentTypeError("Bad shard (%s): must be K/N with 1 <= K <= N" % arg)
+  return k, n
+
+
+def read_runtimes(path):
+  """Get the recorded time per iteration of each test, in seconds"""
+  try:
+    with open(path, "r") as f:
+      return json.load(f)
+  except (OSError, ValueError):
+    return {}
+
+
+def write_runtimes(path, runtimes):
+  os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+  fd, tmp = tempfile.mkstemp(dir=os.path.dirname(os.path.abspath(path)), suffix=".tmp")
+  with os.fdopen(fd, "w") as f:
+    json.dump(runtimes, f, indent=1, sort_keys=True)
+  os.replace(tmp, path)
+
+
+def test_units(test, batch_size):
+  """Split a test list entry into the lists of iterations run together"""
+  iterations = list(range(test['iterations']))
+  if 'gen_test' not in test or test['test'] == 'riscv_csr_test' or batch_size <= 0:
+    # One generator run, or a directed test
+    return [iterations]
+  return [iterations[i:i + batch_size] for i in range(0, len(iterations), batch_size)]
+
+
+def partition(units, shards, runtimes):
+  """Assign units to shards, longest first
+
+  Args:
+    units    : List of (test name, iterations) tuples
+    shards   : Number of shards
+    runtimes : Time per iteration of the tests, see read_runtimes()
+
+  Returns:
+    loads    : Estimated time of each shard
+    parts    : Indexes of the units of each shard
+  """
+  # Tests never run before are assumed to take the median time
+  default = statistics.median(runtimes.values()) if runtimes else 1.0
+  costs = [runtimes.get(name, default) * len(iterations) for name, iterations in units]
+  loads = [0.0] * shards
+  parts = [[] for _ in range(shards)]
+  # Sorted by index on ties, so that every shard gets the same partition
+  for i in sorted(range(len(units)), key=lambda i: (-costs[i], i)):
+    shard = min(range(shards), key=lambda s: (loads[s], s))
+    loads[shard] += costs[i]
+    parts[shard].append(i)
+  return loads, parts
+
+
+def select_shard(test_lists, shard, runtimes_path, batch_size):
+  """Keep the tests of a shard in test lists
+
+  Args:
+    test_lists    : Lists of test list entries, updated in place
+    shard         : (K, N) tuple of --shard
+    runtimes_path : Runtimes file shared by the shards, see read_runtimes(),
+                    None to balance the units on their number of iterations
+    batch_size    : --batch_size of the instruction generator
+
+  Generated tests split between shards keep their iterations in their
+  'shard_iterations' field, see test_iterations() in cva6.py.
+  """
+  k, n = shard
+  units = []
+  for li, test_list in enumerate(test_lists):
+    for ti, test in enumerate(test_list):
+      for iterations in test_units(test, batch_size):
+        units.append((li, ti, iterations))
+  runtimes = shard_runtimes(runtimes_path)
+  loads, parts = partition([(test_lists[li][ti]['test'], iterations)
+                            for li, ti, iterations in units], n, runtimes)
+  mine = {}
+  for i in parts[k - 1]:
+    li, ti, iterations = units[i]
+    mine.setdefault((li, ti), []).extend(iterations)
+  for li, test_list in enumerate(test_lists):
+    selected = []
+    for ti, test in enumerate(test_list):
+      if (li, ti) not in mine:
+        continue
+      iterations = sorted(mine[(li, ti)])
+      if len(iterations) != test['iterations']:
+        test = copy.copy(test)
+        test['shard_iterations'] = iterations
+      selected.append(test)
+    test_list[:] = selected
+  logging.info("Shard %d/%d: %d of %d units, estimated %.0fs (shards from %.0fs to %.0fs)" %
+               (k, n, len(parts[k - 1]), len(units), loads[k - 1], min(loads), max(loads)))
+
+
+def shard_runtimes(path):
+  """Read the runtimes file of select_shard(), logging its fingerprint"""
+  if path is None:
+    logging.info("No --shard_runtimes file, shards balanced on the iteration counts")
+    return {}
+  if not os.path.isfile(path):
+    logging.warning("Shard runtimes file %s not found, shards balanced on the "
+                    "iteration counts" % path)
+    return {}
+  runtimes = read_runtimes(path)
+  logging.info("Shard runtimes: %s, %d tests, sha256 %s" %
+               (path, len(runtimes), hash_file(path)[:16]))
+  return runtimes
+
+
+def record_runtimes(records, test_lists, output_dir):
+  """Save the time per iteration of the tests run by this shard
+
+  Args:
+    records    : Telemetry records of the run, see cva6_telemetry
+    test_lists : Lists of the tests of the shard
+    output_dir : Output directory of the shard
+  """
+  wall = {}
+  for record in records:
+    if record.get("test") is not None:
+      wall[record["test"]] = wall.get(record["test"], 0.0) + record["wall_s"]
+  iterations = {}
+  for test_list in test_lists:
+    for test in test_list:
+      iterations[test['test']] = iterations.get(test['test'], 0) + \
+        len(test.get('shard_iterations', range(test['iterations'])))
+  runtimes = {name: wall[name] / max(count, 1)
+              for name, count in iterations.items() if name in wall}
+  with open(os.path.join(output_dir, SHARD_RUNTIMES), "w") as f:
+    json.dump(runtimes, f, indent=1, sort_keys=True)
+
+
+def merge_shards(shard_dirs, output_dir, runtimes_path):
+  """Merge the results of the shards of a regression
+
+  iss_regr.log and the tandem YAML reports of the shards are gathered in
+  output_dir, and their runtimes are added to the runtimes file, if any.
+  """
+  os.makedirs(output_dir, exist_ok=True)
+  report = RegrReport(os.path.join(output_dir, "iss_regr.log"))
+  runtimes = read_runtimes(runtimes_path) if runtimes_path else {}
+  for shard_dir in shard_dirs:
+    shard_report = os.path.join(shard_dir, "iss_regr.log")
+    if os.path.isfile(shard_report):
+      report.merge(shard_report)
+    for yaml_report in glob.glob(os.path.join(shard_dir, "*_sim", "*.yaml")):
+      dest = os.path.join(output_dir, os.path.relpath(yaml_report, shard_dir))
+      os.makedirs(os.path.dirname(dest), exist_ok=True)
+      shutil.copyfile(yaml_report, dest)
+    runtimes.update(read_runtimes(os.path.join(shard_dir, SHARD_RUNTIMES)))
+  if runtimes_path:
+    write_runtimes(runtimes_path, runtimes)
+    logging.info("Shard runtimes: %s, %d tests, sha256 %s" %
+                 (runtimes_path, len(runtimes), hash_file(runtimes_path)[:16]))
+  for line in report.save():
+    logging.info(line)
+  logging.info("Merged regression report is saved to %s" % report.path)
+  return report
+
+
+def main():
+  parser = argparse.ArgumentParser(description="Merge the results of cva6.py --shard runs")
+  subparsers = parser.add_subparsers(dest="command", required=True)
+  merge = subparsers.add_parser("merge", help="Merge the output directories of the shards")
+  merge.add_argument("shard_dirs", type=str, nargs="+",
+                     help="Output directories of the shards")
+  merge.add_argument("-o", "--output", type=str, required=True,
+                     help="Output directory of the merged results")
+  merge.add_argument("--shard_runtimes", type=str, default=None,
+                     help="Runtimes file shared by the shards, updated with "
+                          "their runtimes")
+  args = parser.parse_args()
+  logging.basicConfig(format="%(message)s", level=logging.INFO)
+  merge_shards(args.shard_dirs, args.output, args.shard_runtimes)
+
+
+if __name__ == "__main__":
+  main()
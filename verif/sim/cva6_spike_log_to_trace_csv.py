@@ -25,6 +25,7 @@ import logging
 sys.path.insert(0, os.path.dirname(os.path.realpath(__file__)))
 
 from riscv_trace_csv import *
+from cva6_trace_parser import *
 from lib import *
 
 RD_RE = re.compile(r"(core\s+\d+:\s+)?(?P<pri>\d) 0x(?P<addr>[a-f0-9]+?) " \
@@ -36,6 +37,11 @@ ADDR_RE = re.compile(
     r"(?P<rd>[a-z0-9]+?),(?P<imm>[\-0-9]+?)\((?P<rs1>[a-z0-9]+)\)")
 ILLE_RE = re.compile(r"trap_illegal_instruction")
 
+START_TRAMPOLINE_RE = re.compile(r'core.*: 0x0*10000 ')
+END_TRAMPOLINE_RE = re.compile(r'core.*: 0x0*10010 ')
+
+HEX_DIGITS = frozenset("0123456789abcdef")
+
 LOGGER = logging.getLogger()
 
 
@@ -59,167 +65,209 @@ def process_instr(trace):
             m.group("rd"), m.group("rs1"), m.group("imm"))
 
 
-def read_spike_instr(match, full_trace):
-    """Unpack a regex match for CORE_RE to a RiscvInstructionTraceEntry
+def core_payload(line):
+    """Find what follows the "core <n>: " prefix of a Spike log line.
 
-    If full_trace is true, extract operand data from the disassembled
-    instruction.
+    Returns the index of the payload, or -1 if the line does not start with a
+    prefix matching r"core\s+\d+:\s+".
 
     """
-    # Extract the disassembled instruction.
-    disasm = match.group('instr')
+    if not line.startswith("core"):
+        return -1
+    colon = line.find(":", 4)
+    hart = line[4:colon]
+    if colon < 0 or not hart[:1].isspace() or not hart.lstrip().isdecimal():
+        return -1
+    p = colon + 1
+    n = len(line)
+    while p < n and line[p].isspace():
+        p += 1
+    return p if p > colon + 1 else -1
 
-    # Spike's disassembler shows a relative jump as something like "j pc +
-    # 0x123" or "j pc - 0x123". We just want the relative offset.
-    disasm = disasm.replace('pc + ', '').replace('pc - ', '-')
 
-    instr = RiscvInstructionTraceEntry()
-    instr.pc = match.group('addr')
-    instr.instr_str = disasm
-    instr.binary = match.group('bin')
-    if full_trace:
-        opcode = disasm.split(' ')[0]
-        operand = disasm[len(opcode):].replace(' ', '')
-        instr.instr, instr.operand = \
-            convert_pseudo_instr(opcode, operand, instr.binary)
+def split_core_line(line, p):
+    """Split an instruction line, the equivalent of CORE_RE.match.
 
-        process_instr(instr)
+    p is the index returned by core_payload(). Returns (addr, bin, instr), or
+    None if CORE_RE does not match the line.
 
-    return instr
+    """
+    if not line.startswith("0x", p):
+        return None
+    k = line.find(" ", p + 2)
+    if k <= p + 2 or not HEX_DIGITS.issuperset(line[p + 2:k]) or \
+       not line.startswith(" (0x", k):
+        return None
+    j = line.find(") ", k + 4)
+    if j < 0:
+        return None
+    instr = line[j + 2:]
+    if instr.endswith("\n"):
+        instr = instr[:-1]
+    if "\n" in instr:
+        return None
+    return line[p + 2:k], line[k + 4:j], instr
+
+
+def hex_end(line, i):
+    """Get the end of the run of [a-f0-9] starting at line[i]"""
+    e = line.find(" ", i)
+    if e < 0:
+        e = len(line) - line.endswith("\n")
+    if HEX_DIGITS.issuperset(line[i:e]):
+        return e
+    while line[i] in HEX_DIGITS:
+        i += 1
+    return i
+
+
+# Returned by split_commit_line() when only RD_RE can tell.
+USE_REGEX = ()
+
+
+def split_commit_line(line, p):
+    """Split a commit line, the equivalent of RD_RE.match.
+
+    p is the index returned by core_payload(). Returns (pri, reg, val), None if
+    RD_RE does not match the line, or USE_REGEX for the unusual lines where
+    the answer depends on regex backtracking.
 
+    """
+    n = len(line)
+    if p + 4 > n or not line[p].isdecimal() or not line.startswith(" 0x", p + 1):
+        return None
+    k = line.find(" ", p + 4)
+    if k <= p + 4 or not HEX_DIGITS.issuperset(line[p + 4:k]) or \
+       not line.startswith("(", k + 1):
+        return None
+    # Take the binary up to the first ')'. RD_RE would retry with a longer
+    # one if the end of the line does not match.
+    t = line.find(")", k + 2)
+    if t < 0:
+        return None
+    retry = USE_REGEX if line.find(")", t + 1) >= 0 else None
+    # CSR writes: ( c\S* 0x[a-f0-9]+)*
+    while line.startswith(" c", t + 1):
+        q = line.find(" ", t + 3)
+        name = line[t + 3:q]
+        if q < 0 or (name and name.split() != [name]) or \
+           not line.startswith(" 0x", q):
+            break
+        h = hex_end(line, q + 3)
+        if h == q + 3:
+            break
+        t = h - 1
+    # Register write, only the usual " x12  0x..." form is handled here.
+    t += 1
+    if not line.startswith(" ", t) or t + 1 >= n or line[t + 1] not in "xf":
+        return retry
+    d = t + 2
+    while d < n and "0" <= line[d] <= "9":
+        d += 1
+    s = d
+    while s < n and line[s] == " ":
+        s += 1
+    if d == t + 2 or s == d or not line.startswith("0x", s):
+        return USE_REGEX
+    h = hex_end(line, s + 2)
+    if h == s + 2:
+        return USE_REGEX
+    return line[p], line[t + 1:d], line[s + 2:h]
+
+
+class SpikeRegexDialect(TraceDialect):
+    """Spike log, as generated with the -l and --log-commits options
 
-def read_spike_trace(path, full_trace):
-    """Read a Spike simulation log at <path>, yielding executed instructions.
+    Since Spike has a strange trampoline that always runs at the start, we skip
+    instructions up to and including the one at PC 0x10010 (the end of the
+    trampoline).
 
-    This assumes that the log was generated with the -l and --log-commits options
-    to Spike.
+    """
+    name = "spike"
+    core_re = CORE_RE
+    rd_re = RD_RE
+    trampoline_start = ("10000 ", START_TRAMPOLINE_RE)
+    trampoline_end = ("10010 ", END_TRAMPOLINE_RE)
 
-    If full_trace is true, extract operands from the disassembled instructions.
+    def process_instr(self, trace):
+        process_instr(trace)
 
-    Since Spike has a strange trampoline that always runs at the start, we skip
-    instructions up to and including the one at PC 0x10010 (the end of the
-    trampoline). At the end of a DV program, there's an ECALL instruction, which
-    we take as a signal to stop checking, so we ditch everything that follows
-    that instruction.
 
-    This function yields instructions as it parses them as tuples of the form
-    (entry, illegal). entry is a RiscvInstructionTraceEntry. illegal is a
-    boolean, which is true if the instruction caused an illegal instruction trap.
+class SpikeDialect(SpikeRegexDialect):
+    """Spike log parsed without regexes on the common path
+
+    Lines are dispatched on their "core N: " prefix and split with string
+    operations giving the same results as CORE_RE and RD_RE. The regexes are
+    only used for the rare lines that need them.
 
     """
+    def __init__(self):
+        # All the lines of a log have the same "core   0: " prefix, the last
+        # one seen is checked first.
+        self.prefix = ""
+        self.plen = 0
+        # split_commit() is called on the line just given to split_instr()
+        self.line = None
+        self.p = -1
+
+    def payload(self, line):
+        plen = self.plen
+        if plen and line.startswith(self.prefix) and len(line) > plen and \
+           not line[plen].isspace():
+            return plen
+        p = core_payload(line)
+        if p >= 0:
+            self.prefix = line[:p]
+            self.plen = p
+        return p
+
+    def split_instr(self, line):
+        p = self.payload(line)
+        self.line = line
+        self.p = p
+        if p >= 0:
+            return split_core_line(line, p)
+        if line.startswith("core"):
+            return None
+        return SpikeRegexDialect.split_instr(self, line)
+
+    def split_commit(self, line):
+        p = self.p if line is self.line else self.payload(line)
+        if p >= 0:
+            fields = split_commit_line(line, p)
+            if fields is not USE_REGEX:
+                return fields
+        return SpikeRegexDialect.split_commit(self, line)
+
+
+def read_spike_trace(path, full_trace):
+    """Read a Spike simulation log at <path>, yielding executed instructions.
 
-    # This loop is a simple FSM with states TRAMPOLINE, INSTR, EFFECT. The idea
-    # is that we're in state TRAMPOLINE until we get to the end of Spike's
-    # trampoline, then we switch between INSTR (where we expect to read an
-    # instruction) and EFFECT (where we expect to read commit information).
-    #
-    # We yield a RiscvInstructionTraceEntry object each time we leave EFFECT
-    # (going back to INSTR), we loop back from INSTR to itself, or we get to the
-    # end of the file and have an instruction in hand.
-    #
-    # On entry to the loop body, we are in state TRAMPOLINE if in_trampoline is
-    # true. Otherwise, we are in state EFFECT if instr is not None, otherwise we
-    # are in state INSTR.
-
-    start_trampoline_re = re.compile(r'core.*: 0x0*10000 ')
-    end_trampoline_re = re.compile(r'core.*: 0x0*10010 ')
-
-    in_trampoline = False
-    instr = None
-
-    with open(path, 'r') as handle:
-        for line in handle:
-            if in_trampoline:
-                # The TRAMPOLINE state
-                if end_trampoline_re.match(line):
-                    in_trampoline = False
-                continue
-            elif start_trampoline_re.match(line):
-                in_trampoline = True
-                continue
-
-            if instr is None:
-                # The INSTR state. We expect to see a line matching CORE_RE.
-                # We'll discard any other lines.
-                instr_match = CORE_RE.match(line)
-                if not instr_match:
-                    continue
-
-                instr = read_spike_instr(instr_match, full_trace)
-
-                # If instr.instr_str is 'ecall', we should stop.
-                if instr.instr_str == 'ecall':
-                    break
-
-                continue
-
-            # The EFFECT state. If the line matches CORE_RE, we should have been in
-            # state INSTR, so we yield the instruction we had, read the new
-            # instruction and continue. As above, if the new instruction is 'ecall',
-            # we need to stop immediately.
-            instr_match = CORE_RE.match(line)
-            if instr_match:
-                yield instr, False
-                instr = read_spike_instr(instr_match, full_trace)
-                if instr.instr_str == 'ecall':
-                    break
-                continue
-
-            # The line doesn't match CORE_RE, so we are definitely on a follow-on
-            # line in the log. First, check for illegal instructions
-            if 'trap_illegal_instruction' in line:
-                yield (instr, True)
-                instr = None
-                continue
-
-            # The instruction seems to have been fine. Do we have commit data (from
-            # the --log-commits Spike option)?
-            commit_match = RD_RE.match(line)
-            if commit_match:
-                instr.gpr.append(gpr_to_abi(commit_match.group('reg')
-                                            .replace(' ', '')) +
-                                 ':' + commit_match.group('val'))
-                instr.mode = commit_match.group('pri')
-
-        # At EOF, we might have an instruction in hand. Yield it if so.
-        if instr is not None:
-            yield (instr, False)
-
-
-def process_spike_sim_log(spike_log, csv, full_trace=0):
+    This assumes that the log was generated with the -l and --log-commits options
+    to Spike. See read_trace() for the details.
+
+    """
+    return read_trace(path, SpikeDialect(), full_trace)
+
+
+def process_spike_sim_log(spike_log, csv, full_trace=0, legacy=False):
     """Process SPIKE simulation log.
 
     Extract instruction and affected register information from spike simulation
-    log and write the results to a CSV file at csv. Returns the number of
-    instructions written.
+    log and write the results to a CSV file at csv, or to a binary trace if csv
+    ends with .bin. Returns the number of instructions written.
+
+    The legacy mode goes through the regexes and RiscvInstructionTraceCsv, it is
+    the reference for the output of the default one.
 
     """
     logging.info("Processing spike log : {}".format(spike_log))
-    instrs_in = 0
-    instrs_out = 0
-
-    with open(csv, "w") as csv_fd:
-        trace_csv = RiscvInstructionTraceCsv(csv_fd)
-        trace_csv.start_new_trace()
-
-        for (entry, illegal) in read_spike_trace(spike_log, full_trace):
-            instrs_in += 1
-            if illegal and full_trace:
-                logging.debug("Illegal instruction: {}, opcode:{}"
-                              .format(entry.instr_str, entry.binary))
-
-            # Instructions that cause no architectural update (which includes illegal
-            # instructions) are ignored if full_trace is false.
-            #
-            # We say that an instruction caused an architectural update if either we
-            # saw a commit line (in which case, entry.gpr will contain a single
-            # entry) or the instruction was 'wfi' or 'ecall'.
-            if not (full_trace or entry.gpr or entry.instr_str in ['wfi',
-                                                                   'ecall']):
-                continue
-
-            trace_csv.write_trace_entry(entry)
-            instrs_out += 1
+    if legacy:
+        instrs_in, instrs_out = write_trace_entries(
+            spike_log, csv, SpikeRegexDialect(), full_trace)
+    else:
+        instrs_in, instrs_out = write_trace(
+            spike_log, csv, SpikeDialect(), full_trace)
 
     logging.info("Processed instruction count : {}".format(instrs_in))
     logging.info("CSV saved to : {}".format(csv))
@@ -230,18 +278,24 @@ def main():
     # Parse input arguments
     parser = argparse.ArgumentParser()
     parser.add_argument("--log", type=str, help="Input spike simulation log")
-    parser.add_argument("--csv", type=str, help="Output trace csv_buf file")
+    parser.add_argument("--csv", type=str,
+                        help="Output trace csv_buf file, or binary trace file "
+                             "if it ends with .bin")
     parser.add_argument("-f", "--full_trace", dest="full_trace",
                         action="store_true",
                         help="Generate the full trace")
     parser.add_argument("-v", "--verbose", dest="verbose", action="store_true",
                         help="Verbose logging")
+    parser.add_argument("--legacy", dest="legacy", action="store_true",
+                        help="Use the regex based parser, the reference for "
+                             "the output of the fast one")
     parser.set_defaults(full_trace=False)
     parser.set_defaults(verbose=False)
+    parser.set_defaults(legacy=False)
     args = parser.parse_args()
     setup_logging(args.verbose)
     # Process spike log
-    process_spike_sim_log(args.log, args.csv, args.full_trace)
+    process_spike_sim_log(args.log, args.csv, args.full_trace, args.legacy)
 
 
 if __name__ == "__main__":
@@ -0,0 +1,190 @@
+# Copyright 2024 Thales DIS France SAS
+#
+# Licensed under the Solderpad Hardware Licence, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# SPDX-License-Identifier: Apache-2.0 WITH SHL-2.0
+# You may obtain a copy of the License at https://solderpad.org/licenses/
+
+"""
+Run the Spike simulations of cva6.py without going through make
+
+Spike loads a single ELF per process, so each test still starts its own Spike.
+What is saved is the make and shell startup of each test: the "make spike"
+command of cva6.yaml is expanded once with make --dry-run, with the ELF and log
+replaced by placeholders, and its recipe is then run directly by the jobs of
+cva6.py for each ELF. The raw output (<log>.iss) and the log are identical to
+those of make, including the lines make prints around the recipe. The working
+directories given to parallel jobs by get_iss_cmd() are replaced by
+placeholders as well, so that all the tests share the expansion.
+
+The dry run of each command is checked against the one of its first ELF, and
+commands whose recipe depends on the ELF or log in any other way go through
+make as before. A failing recipe is not run again by make: its return code is
+reported like the one of make.
+"""
+
+import logging
+import os
+import re
+import subprocess
+import time
+
+from cva6_policy import run_command
+
+ELF = "__CVA6_ELF__"
+LOG = "__CVA6_LOG__"
+# Working directory of make -C, as given and as printed by make
+WORK = "__CVA6_WORK__"
+REAL_WORK = "__CVA6_REAL_WORK__"
+MAKE_DIR_RE = re.compile(r"^make -C (?P<dir>\S+) ")
+# Messages of make itself, as opposed to the commands of the recipe
+MAKE_MESSAGE_RE = re.compile(r"^(make(\[\d+\])?|\S*[Mm]akefile[^:\s]*:\d+): ")
+ENTERING_DIRECTORY_RE = re.compile(r"^make(\[\d+\])?: Entering directory '(?P<dir>.*)'$")
+
+
+class SpikeRecipe:
+  """Commands run by a make command, with what make prints around them
+
+  header and footer hold the messages printed by make before and after the
+  recipe, commands the recipe lines as passed to the shell.
+  """
+  def __init__(self, header, commands, footer):
+    self.header = header
+    self.commands = commands
+    self.footer = footer
+    self.cwd = None
+    for line in header:
+      m = ENTERING_DIRECTORY_RE.match(line)
+      if m:
+        self.cwd = m.group("dir")
+
+  def lines(self):
+    return self.header + self.commands + self.footer
+
+  def replace(self, paths):
+    """Get the recipe with each (old, new) string of paths replaced"""
+    def sub(line):
+      for old, new in paths:
+        line = line.replace(old, new)
+      return line
+    return SpikeRecipe(*[[sub(l) for l in lines]
+                         for lines in (self.header, self.commands, self.footer)])
+
+
+def placeholders(elf, log, work_dir):
+  """Get the (path, placeholder) pairs of a command, longest path first"""
+  paths = [(elf, ELF), (log, LOG)]
+  if work_dir:
+    paths += [(os.path.realpath(work_dir), REAL_WORK), (work_dir, WORK)]
+  return sorted(paths, key=lambda p: -len(p[0]))
+
+
+def templated(text, paths):
+  for path, placeholder in paths:
+    text = text.replace(path, placeholder)
+  return text
+
+
+def logical_lines(output):
+  """Split the output of make into lines, keeping backslash-newlines"""
+  lines = []
+  continued = False
+  for line in output.splitlines():
+    if continued:
+      lines[-1] += "\n" + line
+    else:
+      lines.append(line)
+    continued = line.endswith("\\")
+  return lines
+
+
+def read_recipe(make_cmd):
+  """Expand a make command with make --dry-run
+
+  Returns:
+    recipe : SpikeRecipe, None if it cannot be run without make
+  """
+  # make writes its messages to stderr, which the ISS commands redirect to
+  # <log>.iss as well, in the same order as in the dry run.
+  proc = subprocess.run("exec %s --dry-run" % make_cmd, shell=True, executable="/bin/bash",
+                        stdout=subprocess.PIPE, stderr=subprocess.STDOUT,
+                        universal_newlines=True)
+  if proc.returncode:
+    return None
+  header, commands, footer = [], [], []
+  for line in logical_lines(proc.stdout):
+    if MAKE_MESSAGE_RE.match(line):
+      (footer if commands else header).append(line)
+    elif footer:
+      # Messages printed between the commands, not worth replaying
+      return None
+    else:
+      commands.append(line)
+  return SpikeRecipe(header, commands, footer) if commands else None
+
+
+class SpikeWorker:
+  """Runs the recipes of the Spike commands of the ISS YAML
+
+  The recipes are expanded once per process. The jobs of run_jobs() are run
+  by long-lived worker processes forked after the first tests, so they start
+  with the recipes already expanded.
+  """
+  def __init__(self):
+    # SpikeRecipe of each command template, None for the ones run by make
+    self.recipes = {}
+
+  def recipe(self, make_cmd, elf, log):
+    """Get the recipe of a make command, None if it must be run by make"""
+    m = MAKE_DIR_RE.match(make_cmd)
+    paths = placeholders(elf, log, m.group("dir") if m else None)
+    template = templated(make_cmd, paths)
+    if template not in self.recipes:
+      # make must enter the working directory: only the ELF and log are
+      # replaced in the dry run.
+      recipe = read_recipe(templated(make_cmd, [p for p in paths if p[1] in (ELF, LOG)]))
+      if recipe is not None:
+        # The recipe must only depend on the ELF and log through their paths
+        actual = read_recipe(make_cmd)
+        if actual is None or \
+           actual.lines() != recipe.replace([(ELF, elf), (LOG, log)]).lines():
+          logging.info("Spike worker: recipe depends on the test, running make: %s" %
+                       make_cmd)
+          recipe = None
+        else:
+          recipe = recipe.replace([p for p in paths if p[1] not in (ELF, LOG)])
+      self.recipes[template] = recipe
+    recipe = self.recipes[template]
+    return recipe.replace([(p, path) for path, p in paths]) if recipe is not None else None
+
+  def run(self, cmd, elf, log, timeout_s):
+    """Run a Spike command of get_iss_cmd() without make
+
+    Args:
+      cmd       : ISS simulation command, make ... &> <log>.iss
+      elf       : ELF file simulated by the command
+      log       : ISS simulation log name
+      timeout_s : Timeout limit in seconds
+
+    Returns:
+      returncode : Return code of the first failing recipe command, else 0
+      timed_out  : True if the command timed out
+      None if the command must be run by make
+    """
+    suffix = " &> %s.iss" % log
+    if not cmd.endswith(suffix) or not cmd.startswith("make "):
+      return None
+    recipe = self.recipe(cmd[:-len(suffix)], elf, log)
+    if recipe is None:
+      return None
+    deadline = time.time() + timeout_s
+    with open(log + ".iss", "wb", buffering=0) as iss:
+      iss.write("".join(l + "\n" for l in recipe.header).encode())
+      for command in recipe.commands:
+        iss.write((command + "\n").encode())
+        returncode, timed_out = run_command(command, deadline - time.time(), cwd=recipe.cwd,
+                                            stdout=iss, stderr=subprocess.STDOUT)
+        if returncode or timed_out:
+          return returncode, timed_out
+      iss.write("".join(l + "\n" for l in recipe.footer).encode())
+    return 0, False
@@ -0,0 +1,76 @@
+# Copyright 2024 Thales DIS France SAS
+#
+# Licensed under the Solderpad Hardware Licence, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# SPDX-License-Identifier: Apache-2.0 WITH SHL-2.0
+# You may obtain a copy of the License at https://solderpad.org/licenses/
+
+"""
+Measure the startup time of cva6.py
+
+cva6.py is run several times with the given arguments, --help by default,
+and the fastest and median wall times are reported. With --importtime, the
+modules which took the longest to import are listed as well:
+
+  python3 cva6_startup_bench.py --runs 20 --importtime -- --help
+"""
+
+import argparse
+import os
+import re
+import statistics
+import subprocess
+import sys
+import time
+
+CVA6_PY = os.path.join(os.path.dirname(os.path.abspath(__file__)), "cva6.py")
+# Line of the output of python -X importtime
+IMPORT_TIME_RE = re.compile(r"^import time:\s+(?P<self>\d+) \|\s+(?P<cumulative>\d+) \|"
+                            r"(?P<indent>\s+)(?P<module>\S+)")
+
+
+def run_startup(args):
+  """Run cva6.py once, return its wall time in seconds"""
+  start = time.perf_counter()
+  subprocess.run([sys.executable, CVA6_PY] + args, cwd=os.path.dirname(CVA6_PY),
+                 stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+  return time.perf_counter() - start
+
+
+def import_times(args):
+  """Get the (cumulative time in seconds, module) of the top level imports"""
+  proc = subprocess.run([sys.executable, "-X", "importtime", CVA6_PY] + args,
+                        cwd=os.path.dirname(CVA6_PY), stdout=subprocess.DEVNULL,
+                        stderr=subprocess.PIPE, text=True)
+  times = []
+  for line in proc.stderr.splitlines():
+    m = IMPORT_TIME_RE.match(line)
+    if m and len(m.group("indent")) == 1:
+      times.append((int(m.group("cumulative")) / 1e6, m.group("module")))
+  return sorted(times, reverse=True)
+
+
+def main():
+  parser = argparse.ArgumentParser(description="Measure the startup time of cva6.py")
+  parser.add_argument("--runs", type=int, default=10,
+                      help="Number of runs of cva6.py")
+  parser.add_argument("--importtime", action="store_true",
+                      help="List the slowest imports of cva6.py")
+  parser.add_argument("--top", type=int, default=15,
+                      help="Number of imports listed with --importtime")
+  parser.add_argument("cva6_args", nargs=argparse.REMAINDER,
+                      help="Arguments of cva6.py, after --")
+  args = parser.parse_args()
+  cva6_args = args.cva6_args[1:] if args.cva6_args[:1] == ["--"] else args.cva6_args
+  cva6_args = cva6_args or ["--help"]
+
+  times = [run_startup(cva6_args) for _ in range(max(args.runs, 1))]
+  print("cva6.py %s: min %.3fs, median %.3fs over %d runs" %
+        (" ".join(cva6_args), min(times), statistics.median(times), len(times)))
+  if args.importtime:
+    for seconds, module in import_times(cva6_args)[:args.top]:
+      print("%8.3fs  %s" % (seconds, module))
+
+
+if __name__ == "__main__":
+  main()
@@ -0,0 +1,142 @@
+# Copyright 2024 Thales DIS France SAS
+#
+# Licensed under the Solderpad Hardware Licence, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# SPDX-License-Identifier: Apache-2.0 WITH SHL-2.0
+# You may obtain a copy of the License at https://solderpad.org/licenses/
+
+"""
+Abort the RTL simulations of cva6.py on their first tandem mismatches
+
+With SPIKE_TANDEM, the testbench compares each retired instruction with Spike
+and reports the mismatches in the output of the simulator, which the ISS
+commands redirect to <log>.iss. The monitor follows that output while the
+simulation runs and kills the simulation once it has reported a given number
+of mismatches, instead of letting a broken design run to its cycle limit.
+
+The simulator is killed before it writes its tandem report and its trace, so
+the monitor writes the report (<log>.yaml) itself and leaves an empty RTL log:
+the test is reported as failed by tandem_postprocess() and by the comparison
+with Spike.
+"""
+
+import logging
+import os
+import re
+import signal
+import subprocess
+import sys
+import time
+
+import yaml
+
+# Mismatch messages of the tandem scoreboard
+MISMATCH_RE = r"(?i)UVM_ERROR.*mismatch"
+# Seconds between two reads of the simulator output
+POLL_S = 1
+# Seconds given to the simulator to exit before it is killed
+KILL_GRACE_S = 5
+# exit_cause of the tandem reports of the aborted simulations
+ABORT_CAUSE = "ABORTED_ON_MISMATCHES"
+
+
+class MismatchCounter:
+  """Counts the mismatch messages appended to a file"""
+  def __init__(self, path, pattern):
+    self.path = path
+    self.pattern = re.compile(pattern)
+    self.offset = 0
+    self.partial = b""
+    self.count = 0
+
+  def poll(self):
+    """Read the lines written since the last call, return the mismatch count"""
+    try:
+      with open(self.path, "rb") as f:
+        f.seek(self.offset)
+        data = f.read()
+    except OSError:
+      return self.count
+    self.offset += len(data)
+    lines = (self.partial + data).split(b"\n")
+    self.partial = lines.pop()
+    for line in lines:
+      if self.pattern.search(line.decode(errors="replace")):
+        self.count += 1
+    return self.count
+
+
+def kill_group(ps):
+  """Stop a process and its children, see Popen(start_new_session=True)"""
+  try:
+    os.killpg(ps.pid, signal.SIGTERM)
+    ps.wait(timeout=KILL_GRACE_S)
+  except subprocess.TimeoutExpired:
+    os.killpg(ps.pid, signal.SIGKILL)
+    ps.wait()
+  except ProcessLookupError:
+    ps.wait()
+
+
+def write_abort_report(report, mismatches):
+  """Complete the tandem report of an aborted simulation"""
+  data = {}
+  if os.path.isfile(report):
+    with open(report, "r") as f:
+      data = yaml.safe_load(f) or {}
+  data.update(exit_cause=ABORT_CAUSE, exit_code=1, mismatches_count=mismatches,
+              aborted=True)
+  with open(report, "w") as f:
+    yaml.dump(data, f, default_flow_style=False)
+
+
+class TandemMonitor:
+  """Runs the RTL simulations, aborting them after max_mismatches mismatches
+
+  Args:
+    max_mismatches : Number of tandem mismatches the simulations are aborted at
+    pattern        : Regular expression of the mismatch messages
+  """
+  def __init__(self, max_mismatches, pattern=MISMATCH_RE):
+    self.max_mismatches = max_mismatches
+    self.pattern = pattern
+
+  def run(self, cmd, log, timeout_s):
+    """Run an RTL simulation command of get_iss_cmd()
+
+    Like run_cmd(), timeouts are logged and a failing command exits.
+
+    Args:
+      cmd       : ISS simulation command, writing its output to <log>.iss
+      log       : ISS simulation log name
+      timeout_s : Timeout limit in seconds
+
+    Returns:
+      mismatches : Number of mismatches the simulation was aborted at, None if
+                   it was not
+    """
+    counter = MismatchCounter(log + ".iss", self.pattern)
+    deadline = time.time() + timeout_s
+    ps = subprocess.Popen("exec " + cmd, shell=True, executable="/bin/bash",
+                          start_new_session=True)
+    while True:
+      try:
+        returncode = ps.wait(timeout=POLL_S)
+        break
+      except subprocess.TimeoutExpired:
+        pass
+      mismatches = counter.poll()
+      if mismatches >= self.max_mismatches:
+        kill_group(ps)
+        logging.error("%d tandem mismatches, simulation aborted: %s" % (mismatches, cmd))
+        write_abort_report(log + ".yaml", mismatches)
+        open(log, "w").close()
+        return mismatches
+      if time.time() >= deadline:
+        kill_group(ps)
+        logging.error("Timeout[%ds]: %s" % (timeout_s, cmd))
+        return None
+    if returncode:
+      logging.error("ERROR return code: %d, cmd:%s" % (returncode, cmd))
+      sys.exit(1)
+    return None
@@ -0,0 +1,93 @@
+# Copyright 2024 Thales DIS France SAS
+#
+# Licensed under the Solderpad Hardware Licence, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# SPDX-License-Identifier: Apache-2.0 WITH SHL-2.0
+# You may obtain a copy of the License at https://solderpad.org/licenses/
+
+"""
+Registry of the pre-defined targets of cva6.py, read from cva6-targets.yaml
+"""
+
+import glob
+import logging
+import os
+import shutil
+import sys
+
+import yaml
+
+
+class Target:
+  """ISA, ABI and files of a pre-defined target
+
+  priv is None when the tests run in the privilege modes given by --priv.
+  testlist and linker are None when the default ones are used.
+  """
+  def __init__(self, name, isa, mabi, priv=None, testlist=None, linker=None):
+    self.name = name
+    self.isa = isa
+    self.mabi = mabi
+    self.priv = priv
+    self.testlist = testlist
+    self.linker = linker
+
+
+class TargetRegistry:
+  """Pre-defined targets by name, see cva6-targets.yaml"""
+  def __init__(self, path):
+    self.path = path
+    self.targets = {}
+    try:
+      with open(path, "r") as f:
+        data = yaml.safe_load(f) or {}
+    except (OSError, yaml.YAMLError) as exc:
+      logging.error("Cannot read target manifest %s: %s" % (path, exc))
+      sys.exit(1)
+    root = os.path.dirname(os.path.abspath(path))
+    for name, entry in (data.get("targets") or {}).items():
+      if "isa" not in entry or "mabi" not in entry:
+        logging.error("Target %s of %s needs an isa and a mabi" % (name, path))
+        sys.exit(1)
+      files = {key: os.path.join(root, entry[key])
+               for key in ("testlist", "linker") if entry.get(key)}
+      self.targets[name] = Target(name, entry["isa"], entry["mabi"], entry.get("priv"),
+                                  **files)
+
+  def get(self, name):
+    """Get a Target by name, None if it is not pre-defined"""
+    return self.targets.get(name)
+
+  def names(self):
+    return list(self.targets)
+
+
+# TargetRegistry of each manifest read by this process
+_registries = {}
+
+
+def target_registry(path):
+  """Get the registry of a target manifest, reading it only once"""
+  path = os.path.abspath(path)
+  if path not in _registries:
+    _registries[path] = TargetRegistry(path)
+  return _registries[path]
+
+
+def copy_target_config(config_dir, base, target):
+  """Copy the Spike configuration and linker scripts of a target to another
+
+  Args:
+    config_dir : Directory of the configurations of the targets,
+                 config/gen_from_riscv_config
+    base       : Target the files are copied from
+    target     : Target the files are copied to
+  """
+  for subdir, pattern in (("spike", "spike.yaml"), ("linker", "*.ld")):
+    dest = os.path.join(config_dir, target, subdir)
+    os.makedirs(dest, exist_ok=True)
+    sources = glob.glob(os.path.join(config_dir, base, subdir, pattern))
+    if not sources:
+      logging.warning("No %s in %s" % (pattern, os.path.join(config_dir, base, subdir)))
+    for source in sources:
+      shutil.copy(source, dest)
@@ -0,0 +1,255 @@
+# Copyright 2024 Thales DIS France SAS
+#
+# Licensed under the Solderpad Hardware Licence, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# SPDX-License-Identifier: Apache-2.0 WITH SHL-2.0
+# You may obtain a copy of the License at https://solderpad.org/licenses/
+
+"""
+Wall time, CPU time and memory profile of the commands run by cva6.py
+
+Each command run through a function wrapped by timed_command() is recorded
+as one JSON line, tagged with the step, test, iteration and ISS it belongs to:
+
+  {"kind": "cmd", "step": "iss_sim", "test": "riscv_arithmetic_basic_test",
+   "iteration": 0, "iss": "spike", "cmd": "...", "start": 1700000000.0,
+   "wall_s": 1.2, "cpu_s": 1.1, "maxrss_kb": 52000, "pid": 1234}
+
+cpu_s is the user and system time of the command and its children. maxrss_kb
+is the peak RSS of the command, or of the largest of the children it waited
+for, as reported by wait4() for the commands reaped by wait_command(). The
+peak RSS of the other commands, e.g. the run_cmd() ones, is only known when it
+is above the one of all the commands run before by the process, it is null
+otherwise. Work done by cva6.py itself is recorded with kind "python" by
+timed_section().
+
+Worker processes append their records to the same file, the main process
+prints the slowest ones when it exits.
+"""
+
+import argparse
+import atexit
+import contextlib
+import functools
+import json
+import logging
+import os
+import resource
+import threading
+import time
+
+# Records file, None when telemetry is disabled
+path = None
+# Number of records in the summary printed at exit
+top = 10
+# Offset of the records of the current run in the file
+start_offset = 0
+# Process printing the summary
+owner_pid = None
+# Tags of the records, see telemetry_tags()
+current_tags = {}
+
+TAGS = ("step", "test", "iteration", "iss")
+
+# Resource usage of the commands reaped by wait_command() in the current
+# timed_command() call of each thread, None outside of one
+_reaped = threading.local()
+
+
+def start_telemetry(records, summary_top=10):
+  """Record the commands to the JSON lines file at records
+
+  The records are appended to the file. The summary_top slowest ones of this
+  run are logged at exit, with the total time of each step.
+  """
+  global path, top, start_offset, owner_pid
+  path = os.path.abspath(records)
+  top = summary_top
+  owner_pid = os.getpid()
+  with open(path, "a") as f:
+    start_offset = f.tell()
+  atexit.register(log_summary)
+  logging.info("Telemetry records saved to %s" % path)
+
+
+@contextlib.contextmanager
+def telemetry_tags(**tags):
+  """Tag the records of the commands run in this block
+
+  Tags nest, the inner value of a tag wins.
+  """
+  global current_tags
+  saved = current_tags
+  current_tags = dict(saved, **tags)
+  try:
+    yield
+  finally:
+    current_tags = saved
+
+
+def _run_tagged(tags, func, *args, **kwargs):
+  with telemetry_tags(**tags):
+    return func(*args, **kwargs)
+
+
+def tagged(func, **tags):
+  """Get func tagging the records of the commands it runs, for a Job"""
+  return functools.partial(_run_tagged, tags, func)
+
+
+def write_record(record):
+  record.update((tag, current_tags.get(tag)) for tag in TAGS)
+  record["pid"] = os.getpid()
+  # A single write of a line in append mode, so that the records of
+  # concurrent workers do not interleave.
+  with open(path, "a") as f:
+    f.write(json.dumps(record) + "\n")
+
+
+def _cpu_time(usage):
+  return usage.ru_utime + usage.ru_stime
+
+
+def wait_command(ps):
+  """Wait for a subprocess.Popen command, reaping it with os.wait4()
+
+  The resource usage of the command is recorded by the enclosing
+  timed_command().
+
+  Returns:
+    returncode : Return code of the command
+  """
+  _, status, usage = os.wait4(ps.pid, 0)
+  ps.returncode = os.waitstatus_to_exitcode(status)
+  usages = getattr(_reaped, "usages", None)
+  if usages is not None:
+    usages.append(usage)
+  return ps.returncode
+
+
+def _maxrss(usages, before, after):
+  if usages:
+    return max(usage.ru_maxrss for usage in usages)
+  # The peak RSS of the children only grows: a higher one is the command's.
+  return after.ru_maxrss if after.ru_maxrss > before.ru_maxrss else None
+
+
+def timed_command(func):
+  """Wrap a run_cmd() like function to record the commands it runs"""
+  @functools.wraps(func)
+  def run(cmd, *args, **kwargs):
+    if path is None or kwargs.get("debug_cmd"):
+      return func(cmd, *args, **kwargs)
+    start = time.time()
+    wall = time.perf_counter()
+    before = resource.getrusage(resource.RUSAGE_CHILDREN)
+    saved = getattr(_reaped, "usages", None)
+    _reaped.usages = usages = []
+    try:
+      return func(cmd, *args, **kwargs)
+    finally:
+      _reaped.usages = saved
+      after = resource.getrusage(resource.RUSAGE_CHILDREN)
+      write_record({
+        "kind": "cmd",
+        "cmd": cmd if isinstance(cmd, str) else " ".join(cmd),
+        "start": start,
+        "wall_s": round(time.perf_counter() - wall, 6),
+        "cpu_s": round(_cpu_time(after) - _cpu_time(before), 6),
+        "maxrss_kb": _maxrss(usages, before, after),
+      })
+  return run
+
+
+@contextlib.contextmanager
+def timed_section(name):
+  """Record the work done by cva6.py itself in this block"""
+  if path is None:
+    yield
+    return
+  start = time.time()
+  wall = time.perf_counter()
+  cpu = time.process_time()
+  try:
+    yield
+  finally:
+    write_record({
+      "kind": "python",
+      "cmd": name,
+      "start": start,
+      "wall_s": round(time.perf_counter() - wall, 6),
+      "cpu_s": round(time.process_time() - cpu, 6),
+      "maxrss_kb": resource.getrusage(resource.RUSAGE_SELF).ru_maxrss,
+    })
+
+
+def read_records(records, offset=0):
+  with open(records, "r") as f:
+    f.seek(offset)
+    return [json.loads(line) for line in f if line.strip()]
+
+
+def run_records():
+  """Get the records of this run, an empty list when telemetry is disabled"""
+  if path is None or not os.path.isfile(path):
+    return []
+  return read_records(path, start_offset)
+
+
+def format_record(record):
+  tags = " ".join("%s=%s" % (tag, record[tag]) for tag in TAGS
+                  if record.get(tag) is not None)
+  cmd = record["cmd"]
+  if len(cmd) > 80:
+    cmd = cmd[:77] + "..."
+  maxrss = record["maxrss_kb"]
+  return "%9.2fs wall %9.2fs cpu %8s KB  %s  %s" % (
+    record["wall_s"], record["cpu_s"], maxrss if maxrss is not None else "-", tags, cmd)
+
+
+def summary(records, count=10):
+  """Get the summary of a list of records, as a list of lines"""
+  lines = []
+  steps = {}
+  for record in records:
+    step = steps.setdefault(record.get("step") or "other", [0, 0.0, 0.0])
+    step[0] += 1
+    step[1] += record["wall_s"]
+    step[2] += record["cpu_s"]
+  lines.append("Telemetry: %d records" % len(records))
+  for name, (n, wall, cpu) in sorted(steps.items(), key=lambda s: -s[1][1]):
+    lines.append("  %-12s %6d records %10.2fs wall %10.2fs cpu" % (name, n, wall, cpu))
+  slowest = sorted(records, key=lambda r: -r["wall_s"])[:count]
+  if slowest:
+    lines.append("Slowest %d:" % len(slowest))
+    lines += ["  " + format_record(record) for record in slowest]
+  return lines
+
+
+def log_summary():
+  """Log the summary of the records of this run, registered at exit"""
+  if path is None or top <= 0 or not os.path.isfile(path):
+    return
+  # Forked processes inherit the handler, only the main one prints.
+  if os.getpid() != owner_pid:
+    return
+  for line in summary(read_records(path, start_offset), top):
+    logging.info(line)
+
+
+def main():
+  parser = argparse.ArgumentParser(description="Summarize telemetry records")
+  parser.add_argument("records", type=str, help="JSON lines file of cva6.py --telemetry")
+  parser.add_argument("--top", type=int, default=10,
+                      help="Number of slowest records listed")
+  parser.add_argument("--step", type=str, default="",
+                      help="Only summarize the records of this step")
+  args = parser.parse_args()
+  records = read_records(args.records)
+  if args.step:
+    records = [record for record in records if record.get("step") == args.step]
+  print("\n".join(summary(records, args.top)))
+
+
+if __name__ == "__main__":
+  main()
@@ -0,0 +1,194 @@
+# Copyright 2024 Thales DIS France SAS
+#
+# Licensed under the Solderpad Hardware Licence, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# SPDX-License-Identifier: Apache-2.0 WITH SHL-2.0
+# You may obtain a copy of the License at https://solderpad.org/licenses/
+
+"""
+Index of the regression test lists, with their imports resolved
+
+Tests are looked up by name only: the entries of the CVA6 test lists have no
+tags to select them by, groups of tests are test lists of their own.
+"""
+
+import copy
+import hashlib
+import json
+import logging
+import os
+import sys
+import tempfile
+
+import yaml
+
+# Bump when the layout of TestlistIndex changes, to drop older cache files
+VERSION = 2
+
+
+def read_testlist(path):
+  try:
+    with open(path, "r") as f:
+      return yaml.safe_load(f)
+  except (OSError, yaml.YAMLError) as exc:
+    logging.error("Cannot read test list %s: %s" % (path, exc))
+    sys.exit(1)
+
+
+class TestlistIndex:
+  """Entries of a test list and of the test lists it imports, in order
+
+  The needs of each entry are merged in a dictionary once, and the entries
+  are indexed by test name. The index is valid as long as none of the files
+  it was read from changes.
+  """
+  def __init__(self, testlist, riscv_dv_root):
+    self.version = VERSION
+    # {path: (mtime_ns, size)} of the test lists read
+    self.files = {}
+    self.entries = []
+    self.needs = []
+    self.names = {}
+    self._read(testlist, riscv_dv_root)
+
+  def state(self):
+    """Get the index as JSON data, see from_state()"""
+    return {"version": self.version,
+            "files": {path: list(stat) for path, stat in self.files.items()},
+            "entries": self.entries, "needs": self.needs, "names": self.names}
+
+  @classmethod
+  def from_state(cls, state):
+    """Get an index from the data of state()"""
+    index = cls.__new__(cls)
+    index.version = state["version"]
+    index.files = {path: tuple(stat) for path, stat in state["files"].items()}
+    index.entries = state["entries"]
+    index.needs = state["needs"]
+    index.names = state["names"]
+    return index
+
+  def _read(self, testlist, riscv_dv_root):
+    logging.info("Reading test list : {}".format(testlist))
+    st = os.stat(testlist)
+    self.files[os.path.abspath(testlist)] = (st.st_mtime_ns, st.st_size)
+    yaml_data = read_testlist(testlist)
+    if 'testlist' in yaml_data and isinstance(yaml_data['testlist'], list):
+      yaml_testlist = yaml_data['testlist']
+    else:
+      yaml_testlist = yaml_data
+    for entry in yaml_testlist:
+      if 'import' in entry:
+        self._read(entry['import'].replace('<riscv_dv_root>', riscv_dv_root), riscv_dv_root)
+        continue
+      needs = {}
+      for need in entry.get('needs') or []:
+        needs.update(need)
+      self.names.setdefault(entry['test'], []).append(len(self.entries))
+      self.entries.append(entry)
+      self.needs.append(needs)
+
+  def valid(self):
+    """Check that the test lists are unchanged since they were read"""
+    for path, (mtime, size) in self.files.items():
+      try:
+        st = os.stat(path)
+      except OSError:
+        return False
+      if (st.st_mtime_ns, st.st_size) != (mtime, size):
+        return False
+    return True
+
+  def select(self, test, iterations, hwconfig_opts=None):
+    """Get copies of the entries of the tests to run
+
+    The entries are in test list order, imports included. Entries with no
+    iterations are left out, as well as the ones whose needs are not met by
+    hwconfig_opts if given.
+
+    Args:
+      test          : Comma separated test names, "all" means all the tests
+      iterations    : Number of iterations of each test, 0 keeps the test list
+                      iterations
+      hwconfig_opts : Configuration of the core, see the needs of the tests
+
+    Returns:
+      matched_list  : A list of matched tests
+    """
+    if test == "all":
+      indexes = range(len(self.entries))
+    else:
+      indexes = sorted(set(i for name in test.split(',') for i in self.names.get(name, [])))
+    matched_list = []
+    for i in indexes:
+      entry = self.entries[i]
+      if iterations > 0 and entry['iterations'] > 0:
+        entry_iterations = iterations
+      else:
+        entry_iterations = entry['iterations']
+      if entry_iterations <= 0:
+        continue
+      logging.info("Found matched tests: {}, iterations:{}".format(
+        entry['test'], entry_iterations))
+      if hwconfig_opts is not None and \
+         any(hwconfig_opts[key] != value for key, value in self.needs[i].items()):
+        logging.info('Removing test %s CVA6 configuration can not run it' % entry['test'])
+        continue
+      # Entries are updated by cva6.py, keep the index untouched
+      entry = copy.deepcopy(entry)
+      entry['iterations'] = entry_iterations
+      matched_list.append(entry)
+    return matched_list
+
+
+# TestlistIndex of each test list read by this process
+_indexes = {}
+
+
+def testlist_index(testlist, riscv_dv_root, cache_dir=""):
+  """Get the index of a test list, reading it only if it changed
+
+  Indexes are kept for the rest of the process, and in cache_dir if given so
+  that the next runs and the other shards of a regression can reuse them.
+  """
+  key = (os.path.abspath(testlist), riscv_dv_root)
+  index = _indexes.get(key)
+  if index and index.valid():
+    return index
+  path = None
+  if cache_dir:
+    name = hashlib.sha256(("%s\0%s" % key).encode()).hexdigest()
+    path = os.path.join(cache_dir, name + ".json")
+    try:
+      with open(path, "r") as f:
+        state = json.load(f)
+      if state.get("version") == VERSION:
+        index = TestlistIndex.from_state(state)
+        if index.valid():
+          logging.info("Test list index is up to date: {}".format(testlist))
+          _indexes[key] = index
+          return index
+    except (OSError, ValueError, KeyError, TypeError, AttributeError):
+      pass
+  index = TestlistIndex(testlist, riscv_dv_root)
+  _indexes[key] = index
+  if path:
+    save_index(path, index)
+  return index
+
+
+def save_index(path, index):
+  """Save an index in the cache, unless JSON cannot hold its entries as is"""
+  state = index.state()
+  try:
+    data = json.dumps(state)
+  except (TypeError, ValueError):
+    return
+  # Non-string keys would come back as strings
+  if json.loads(data) != state:
+    return
+  os.makedirs(os.path.dirname(path), exist_ok=True)
+  fd, tmp = tempfile.mkstemp(dir=os.path.dirname(path), suffix=".tmp")
+  with os.fdopen(fd, "w") as f:
+    f.write(data)
+  os.replace(tmp, path)
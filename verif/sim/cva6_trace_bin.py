@@ -0,0 +1,224 @@
+# Copyright 2024 Thales DIS France SAS
+#
+# Licensed under the Solderpad Hardware Licence, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# SPDX-License-Identifier: Apache-2.0 WITH SHL-2.0
+# You may obtain a copy of the License at https://solderpad.org/licenses/
+
+"""
+Columnar binary instruction trace files, an alternative to trace CSV files
+"""
+
+import mmap
+import struct
+import sys
+from array import array
+
+TRACE_BIN_EXT = ".bin"
+
+MAGIC = b"CVA6TRC\0"
+VERSION = 1
+
+# Header: magic, version, number of instructions, GPR writes and strings.
+HEADER = struct.Struct("<8sIQQQ")
+
+# Columns, in file order: name, array typecode and length (in instructions
+# "n", GPR writes "g", strings "s" or bytes of string data "d").
+#   pc, bin, gpr_val : Hex fields, see TraceBinWriter.hex_field()
+#   mode, instr_str  : Indexes in the string table
+#   gpr_start        : Index of the first GPR write of each instruction
+#   gpr_name         : Index in the string table of the register ABI name
+COLUMNS = [
+  ("pc", "Q", "n"), ("pc_w", "B", "n"),
+  ("bin", "Q", "n"), ("bin_w", "B", "n"),
+  ("mode", "I", "n"), ("instr_str", "I", "n"),
+  ("gpr_start", "I", "n+1"),
+  ("gpr_name", "I", "g"), ("gpr_val", "Q", "g"), ("gpr_w", "B", "g"),
+  ("str_start", "Q", "s+1"), ("str_data", "B", "d"),
+]
+
+# Width of a hex field stored in the string table
+STR_WIDTH = 0xff
+
+HEX_DIGITS = frozenset("0123456789abcdef")
+
+
+def _column_offsets(counts):
+  """Get the offset and length of each column, the end of the file"""
+  layout = {}
+  offset = HEADER.size + 8 * len(COLUMNS)
+  for name, typecode, length in COLUMNS:
+    n = counts[length[0]] + (1 if length.endswith("+1") else 0)
+    offset = (offset + 7) & ~7
+    layout[name] = (offset, n)
+    offset += n * array(typecode).itemsize
+  return layout, offset
+
+
+class TraceBinWriter:
+  """Build a binary trace file, instruction by instruction
+
+  Rows are given as for trace_csv_row(), the columns are kept in arrays and
+  written by close().
+  """
+  def __init__(self, path):
+    self.path = path
+    self.columns = {name: array(typecode) for name, typecode, _ in COLUMNS}
+    self.columns["gpr_start"].append(0)
+    self.strings = {}
+
+  def intern(self, s):
+    index = self.strings.get(s)
+    if index is None:
+      index = self.strings[s] = len(self.strings)
+    return index
+
+  def hex_field(self, s):
+    """Encode a field as (value, width)
+
+    Lowercase hex strings of up to 16 digits are stored as their value and
+    number of digits, anything else as an index in the string table with
+    STR_WIDTH.
+    """
+    if 0 < len(s) <= 16 and HEX_DIGITS.issuperset(s):
+      return int(s, 16), len(s)
+    return self.intern(s), STR_WIDTH
+
+  def add(self, pc, gpr, binary, mode, instr_str):
+    c = self.columns
+    value, width = self.hex_field(pc)
+    c["pc"].append(value)
+    c["pc_w"].append(width)
+    value, width = self.hex_field(binary)
+    c["bin"].append(value)
+    c["bin_w"].append(width)
+    c["mode"].append(self.intern(mode))
+    c["instr_str"].append(self.intern(instr_str))
+    for update in gpr:
+      name, _, val = update.rpartition(":")
+      value, width = self.hex_field(val)
+      c["gpr_name"].append(self.intern(name))
+      c["gpr_val"].append(value)
+      c["gpr_w"].append(width)
+    c["gpr_start"].append(len(c["gpr_name"]))
+
+  def close(self):
+    c = self.columns
+    data = [s.encode() for s in self.strings]
+    c["str_start"].append(0)
+    for s in data:
+      c["str_start"].append(c["str_start"][-1] + len(s))
+    c["str_data"].frombytes(b"".join(data))
+    counts = {"n": len(c["pc"]), "g": len(c["gpr_name"]), "s": len(data),
+              "d": len(c["str_data"])}
+    layout, _ = _column_offsets(counts)
+    with open(self.path, "wb") as f:
+      f.write(HEADER.pack(MAGIC, VERSION, counts["n"], counts["g"], counts["s"]))
+      f.write(struct.pack("<%dQ" % len(COLUMNS), *[layout[name][0] for name, _, _ in COLUMNS]))
+      for name, _, _ in COLUMNS:
+        f.write(b"\0" * (layout[name][0] - f.tell()))
+        column = c[name]
+        if sys.byteorder == "big":
+          column.byteswap()
+        column.tofile(f)
+
+
+class TraceBin:
+  """Read a binary trace file
+
+  The file is memory-mapped and its columns are read in place, an
+  instruction is only decoded when it is asked for.
+  """
+  def __init__(self, path):
+    self.path = path
+    with open(path, "rb") as f:
+      self.mm = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+    magic, version, n, g, s = HEADER.unpack_from(self.mm)
+    if magic != MAGIC or version != VERSION:
+      raise ValueError("%s is not a version %d binary trace" % (path, VERSION))
+    offsets = struct.unpack_from("<%dQ" % len(COLUMNS), self.mm, HEADER.size)
+    self.views = []
+    self.n = n
+    view = memoryview(self.mm)
+    lengths = {"n": n, "g": g, "s": s}
+    for (name, typecode, length), offset in zip(COLUMNS, offsets):
+      if name == "str_data":
+        count = self.str_start[-1]
+      else:
+        count = lengths[length[0]] + (1 if length.endswith("+1") else 0)
+      size = array(typecode).itemsize
+      column = view[offset:offset + count * size]
+      if typecode != "B":
+        column = column.cast(typecode)
+      if sys.byteorder == "big" and typecode != "B":
+        column = array(typecode, column.tobytes())
+        column.byteswap()
+      self.views.append(column)
+      setattr(self, name, column)
+    self.decoded = {}
+
+  def __len__(self):
+    return self.n
+
+  def __enter__(self):
+    return self
+
+  def __exit__(self, *exc):
+    self.close()
+
+  def close(self):
+    for column in self.views:
+      if isinstance(column, memoryview):
+        column.release()
+    self.views = []
+    self.mm.close()
+
+  def string(self, index):
+    s = self.decoded.get(index)
+    if s is None:
+      s = self.decoded[index] = \
+        bytes(self.str_data[self.str_start[index]:self.str_start[index + 1]]).decode()
+    return s
+
+  def field(self, value, width):
+    """Decode a hex field"""
+    if width == STR_WIDTH:
+      return self.string(value)
+    return "%0*x" % (width, value)
+
+  def gpr_fields(self, i):
+    """Get the GPR writes of instruction i as (name, (width, value)) tuples
+
+    value is the string itself for the values kept in the string table, two
+    writes are equal if and only if their tuples are equal.
+    """
+    fields = []
+    for j in range(self.gpr_start[i], self.gpr_start[i + 1]):
+      width = self.gpr_w[j]
+      value = self.gpr_val[j]
+      if width == STR_WIDTH:
+        value = self.string(value)
+      fields.append((self.string(self.gpr_name[j]), (width, value)))
+    return fields
+
+  def gpr(self, i):
+    """Get the GPR writes of instruction i as "name:value" strings"""
+    return [self.string(self.gpr_name[j]) + ":" +
+            self.field(self.gpr_val[j], self.gpr_w[j])
+            for j in range(self.gpr_start[i], self.gpr_start[i + 1])]
+
+  def row(self, i):
+    """Get instruction i as (pc, gpr, binary, mode, instr_str)"""
+    return (self.field(self.pc[i], self.pc_w[i]), self.gpr(i),
+            self.field(self.bin[i], self.bin_w[i]), self.string(self.mode[i]),
+            self.string(self.instr_str[i]))
+
+  def rows(self):
+    for i in range(self.n):
+      yield self.row(i)
+
+  def trace_string(self, i):
+    """Same as RiscvInstructionTraceEntry.get_trace_string() for a CSV entry"""
+    pc, gpr, _, _, instr_str = self.row(i)
+    return "pc[{}] {}: {} {}".format(pc, instr_str, " ".join(gpr), "")
+
@@ -0,0 +1,315 @@
+# Copyright 2024 Thales DIS France SAS
+#
+# Licensed under the Solderpad Hardware Licence, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# SPDX-License-Identifier: Apache-2.0 WITH SHL-2.0
+# You may obtain a copy of the License at https://solderpad.org/licenses/
+
+"""
+Lock-step comparison of two instruction traces, read from logs, binary traces
+or trace CSV files
+"""
+
+import csv
+import sys
+from itertools import chain
+
+from cva6_trace_bin import STR_WIDTH, TRACE_BIN_EXT, TraceBin
+from cva6_trace_parser import trace_records
+
+# Number of GPR updates read from each trace and compared at once
+BATCH = 512
+
+
+def log_rows(path, dialect):
+  """Yield the rows of the trace CSV of a log, without writing it"""
+  for row in trace_records(path, dialect):
+    if row[1] or row[4] == 'wfi' or row[4] == 'ecall':
+      yield row
+
+
+def csv_rows(path):
+  with open(path, "r") as fd:
+    for row in csv.DictReader(fd):
+      yield (row['pc'], row['gpr'].split(';'), row['binary'], row['mode'],
+             row['instr_str'])
+
+
+def trace_rows(path, dialect=None):
+  """Yield the (pc, gpr, binary, mode, instr_str) rows of a trace
+
+  path is a simulation log if a dialect is given, else a binary trace or a
+  trace CSV file.
+  """
+  if dialect:
+    return log_rows(path, dialect)
+  if path.endswith(TRACE_BIN_EXT):
+    return bin_rows(path)
+  return csv_rows(path)
+
+
+def bin_rows(path):
+  with TraceBin(path) as trace:
+    yield from trace.rows()
+
+
+def trace_string(row):
+  """Same as RiscvInstructionTraceEntry.get_trace_string() for a CSV entry"""
+  return "pc[{}] {}: {} {}".format(row[0], row[4], " ".join(row[1]), "")
+
+
+def check_update_gpr(gpr_update, gpr):
+  """Same as check_update_gpr() of riscv-dv instr_trace_compare"""
+  gpr_state_change = 0
+  for update in gpr_update:
+    if update == "":
+      return 0
+    item = update.split(":")
+    if len(item) != 2:
+      sys.exit("Illegal GPR update format:" + update)
+    rd = item[0]
+    rd_val = item[1]
+    if rd in gpr:
+      if rd_val != gpr[rd]:
+        gpr_state_change = 1
+    else:
+      if int(rd_val, 16) != 0:
+        gpr_state_change = 1
+    gpr[rd] = rd_val
+  return gpr_state_change
+
+
+def check_update_gpr_fields(gpr_update, gpr):
+  """Same as check_update_gpr() for TraceBin.gpr_fields()"""
+  gpr_state_change = 0
+  for rd, rd_val in gpr_update:
+    if rd in gpr:
+      if rd_val != gpr[rd]:
+        gpr_state_change = 1
+    elif rd_val[0] != STR_WIDTH:
+      if rd_val[1] != 0:
+        gpr_state_change = 1
+    elif int(rd_val[1], 16) != 0:
+      gpr_state_change = 1
+    gpr[rd] = rd_val
+  return gpr_state_change
+
+
+def bin_fields(trace):
+  """Yield (index, gpr_fields) for the instructions of an open TraceBin"""
+  for i in range(len(trace)):
+    yield i, trace.gpr_fields(i)
+
+
+class TraceStream:
+  """One of the traces being compared
+
+  rows are tuples with the GPR writes at index 1, see trace_rows(). Binary
+  traces can also be read column-wise, without decoding their strings, see
+  TraceStream.from_bin().
+
+  index is the number of rows read so far, history holds the rows read since
+  the last call to changes() plus the <context> rows before them.
+  """
+  def __init__(self, rows, context=0, update=check_update_gpr,
+               describe=trace_string):
+    self.rows = iter(rows)
+    self.context = context
+    self.update = update
+    self.describe = describe
+    self.index = 0
+    self.gpr_val = {}
+    self.history = []
+    self.ended = False
+
+  @classmethod
+  def from_bin(cls, trace, context=0):
+    """Read the GPR writes of an open TraceBin as gpr_fields() tuples"""
+    return cls(bin_fields(trace), context, check_update_gpr_fields,
+               lambda row: trace.trace_string(row[0]))
+
+  def changes(self, count):
+    """Read up to the next <count> rows changing a GPR, as (index, row)"""
+    if self.context:
+      del self.history[:-self.context]
+    history = self.history if self.context else None
+    found = []
+    update = self.update
+    gpr_val = self.gpr_val
+    index = self.index
+    for row in self.rows:
+      index += 1
+      if history is not None:
+        history.append((index, row))
+      if update(row[1], gpr_val):
+        found.append((index, row))
+        if len(found) == count:
+          self.index = index
+          return found
+    self.index = index
+    self.ended = True
+    return found
+
+  def at_end(self, index):
+    """Check if the row at index is the last one of the trace"""
+    if index != self.index:
+      return False
+    if not self.ended:
+      row = next(self.rows, None)
+      if row is None:
+        self.ended = True
+      else:
+        self.rows = chain([row], self.rows)
+    return self.ended
+
+  def length(self):
+    """Read the rest of the trace, return its number of rows"""
+    for _ in self.rows:
+      self.index += 1
+    self.ended = True
+    return self.index
+
+  def window(self, index):
+    """Get the rows read up to index, with up to <context> rows before it"""
+    return [(i, row) for i, row in self.history
+            if index - self.context <= i <= index]
+
+
+def write_window(fd, name, stream, index):
+  fd.write("Divergence context in trace {}:\n".format(name))
+  for i, row in stream.window(index):
+    fd.write("{}{}[{}] : {}\n".format("> " if i == index else "  ", name,
+                                      i - 1, stream.describe(row)))
+
+
+def compare_trace_streams(trace1, trace2, name1, name2, fd,
+                          stop_on_first_error=False, mismatch_print_limit=5):
+  """Compare two traces in lock-step
+
+  Gives the same result and report as the in order mode of riscv-dv's
+  compare_trace_csv(), which cva6.py uses: GPR updates that change the state
+  of the registers are compared one to one. Both traces are read at the same
+  pace, BATCH updates at a time, and batches which are equal are counted as
+  matched at once.
+
+  Args:
+    trace1, trace2      : TraceStream of the traces, their context is the
+                          number of rows printed before the first mismatch
+    name1, name2        : Names of the traces in the report
+    fd                  : Report file object
+    stop_on_first_error : Stop reading the traces at the first mismatch
+    mismatch_print_limit: Number of mismatches printed
+
+  Returns:
+    compare_result      : [PASSED] or [FAILED] line of the report
+  """
+  matched_cnt = 0
+  mismatch_cnt = 0
+
+  def mismatch(index1, index2):
+    if mismatch_cnt == 1 and (trace1.context or trace2.context):
+      write_window(fd, name1, trace1, index1)
+      write_window(fd, name2, trace2, index2)
+
+  done = False
+  pending = []
+  while not done:
+    batch1 = trace1.changes(BATCH)
+    batch2 = trace2.changes(BATCH)
+    if len(batch1) == BATCH and len(batch2) == BATCH and \
+       not trace2.at_end(batch2[-1][0]) and \
+       [row[1] for _, row in batch1] == [row[1] for _, row in batch2]:
+      matched_cnt += BATCH
+      continue
+    # Same steps as compare_trace_csv(), one update at a time
+    for j, (index1, row1) in enumerate(batch1):
+      if j == len(batch2):
+        # No GPR update left in trace 2
+        mismatch_cnt += 1
+        fd.write("Mismatch[{}]:\n[{}] {} : {}\n".format(
+          mismatch_cnt, index1, name1, trace1.describe(row1)))
+        mismatch(index1, trace2.index)
+        fd.write("{} instructions left in trace {}\n".format(
+          trace1.length() - index1 + 1, name1))
+        done = True
+        break
+      index2, row2 = batch2[j]
+      if len(row1[1]) != len(row2[1]):
+        mismatch_cnt += 1
+        # print first few mismatches
+        if mismatch_cnt <= mismatch_print_limit:
+          fd.write("Mismatch[{}]:\n{}[{}] : {}\n".format(
+            mismatch_cnt, name1, index2 - 1, trace1.describe(row1)))
+          fd.write("{}[{}] : {}\n".format(name2, index2 - 1, trace2.describe(row2)))
+        mismatch(index1, index2)
+      elif row1[1] != row2[1]:
+        mismatch_cnt += 1
+        # print first few mismatches
+        if mismatch_cnt <= mismatch_print_limit:
+          fd.write("Mismatch[{}]:\n{}[{}] : {}\n".format(
+            mismatch_cnt, name1, index1 - 1, trace1.describe(row1)))
+          fd.write("{}[{}] : {}\n".format(name2, index2 - 1, trace2.describe(row2)))
+        mismatch(index1, index2)
+      else:
+        matched_cnt += 1
+      # Stop at the end of trace 2
+      if trace2.at_end(index2):
+        done = True
+        break
+      if stop_on_first_error and mismatch_cnt:
+        fd.write("Stopped on first mismatch\n")
+        done = True
+        break
+    else:
+      if len(batch1) < BATCH:
+        # End of trace 1, check if trace 2 changes the state again
+        pending = batch2[len(batch1):] or trace2.changes(1)
+        done = True
+  if pending:
+    index2 = pending[0][0]
+    left = trace2.length() - index2 + 1
+    fd.write("{} instructions left in trace {}\n".format(left, name2))
+    mismatch_cnt += left
+
+  if mismatch_cnt == 0:
+    compare_result = "[PASSED]: {} matched\n".format(matched_cnt)
+  else:
+    compare_result = "[FAILED]: {} matched, {} mismatch\n".format(
+      matched_cnt, mismatch_cnt)
+  fd.write(compare_result + "\n")
+  return compare_result
+
+
+def compare_traces(path1, path2, name1, name2, fd, dialect1=None,
+                   dialect2=None, stop_on_first_error=False, context=0,
+                   mismatch_print_limit=5):
+  """Compare two traces, writing the report to the file object fd
+
+  The traces are simulation logs if a dialect is given for them, else binary
+  traces or trace CSV files. Two binary traces are compared on their columns.
+  See compare_trace_streams().
+  """
+  fd.write("{} : {}\n".format(name1, path1))
+  fd.write("{} : {}\n".format(name2, path2))
+  if not dialect1 and not dialect2 and path1.endswith(TRACE_BIN_EXT) and \
+     path2.endswith(TRACE_BIN_EXT):
+    with TraceBin(path1) as bin1, TraceBin(path2) as bin2:
+      return compare_trace_streams(
+        TraceStream.from_bin(bin1, context), TraceStream.from_bin(bin2, context),
+        name1, name2, fd, stop_on_first_error, mismatch_print_limit)
+  return compare_trace_streams(
+    TraceStream(trace_rows(path1, dialect1), context),
+    TraceStream(trace_rows(path2, dialect2), context),
+    name1, name2, fd, stop_on_first_error, mismatch_print_limit)
+
+
+def compare_trace_files(path1, path2, name1, name2, log, **kwargs):
+  """Compare two traces, appending the report to the file at log
+
+  Same as compare_trace_csv() of riscv-dv with a log, see compare_traces() for
+  the arguments.
+  """
+  if not log:
+    return compare_traces(path1, path2, name1, name2, sys.stdout, **kwargs)
+  with open(log, 'a+') as fd:
+    return compare_traces(path1, path2, name1, name2, fd, **kwargs)
@@ -0,0 +1,384 @@
+"""
+Copyright 2019 Google LLC
+Copyright 2024 Thales DIS France SAS
+
+Licensed under the Apache License, Version 2.0 (the "License");
+you may not use this file except in compliance with the License.
+You may obtain a copy of the License at
+
+     http://www.apache.org/licenses/LICENSE-2.0
+
+Unless required by applicable law or agreed to in writing, software
+distributed under the License is distributed on an "AS IS" BASIS,
+WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+See the License for the specific language governing permissions and
+limitations under the License.
+
+Streaming parser shared by the ISS log to instruction trace converters
+"""
+
+import argparse
+import os
+import sys
+import logging
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.realpath(__file__)),
+                                "dv", "scripts"))
+
+from riscv_trace_csv import *
+from cva6_trace_bin import TRACE_BIN_EXT, TraceBin, TraceBinWriter
+from cva6_log_io import open_log
+
+# Number of CSV rows written at once by write_trace_csv()
+CSV_BATCH = 4096
+
+CSV_HEADER = "pc,instr,gpr,csr,binary,mode,instr_str,operand,pad\r\n"
+
+
+class TraceDialect:
+  '''How a simulator writes its execution log
+
+  Logs are made of instruction lines, split by split_instr() into (addr, bin,
+  instr), each followed by commit lines, split by split_commit() into (pri,
+  reg, val). The default methods use the core_re and rd_re regexes, dialects
+  can override them with faster parsers giving the same results.
+
+  Lines can be skipped in two windows, each given by (needle, regex) pairs
+  for its first and last line. The regex is only tried on lines containing the
+  needle.
+    trampoline_start/end : Boot code, trampoline_start is None if the log
+                           starts in the trampoline. Its last line is skipped
+                           if skip_trampoline_end is true.
+    debug_start/stop     : Debug mode code, both lines are skipped.
+  '''
+  name = None
+  core_re = None
+  rd_re = None
+  trampoline_start = None
+  trampoline_end = None
+  skip_trampoline_end = True
+  debug_start = None
+  debug_stop = None
+
+  def split_instr(self, line):
+    match = self.core_re.match(line)
+    return match.group('addr', 'bin', 'instr') if match else None
+
+  def split_commit(self, line):
+    match = self.rd_re.match(line)
+    return match.group('pri', 'reg', 'val') if match else None
+
+  def process_instr(self, trace):
+    '''Fix up the operands of a full trace entry'''
+    pass
+
+
+def trace_lines(handle, dialect):
+  '''Yield the lines of a log which are not in the trampoline or debug window'''
+  in_trampoline = dialect.trampoline_start is None and \
+                  dialect.trampoline_end is not None
+  in_debug = False
+  start_needle, start_re = dialect.trampoline_start or (None, None)
+  end_needle, end_re = dialect.trampoline_end or (None, None)
+  debug_needle, debug_re = dialect.debug_start or (None, None)
+  stop_needle, stop_re = dialect.debug_stop or (None, None)
+  skip_end = dialect.skip_trampoline_end
+
+  for line in handle:
+    if in_trampoline:
+      # The TRAMPOLINE state
+      if not (end_needle in line and end_re.match(line)):
+        continue
+      in_trampoline = False
+      if skip_end:
+        continue
+    elif start_re and start_needle in line and start_re.match(line):
+      in_trampoline = True
+      continue
+
+    if in_debug:
+      if stop_needle in line and stop_re.match(line):
+        in_debug = False
+      continue
+    elif debug_re and debug_needle in line and debug_re.match(line):
+      in_debug = True
+      continue
+
+    yield line
+
+
+def read_instr(dialect, fields, full_trace):
+  '''Make a RiscvInstructionTraceEntry out of split_instr() fields
+
+  If full_trace is true, extract operand data from the disassembled
+  instruction.
+  '''
+  addr, binary, disasm = fields
+
+  # Spike's disassembler shows a relative jump as something like "j pc +
+  # 0x123" or "j pc - 0x123". We just want the relative offset.
+  disasm = disasm.replace('pc + ', '').replace('pc - ', '-')
+
+  instr = RiscvInstructionTraceEntry()
+  instr.pc = addr
+  instr.instr_str = disasm
+  instr.binary = binary
+  if full_trace:
+    opcode = disasm.split(' ')[0]
+    operand = disasm[len(opcode):].replace(' ', '')
+    instr.instr, instr.operand = \
+      convert_pseudo_instr(opcode, operand, instr.binary)
+
+    dialect.process_instr(instr)
+
+  return instr
+
+
+def read_trace(path, dialect, full_trace):
+  '''Read a simulation log at <path>, yielding executed instructions.
+
+  If full_trace is true, extract operands from the disassembled instructions.
+
+  At the end of a DV program, there's an ECALL instruction, which we take as a
+  signal to stop checking, so we ditch everything that follows that
+  instruction.
+
+  This function yields instructions as it parses them as tuples of the form
+  (entry, illegal). entry is a RiscvInstructionTraceEntry. illegal is a
+  boolean, which is true if the instruction caused an illegal instruction trap.
+  '''
+
+  # Past the lines filtered out by trace_lines(), this loop is a simple FSM
+  # with states INSTR (where we expect to read an instruction) and EFFECT
+  # (where we expect to read commit information).
+  #
+  # We yield a RiscvInstructionTraceEntry object each time we leave EFFECT
+  # (going back to INSTR), we loop back from INSTR to itself, or we get to the
+  # end of the file and have an instruction in hand.
+  #
+  # On entry to the loop body, we are in state EFFECT if instr is not None,
+  # otherwise we are in state INSTR.
+
+  instr = None
+
+  with open_log(path) as handle:
+    for line in trace_lines(handle, dialect):
+      # If the line is an instruction, we either were in state INSTR or we
+      # yield the instruction we had. If the new instruction is 'ecall', we
+      # need to stop immediately.
+      fields = dialect.split_instr(line)
+      if fields:
+        if instr is not None:
+          yield (instr, False)
+        instr = read_instr(dialect, fields, full_trace)
+        if instr.instr_str == 'ecall':
+          break
+        continue
+
+      # In state INSTR, we discard any other lines.
+      if instr is None:
+        continue
+
+      # The line is a follow-on line in the log. First, check for illegal
+      # instructions
+      if 'trap_illegal_instruction' in line:
+        yield (instr, True)
+        instr = None
+        continue
+
+      # The instruction seems to have been fine. Do we have commit data?
+      fields = dialect.split_commit(line)
+      if fields:
+        instr.gpr.append(gpr_to_abi(fields[1].replace(' ', '')) +
+                         ':' + fields[2])
+        instr.mode = fields[0]
+
+    # At EOF, we might have an instruction in hand. Yield it if so.
+    if instr is not None:
+      yield (instr, False)
+
+
+def write_trace_entries(path, csv, dialect, full_trace=0):
+  '''Convert a log to a trace CSV through RiscvInstructionTraceCsv
+
+  Returns the number of instructions read and written.
+  '''
+  instrs_in = 0
+  instrs_out = 0
+
+  with open(csv, "w") as csv_fd:
+    trace_csv = RiscvInstructionTraceCsv(csv_fd)
+    trace_csv.start_new_trace()
+
+    for (entry, illegal) in read_trace(path, dialect, full_trace):
+      instrs_in += 1
+      if illegal and full_trace:
+        logging.debug("Illegal instruction: {}, opcode:{}"
+                      .format(entry.instr_str, entry.binary))
+
+      # Instructions that cause no architectural update (which includes illegal
+      # instructions) are ignored if full_trace is false.
+      #
+      # We say that an instruction caused an architectural update if either we
+      # saw a commit line (in which case, entry.gpr will contain a single
+      # entry) or the instruction was 'wfi' or 'ecall'.
+      if not (full_trace or entry.gpr or entry.instr_str in ['wfi', 'ecall']):
+        continue
+
+      trace_csv.write_trace_entry(entry)
+      instrs_out += 1
+
+  return instrs_in, instrs_out
+
+
+def csv_field(value):
+  '''Quote a CSV field the way the csv module does for the excel dialect'''
+  if ',' in value or '"' in value or '\n' in value or '\r' in value:
+    return '"' + value.replace('"', '""') + '"'
+  return value
+
+
+def trace_csv_row(pc, gpr, binary, mode, instr_str):
+  '''Format a row as RiscvInstructionTraceCsv.write_trace_entry() does
+
+  pc and mode come from [a-f0-9]+ and \\d matches and never need quoting.
+  '''
+  return "%s,,%s,,%s,%s,%s,,\r\n" % (
+    pc, csv_field(";".join(gpr)), csv_field(binary), mode,
+    csv_field(instr_str))
+
+
+def trace_records(path, dialect):
+  '''Yield (pc, gpr, binary, mode, instr_str) for the instructions of a log
+
+  This is the same as read_trace() without full_trace, but the instruction in
+  hand is held in local variables instead of an entry object and ABI register
+  names are memoized. All the instructions are yielded, including the ones
+  without architectural update.
+  '''
+  abi_names = {}
+  split_instr = dialect.split_instr
+  split_commit = dialect.split_commit
+
+  # Same FSM as read_trace(), have_instr tells if we are in EFFECT.
+  have_instr = False
+  pc = binary = disasm = mode = ""
+  gpr = []
+
+  with open_log(path) as handle:
+    for line in trace_lines(handle, dialect):
+      fields = split_instr(line)
+      if fields:
+        if have_instr:
+          yield pc, gpr, binary, mode, disasm
+        pc, binary, disasm = fields
+        disasm = disasm.replace('pc + ', '').replace('pc - ', '-')
+        mode = ""
+        gpr = []
+        have_instr = True
+        if disasm == 'ecall':
+          break
+        continue
+
+      if not have_instr:
+        continue
+
+      if 'trap_illegal_instruction' in line:
+        yield pc, gpr, binary, mode, disasm
+        have_instr = False
+        continue
+
+      fields = split_commit(line)
+      if fields:
+        mode, reg, val = fields
+        abi = abi_names.get(reg)
+        if abi is None:
+          abi = abi_names[reg] = gpr_to_abi(reg.replace(' ', ''))
+        gpr.append(abi + ':' + val)
+
+    # At EOF, we might have an instruction in hand.
+    if have_instr:
+      yield pc, gpr, binary, mode, disasm
+
+
+def write_trace_csv(path, csv, dialect, full_trace=0):
+  '''Convert a log to a trace CSV in one pass
+
+  Without full_trace, this is the same as write_trace_entries() but goes
+  through trace_records() and writes the CSV rows in batches. Returns the
+  number of instructions read and written.
+  '''
+  if full_trace:
+    return write_trace_entries(path, csv, dialect, full_trace)
+
+  instrs_in = 0
+  instrs_out = 0
+  rows = [CSV_HEADER]
+
+  with open(csv, "w") as csv_fd:
+    for pc, gpr, binary, mode, disasm in trace_records(path, dialect):
+      instrs_in += 1
+      # Only keep the instructions with an architectural update, see
+      # write_trace_entries().
+      if gpr or disasm == 'wfi' or disasm == 'ecall':
+        rows.append(trace_csv_row(pc, gpr, binary, mode, disasm))
+        instrs_out += 1
+        if len(rows) >= CSV_BATCH:
+          csv_fd.write("".join(rows))
+          rows.clear()
+    csv_fd.write("".join(rows))
+
+  return instrs_in, instrs_out
+
+
+def write_trace_bin(path, out, dialect):
+  '''Convert a log to a binary trace, see cva6_trace_bin
+
+  The binary trace holds the same instructions as the CSV written by
+  write_trace_csv(). Returns the number of instructions read and written.
+  '''
+  instrs_in = 0
+  writer = TraceBinWriter(out)
+  for pc, gpr, binary, mode, disasm in trace_records(path, dialect):
+    instrs_in += 1
+    if gpr or disasm == 'wfi' or disasm == 'ecall':
+      writer.add(pc, gpr, binary, mode, disasm)
+  writer.close()
+  return instrs_in, len(writer.columns["pc"])
+
+
+def write_trace(path, out, dialect, full_trace=0):
+  '''Convert a log to a binary trace if out ends with .bin, to a CSV else'''
+  if out.endswith(TRACE_BIN_EXT):
+    if full_trace:
+      raise ValueError("Binary traces do not support the full trace")
+    return write_trace_bin(path, out, dialect)
+  return write_trace_csv(path, out, dialect, full_trace)
+
+
+def export_trace_csv(trace_bin, csv):
+  '''Write the trace CSV of a binary trace, return its name'''
+  rows = [CSV_HEADER]
+  with TraceBin(trace_bin) as trace, open(csv, "w") as csv_fd:
+    for row in trace.rows():
+      rows.append(trace_csv_row(*row))
+      if len(rows) >= CSV_BATCH:
+        csv_fd.write("".join(rows))
+        rows.clear()
+    csv_fd.write("".join(rows))
+  return csv
+
+
+def main():
+  # Parse input arguments
+  parser = argparse.ArgumentParser(description="Export a binary trace to CSV")
+  parser.add_argument("--bin", type=str, required=True,
+                      help="Input binary trace file")
+  parser.add_argument("--csv", type=str, required=True,
+                      help="Output trace CSV file")
+  args = parser.parse_args()
+  export_trace_csv(args.bin, args.csv)
+
+
+if __name__ == "__main__":
+  main()
@@ -0,0 +1,25 @@
+# Copyright 2024 Thales DIS France SAS
+#
+# Licensed under the Solderpad Hardware Licence, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# SPDX-License-Identifier: Apache-2.0 WITH SHL-2.0
+# You may obtain a copy of the License at https://solderpad.org/licenses/
+
+"""
+Put the cva6.py modules and the riscv-dv scripts on the path of the tests
+
+The scripts of riscv-dv are taken from verif/sim/dv when it is checked out,
+else from the stand-in of riscv_dv/, which covers what the trace converters
+use on the golden logs.
+"""
+
+import os
+import sys
+
+TESTS_DIR = os.path.dirname(os.path.realpath(__file__))
+SIM_DIR = os.path.dirname(TESTS_DIR)
+RISCV_DV_SCRIPTS = os.path.join(SIM_DIR, "dv", "scripts")
+
+sys.path.insert(0, SIM_DIR)
+sys.path.insert(1, RISCV_DV_SCRIPTS if os.path.isdir(RISCV_DV_SCRIPTS) else
+                os.path.join(TESTS_DIR, "riscv_dv"))
@@ -0,0 +1,16 @@
+# Copyright 2024 Thales DIS France SAS
+#
+# Licensed under the Solderpad Hardware Licence, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# SPDX-License-Identifier: Apache-2.0 WITH SHL-2.0
+# You may obtain a copy of the License at https://solderpad.org/licenses/
+
+"""
+Stand-in of the riscv-dv script library, see conftest.py
+"""
+
+import logging
+
+
+def setup_logging(verbose):
+  logging.basicConfig(level=logging.DEBUG if verbose else logging.INFO)
@@ -0,0 +1,62 @@
+# Copyright 2024 Thales DIS France SAS
+#
+# Licensed under the Solderpad Hardware Licence, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# SPDX-License-Identifier: Apache-2.0 WITH SHL-2.0
+# You may obtain a copy of the License at https://solderpad.org/licenses/
+
+"""
+Stand-in of the riscv-dv trace CSV module, see conftest.py
+
+Only what the trace converters use without full_trace: the trace entries,
+the CSV writer and the ABI names of the registers.
+"""
+
+import csv
+
+GPR_ABI = ["zero", "ra", "sp", "gp", "tp", "t0", "t1", "t2", "s0", "s1"] + \
+          ["a%d" % i for i in range(8)] + ["s%d" % i for i in range(2, 12)] + \
+          ["t3", "t4", "t5", "t6"]
+FPR_ABI = ["ft%d" % i for i in range(8)] + ["fs0", "fs1"] + \
+          ["fa%d" % i for i in range(8)] + ["fs%d" % i for i in range(2, 12)] + \
+          ["ft%d" % i for i in range(8, 12)]
+
+
+def gpr_to_abi(gpr):
+  """Get the ABI name of an x or f register, "na" for anything else"""
+  for prefix, names in (("x", GPR_ABI), ("f", FPR_ABI)):
+    if gpr.startswith(prefix) and gpr[1:].isdigit() and int(gpr[1:]) < 32:
+      return names[int(gpr[1:])]
+  return "na"
+
+
+def convert_pseudo_instr(instr_name, operands, binary):
+  raise NotImplementedError("full_trace needs riscv-dv checked out in verif/sim/dv")
+
+
+class RiscvInstructionTraceEntry(object):
+  def __init__(self):
+    self.gpr = []
+    self.csr = []
+    self.instr = ""
+    self.operand = ""
+    self.pc = ""
+    self.binary = ""
+    self.instr_str = ""
+    self.mode = ""
+
+
+class RiscvInstructionTraceCsv(object):
+  def __init__(self, csv_fd):
+    self.csv_fd = csv_fd
+
+  def start_new_trace(self):
+    fields = ["pc", "instr", "gpr", "csr", "binary", "mode", "instr_str", "operand", "pad"]
+    self.csv_writer = csv.DictWriter(self.csv_fd, fieldnames=fields)
+    self.csv_writer.writeheader()
+
+  def write_trace_entry(self, entry):
+    self.csv_writer.writerow({"pc": entry.pc, "instr": entry.instr,
+                              "gpr": ";".join(entry.gpr), "csr": ";".join(entry.csr),
+                              "binary": entry.binary, "mode": entry.mode,
+                              "instr_str": entry.instr_str, "operand": entry.operand})
@@ -0,0 +1,92 @@
+# Copyright 2024 Thales DIS France SAS
+#
+# Licensed under the Solderpad Hardware Licence, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# SPDX-License-Identifier: Apache-2.0 WITH SHL-2.0
+# You may obtain a copy of the License at https://solderpad.org/licenses/
+
+"""
+Tests of the Spike worker on a stand-in Makefile
+
+The Makefile counts the times it is read by make, dry runs included, and its
+spike recipe copies the ELF to the log.
+"""
+
+import os
+import shutil
+import subprocess
+import sys
+
+import pytest
+
+SIM_DIR = os.path.dirname(os.path.dirname(os.path.realpath(__file__)))
+sys.path.insert(0, SIM_DIR)
+
+from cva6_scheduler import Job, run_jobs
+from cva6_spike_worker import SpikeWorker
+
+pytestmark = pytest.mark.skipif(shutil.which("make") is None, reason="make is not installed")
+
+MAKEFILE = """\
+COUNT := $(shell echo $(MAKECMDGOALS) >> {count})
+
+spike:
+\tcat $(elf) > $(log)
+"""
+
+worker = SpikeWorker()
+
+
+def spike_cmd(tmp_path, test):
+  """Get the command of get_iss_cmd() with the working directory of a job"""
+  elf = str(tmp_path / ("%s.o" % test))
+  log = str(tmp_path / ("%s.log" % test))
+  work_dir = tmp_path / ("%s.work" % test)
+  work_dir.mkdir()
+  with open(elf, "w") as f:
+    f.write("%s\n" % test)
+  cmd = "make -C %s -f %s spike elf=%s log=%s &> %s.iss" % (
+    work_dir, tmp_path / "Makefile", elf, log, log)
+  return cmd, elf, log
+
+
+def run_spike(cmd, elf, log):
+  return worker.run(cmd, elf, log, 60)
+
+
+def make_runs(tmp_path):
+  with open(tmp_path / "count") as f:
+    return len(f.readlines())
+
+
+def test_parallel_tests_share_recipe(tmp_path):
+  with open(tmp_path / "Makefile", "w") as f:
+    f.write(MAKEFILE.format(count=tmp_path / "count"))
+  tests = ["test_%d" % i for i in range(4)]
+  cmds = [spike_cmd(tmp_path, test) for test in tests]
+  jobs = [Job(test, run_spike, cmd) for test, cmd in zip(tests, cmds)]
+  # As run_tests() and iss_sim(): the first test alone, then the others
+  # in forked workers.
+  results = run_jobs(jobs[:1]) + run_jobs(jobs[1:], 3)
+  assert results == [(0, False)] * len(tests)
+  # The template and the first test, none for the other ones
+  assert make_runs(tmp_path) == 2
+  for test, (cmd, elf, log) in zip(tests, cmds):
+    with open(log) as f:
+      assert f.read() == "%s\n" % test
+
+
+def test_output_matches_make(tmp_path):
+  """The .iss output of a test using the recipe of another one is make's"""
+  with open(tmp_path / "Makefile", "w") as f:
+    f.write(MAKEFILE.format(count=tmp_path / "count"))
+  first, second = spike_cmd(tmp_path, "first"), spike_cmd(tmp_path, "second")
+  shared = SpikeWorker()
+  assert shared.run(*first, 60) == (0, False)
+  assert shared.run(*second, 60) == (0, False)
+  cmd, elf, log = second
+  with open(log + ".iss") as f:
+    by_worker = f.read()
+  subprocess.run(cmd, shell=True, executable="/bin/bash", check=True)
+  with open(log + ".iss") as f:
+    assert by_worker == f.read()
@@ -0,0 +1,68 @@
+# Copyright 2024 Thales DIS France SAS
+#
+# Licensed under the Solderpad Hardware Licence, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# SPDX-License-Identifier: Apache-2.0 WITH SHL-2.0
+# You may obtain a copy of the License at https://solderpad.org/licenses/
+
+"""
+Golden tests of the conversion of the simulation logs to trace CSV
+
+The logs of golden/ cover the lines the converters must handle: trampolines,
+CSR writes, memory accesses, illegal instruction traps, ecall, odd core
+prefixes and malformed commit lines. The Verilator logs also cover the boot
+code before 0x80000000 and the debug mode code between 0x800 and 0x890.
+
+The CSV next to each log was written by the converters as they were before
+they shared cva6_trace_parser, and must not change.
+
+Run with "python3 -m pytest verif/sim/tests", the riscv-dv scripts are set up
+by conftest.py.
+"""
+
+import filecmp
+import glob
+import os
+
+import pytest
+
+GOLDEN_DIR = os.path.join(os.path.dirname(os.path.realpath(__file__)), "golden")
+
+from cva6_spike_log_to_trace_csv import process_spike_sim_log
+from verilator_log_to_trace_csv import process_verilator_sim_log
+
+SPIKE_LOGS = sorted(glob.glob(os.path.join(GOLDEN_DIR, "spike", "*.log")))
+VERILATOR_LOGS = sorted(glob.glob(os.path.join(GOLDEN_DIR, "verilator", "*.log")))
+
+
+def log_id(path):
+  return os.path.basename(path)
+
+
+def golden_csv(log):
+  return os.path.splitext(log)[0] + ".csv"
+
+
+@pytest.mark.parametrize("log", SPIKE_LOGS, ids=log_id)
+def test_spike_fast_matches_legacy(log, tmp_path):
+  """The fast Spike converter writes the same bytes as the regex based one"""
+  fast = str(tmp_path / "fast.csv")
+  legacy = str(tmp_path / "legacy.csv")
+  process_spike_sim_log(log, fast)
+  process_spike_sim_log(log, legacy, legacy=True)
+  assert filecmp.cmp(fast, legacy, shallow=False)
+
+
+@pytest.mark.parametrize("legacy", [False, True], ids=["fast", "legacy"])
+@pytest.mark.parametrize("log", SPIKE_LOGS, ids=log_id)
+def test_spike_golden(log, legacy, tmp_path):
+  csv = str(tmp_path / "trace.csv")
+  process_spike_sim_log(log, csv, legacy=legacy)
+  assert filecmp.cmp(csv, golden_csv(log), shallow=False)
+
+
+@pytest.mark.parametrize("log", VERILATOR_LOGS, ids=log_id)
+def test_verilator_golden(log, tmp_path):
+  csv = str(tmp_path / "trace.csv")
+  process_verilator_sim_log(log, csv)
+  assert filecmp.cmp(csv, golden_csv(log), shallow=False)